@@ -0,0 +1,172 @@
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Awaitable, Callable, Deque, Dict
+from formatting import escape_markdown
+from templates import alias_slot
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+SOL_MINT = "SOL"
+
+
+@dataclass
+class WalletDigest:
+    """Alerts accumulated for one wallet while it is in digest mode"""
+    alias: str
+    started_at: float = field(default_factory=time.monotonic)
+    tx_types: Counter = field(default_factory=Counter)
+    net_flows: Dict[str, Decimal] = field(default_factory=lambda: defaultdict(Decimal))
+    mints: Counter = field(default_factory=Counter)
+
+    @property
+    def total(self) -> int:
+        return sum(self.tx_types.values())
+
+
+class AlertCoalescer:
+    """Switch hot wallets from individual alerts to periodic digests
+
+    Every alert for a wallet is timestamped in a sliding window. Once a
+    wallet produces ``threshold`` alerts within ``window`` seconds it enters
+    digest mode: its transactions are folded into a summary that is sent
+    every ``flush_interval`` seconds. When its rate falls below half the
+    threshold it returns to individual alerts.
+    """
+
+    def __init__(self, send: Callable[[str, str], Awaitable[None]], window: int = 60,
+                 threshold: int = 20, flush_interval: int = 60):
+        self.send = send
+        self.window = window
+        self.threshold = threshold
+        self.flush_interval = flush_interval
+        self._times: Dict[str, Deque[float]] = defaultdict(deque)
+        self._digests: Dict[str, WalletDigest] = {}
+        self._task = None
+        self.coalesced = 0
+        self.digests_sent = 0
+
+    async def start(self):
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush(force=True)
+
+    def _rate(self, wallet: str, now: float) -> int:
+        times = self._times[wallet]
+        while times and times[0] < now - self.window:
+            times.popleft()
+        return len(times)
+
+    def should_coalesce(self, wallet: str, alias: str) -> bool:
+        """Record an alert for the wallet and report whether it belongs in a digest"""
+        now = time.monotonic()
+        self._times[wallet].append(now)
+        if wallet in self._digests:
+            return True
+        if self._rate(wallet, now) >= self.threshold:
+            logger.info("Wallet %s switched to digest mode", alias)
+            self._digests[wallet] = WalletDigest(alias)
+            return True
+        return False
+
+    def add(self, wallet: str, tx_data: dict):
+        """Fold a transaction into the wallet's pending digest"""
+        digest = self._digests[wallet]
+        digest.tx_types[tx_data.get('type', 'Unknown')] += 1
+        self.coalesced += 1
+
+        for transfer in tx_data.get('tokenTransfers') or []:
+            mint = transfer.get('mint')
+            if not mint:
+                continue
+            try:
+                amount = Decimal(str(transfer.get('tokenAmount') or 0))
+            except InvalidOperation:
+                amount = Decimal(0)
+            digest.mints[mint] += 1
+            if transfer.get('toUserAccount') == wallet:
+                digest.net_flows[mint] += amount
+            if transfer.get('fromUserAccount') == wallet:
+                digest.net_flows[mint] -= amount
+
+        for transfer in tx_data.get('nativeTransfers') or []:
+            lamports = Decimal(transfer.get('amount') or 0) / Decimal(10 ** 9)
+            if transfer.get('toUserAccount') == wallet:
+                digest.net_flows[SOL_MINT] += lamports
+            if transfer.get('fromUserAccount') == wallet:
+                digest.net_flows[SOL_MINT] -= lamports
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Digest flush failed: %s", e, exc_info=True)
+
+    async def flush(self, force: bool = False):
+        """Send pending digests and release wallets whose rate has dropped"""
+        now = time.monotonic()
+        for wallet, digest in list(self._digests.items()):
+            cooled = self._rate(wallet, now) < self.threshold / 2
+            if digest.total:
+                await self.send(self.render(wallet, digest, now), wallet)
+                self.digests_sent += 1
+            if cooled or force:
+                logger.info("Wallet %s back to individual alerts", digest.alias)
+                del self._digests[wallet]
+            else:
+                self._digests[wallet] = WalletDigest(digest.alias, started_at=now)
+
+        # Forget idle wallets so the window map stays bounded
+        for wallet in [w for w, times in self._times.items() if not self._rate(w, now)]:
+            del self._times[wallet]
+
+    @staticmethod
+    def _short(mint: str) -> str:
+        return mint if mint == SOL_MINT else f"{mint[:4]}…{mint[-4:]}"
+
+    def render(self, wallet: str, digest: WalletDigest, now: float) -> str:
+        esc = lambda text: escape_markdown(str(text))
+        elapsed = int(now - digest.started_at)
+        swaps = digest.tx_types.get('SWAP', 0)
+
+        lines = [
+            f"📊 *Activity digest: {alias_slot(wallet)}*",
+            f"`{esc(swaps)}` swaps, `{esc(digest.total - swaps)}` other transactions in the last `{esc(elapsed)}s`"
+        ]
+
+        flows = sorted(
+            ((mint, amount) for mint, amount in digest.net_flows.items() if amount),
+            key=lambda item: abs(item[1]), reverse=True
+        )[:5]
+        if flows:
+            lines.append("*Net flows:*")
+            lines.extend(
+                f"`{esc(f'{amount:+,.4f}')} {esc(self._short(mint))}`" for mint, amount in flows
+            )
+
+        top_mints = digest.mints.most_common(3)
+        if top_mints:
+            lines.append("*Top mints:*")
+            lines.extend(f"`{esc(mint)}` \\({esc(count)}x\\)" for mint, count in top_mints)
+
+        return "\n".join(lines)
+
+    def stats(self) -> dict:
+        return {
+            "digest_wallets": len(self._digests),
+            "tracked_wallets": len(self._times),
+            "coalesced": self.coalesced,
+            "digests_sent": self.digests_sent
+        }
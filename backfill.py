@@ -0,0 +1,153 @@
+from connection_pool import HTTPSessionManager
+from database import Database
+from dedupe import SignatureDeduper
+from helius_client import fetch_parsed_transactions
+from rpc_router import rpc_pool
+from rpc_scheduler import rpc_priority, Priority
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Backfiller:
+    """Replay wallet activity that never arrived by webhook
+
+    Each wallet stores the newest signature a sweep has accounted for in
+    ``wallets.last_signature``. A sweep asks ``getSignaturesForAddress``
+    for everything newer (``until=`` the cursor), drops signatures the
+    live pipeline has already seen, fetches the rest as Helius parsed
+    transactions in batches and hands them to ``ingest`` – the same path
+    webhook deliveries take, dedupe included. The cursor only advances
+    once a wallet's gap has been processed.
+
+    New wallets start at their current newest signature; history from
+    before they were tracked is not replayed. The deduper is persisted
+    across restarts so the startup sweep does not re-alert on
+    transactions handled just before shutdown.
+    """
+
+    def __init__(self, db: Database, session_manager: HTTPSessionManager, deduper: SignatureDeduper,
+                 ingest: Callable[[List[Dict[str, Any]]], Awaitable[None]], interval: int = 300,
+                 max_signatures: int = 500, batch_size: int = 100, concurrency: int = 4):
+        self.db = db
+        self.session_manager = session_manager
+        self.deduper = deduper
+        self.ingest = ingest
+        self.interval = interval
+        self.max_signatures = max_signatures
+        self.batch_size = batch_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._task = None
+        self.sweeps = 0
+        self.recovered = 0
+        self.truncated = 0
+        self.last_sweep_seconds = 0.0
+
+    async def start(self):
+        if self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._sweep_loop())
+        logger.info("Backfill started (every %ss)", self.interval)
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _sweep_loop(self):
+        # The first sweep runs at startup to cover downtime
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error("Backfill sweep failed: %s", e, exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self) -> int:
+        """Backfill every tracked wallet once; returns transactions recovered"""
+        started = time.monotonic()
+        with rpc_priority(Priority.BACKGROUND):
+            cursors = await self.db.get_signature_cursors()
+            results = await asyncio.gather(
+                *(self._backfill_wallet(row['address'], row['last_signature']) for row in cursors),
+                return_exceptions=True
+            )
+
+        recovered = 0
+        for row, result in zip(cursors, results):
+            if isinstance(result, Exception):
+                logger.warning("Backfill failed for %s: %s", row['address'], result)
+            else:
+                recovered += result
+
+        self.sweeps += 1
+        self.recovered += recovered
+        self.last_sweep_seconds = time.monotonic() - started
+        if recovered:
+            logger.info("Backfill recovered %s transactions across %s wallets", recovered, len(cursors))
+        return recovered
+
+    async def _backfill_wallet(self, address: str, cursor: Optional[str]) -> int:
+        async with self._semaphore:
+            if cursor is None:
+                newest = await self._signatures(address, limit=1)
+                if newest:
+                    await self.db.set_last_signature(address, newest[0]['signature'])
+                return 0
+
+            signatures = await self._signatures_since(address, cursor)
+            if not signatures:
+                return 0
+
+            # Oldest first, so batches reach the pipeline in chain order
+            missing = [
+                entry['signature'] for entry in reversed(signatures)
+                if entry.get('err') is None and entry['signature'] not in self.deduper
+            ]
+            for start in range(0, len(missing), self.batch_size):
+                transactions = await fetch_parsed_transactions(
+                    self.session_manager.session, missing[start:start + self.batch_size]
+                )
+                await self.ingest(transactions)
+
+            # Newest first, so the head of the list is the new cursor
+            await self.db.set_last_signature(address, signatures[0]['signature'])
+            return len(missing)
+
+    async def _signatures_since(self, address: str, cursor: str) -> List[Dict[str, Any]]:
+        """Signatures newer than ``cursor``, newest first, capped at max_signatures"""
+        signatures: List[Dict[str, Any]] = []
+        before = None
+        while len(signatures) < self.max_signatures:
+            limit = min(1000, self.max_signatures - len(signatures))
+            page = await self._signatures(address, limit=limit, until=cursor, before=before)
+            signatures.extend(page)
+            if len(page) < limit:
+                return signatures
+            before = page[-1]['signature']
+
+        self.truncated += 1
+        logger.warning("Backfill gap for %s exceeds %s signatures; older ones skipped", address, self.max_signatures)
+        return signatures
+
+    async def _signatures(self, address: str, limit: int, until: Optional[str] = None,
+                          before: Optional[str] = None) -> List[Dict[str, Any]]:
+        options: Dict[str, Any] = {"limit": limit}
+        if until:
+            options["until"] = until
+        if before:
+            options["before"] = before
+        return await rpc_pool.call("getSignaturesForAddress", [address, options]) or []
+
+    def stats(self) -> dict:
+        return {
+            "sweeps": self.sweeps,
+            "recovered": self.recovered,
+            "truncated_gaps": self.truncated,
+            "last_sweep_seconds": round(self.last_sweep_seconds, 2)
+        }
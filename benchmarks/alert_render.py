@@ -0,0 +1,207 @@
+"""Per-alert render cost: compiled templates vs per-fragment f-string escaping
+
+Renders each alert type many times with realistic values (a few hundred
+wallet aliases and tokens that repeat, unique signatures and amounts)
+using ``templates`` and the f-string code it replaced, checks both give
+the same MarkdownV2, and prints the best of ``--repeat`` runs in
+microseconds per alert. The batch baseline escapes every fragment like
+production does; the old code sent it unescaped.
+
+    python benchmarks/alert_render.py --alerts 20000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from formatting import escape_markdown
+import templates
+
+
+def esc(text) -> str:
+    return escape_markdown(str(text))
+
+
+# The f-string renderers the templates replaced (escape on every fragment)
+def legacy_general(v):
+    return (
+        f"🔔 New *{esc(v['tx_type'])}* Transaction in _{esc(v['alias'])}_:\n"
+        f"⏱ `{esc(v['time_ago'])}`\n"
+        f"📜 Sig: `{esc(v['signature'])}`"
+    )
+
+
+def legacy_sol_transfer(v):
+    return (
+        f"💸 *SOL Transfer*:\n"
+        f"Amount: `{esc(v['amount'])} SOL`\n"
+        f"From: {v['sender']}\n"
+        f"To: {v['recipient']}\n"
+        f"⏱ {esc(v['time_ago'])}\n"
+        f"📜 `{esc(v['signature'])}`"
+    )
+
+
+def legacy_token_transfer(v):
+    symbol = esc(v['symbol'])
+    return (
+        f"💰 *{esc(v['name'])} \\({symbol}\\) Transfer*:\n"
+        f"🪙 Amount: `{esc(v['amount'])} {symbol}`\n"
+        f"From: {v['sender']}\n"
+        f"To: {v['recipient']}\n"
+        f"⏱ {esc(v['time_ago'])}\n"
+        f"📜 `{esc(v['signature'])}`"
+    )
+
+
+def legacy_swap(v):
+    return (
+        f"🔄 *New Swap in {esc(v['alias'])}*\n"
+        f"⬆️ Sold: `{esc(v['sold_amount'])} {esc(v['sold_symbol'])}`\n"
+        f"⬇️ Bought: `{esc(v['bought_amount'])} {esc(v['bought_symbol'])}`\n"
+        f"🏦 DEX: `{esc(v['dex'])}`\n"
+        f"⏱ {esc(v['time_ago'])}\n"
+        f"🔗 [Transaction]({esc(v['tx_url'])})\n"
+        f"📜 *CA:* `{esc(v['ca'])}`"
+    )
+
+
+def legacy_batch_transfer(v):
+    lines = "".join(
+        f"\\- {esc(transfer['amount'])} {esc(transfer['symbol'])} from "
+        f"{esc(transfer['from'][:10])}\\.\\.\\. to {esc(transfer['to'][:10])}\\.\\.\\.\n"
+        for transfer in v['transfers']
+    )
+    return (
+        f"📦 Batch Token Distribution:\n"
+        f"Total Transfers: {esc(len(v['transfers']))}\n"
+        f"Details:\n"
+        f"{lines}"
+        f"Time: {esc(v['time_ago'])}\n"
+        f"Signature: {esc(v['signature'])}"
+    )
+
+
+def render_batch_transfer(v):
+    lines = "".join(
+        templates.BATCH_TRANSFER_LINE.render(
+            amount=transfer['amount'], symbol=transfer['symbol'],
+            sender=transfer['from'][:10], recipient=transfer['to'][:10]
+        )
+        for transfer in v['transfers']
+    )
+    return templates.BATCH_TRANSFER.render(
+        count=len(v['transfers']), lines=lines, time_ago=v['time_ago'], signature=v['signature']
+    )
+
+
+def legacy_portfolio(v):
+    return (
+        "✨ *{alias} Portfolio{cache_status}* ✨\n"
+        "_Last updated: {updated}_\n"
+        "`―――――――――――――――――――――――`\n"
+        "*🟣 SOL Balance:*\n"
+        "`{sol_balance}`\n\n"
+        "*🪙 Top Assets \\({total} total\\):*\n"
+        "{assets}\n"
+        "`―――――――――――――――――――――――`\n"
+        "_Full portfolio attached_ \\📎"
+    ).format(
+        alias=esc(v['alias']), cache_status=esc(v['cache_status']), updated=esc(v['updated']),
+        sol_balance=esc(f"{v['sol_balance']:12.4f} SOL"), total=len(v['tokens']),
+        assets="\n".join(
+            f"{idx:>2}\\. *{esc(t['name'])}* \\({esc(t['symbol'])}\\)\n   `{t['amount']:15,.4f}`"
+            for idx, t in enumerate(v['tokens'][:20], 1)
+        )
+    )
+
+
+def render_portfolio(v):
+    return templates.PORTFOLIO.render(
+        alias=v['alias'], cache_status=v['cache_status'], updated=v['updated'],
+        sol_balance=v['sol_balance'], total=len(v['tokens']),
+        assets="\n".join(
+            templates.PORTFOLIO_ASSET.render(index=idx, name=t['name'], symbol=t['symbol'], amount=t['amount'])
+            for idx, t in enumerate(v['tokens'][:20], 1)
+        )
+    )
+
+
+CASES = {
+    "general": (lambda v: templates.GENERAL.render(**v), legacy_general),
+    "sol_transfer": (lambda v: templates.SOL_TRANSFER.render(**v), legacy_sol_transfer),
+    "token_transfer": (lambda v: templates.TOKEN_TRANSFER.render(**v), legacy_token_transfer),
+    "swap": (lambda v: templates.SWAP.render(**v), legacy_swap),
+    "batch_transfer": (render_batch_transfer, legacy_batch_transfer),
+    "portfolio": (render_portfolio, legacy_portfolio),
+}
+
+
+def make_values(kind, i, aliases, tokens):
+    signature = "".join(random.choices("123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz", k=88))
+    alias = random.choice(aliases)
+    time_ago = f"{random.randint(1, 59)}s ago"
+    if kind == "general":
+        return {"tx_type": random.choice(["NFT_SALE", "STAKE_SOL", "UNKNOWN"]), "alias": alias,
+                "time_ago": time_ago, "signature": signature[:10] + "..."}
+    if kind == "sol_transfer":
+        return {"amount": random.randint(1, 10 ** 12), "sender": esc(alias), "recipient": "`7xKXtg...9fQa`",
+                "time_ago": time_ago, "signature": signature}
+    if kind == "token_transfer":
+        token = random.choice(tokens)
+        return {"name": token['name'], "symbol": token['symbol'],
+                "amount": templates.format_token_amount(random.random() * 10 ** 6),
+                "sender": esc(alias), "recipient": esc(random.choice(aliases)),
+                "time_ago": time_ago, "signature": signature}
+    if kind == "swap":
+        sold, bought = random.sample(tokens, 2)
+        return {"alias": alias, "sold_amount": round(random.random() * 1000, 6), "sold_symbol": sold['symbol'],
+                "bought_amount": round(random.random() * 10 ** 6, 2), "bought_symbol": bought['symbol'],
+                "dex": random.choice(["RAYDIUM", "JUPITER", "ORCA", "PUMP_FUN"]), "time_ago": time_ago,
+                "tx_url": f"https://solscan.io/tx/{signature}", "ca": bought['mint']}
+    if kind == "batch_transfer":
+        return {"time_ago": time_ago, "signature": signature, "transfers": [
+            {"amount": round(random.random() * 1000, 3), "symbol": random.choice(tokens)['symbol'],
+             "from": random.choice(aliases) + "x" * 10, "to": signature[j:j + 12]}
+            for j in range(5)
+        ]}
+    return {"alias": alias, "cache_status": " (cached)", "updated": time_ago,
+            "sol_balance": random.random() * 100,
+            "tokens": [dict(t, amount=random.random() * 10 ** 6) for t in random.sample(tokens, 20)]}
+
+
+def main(args):
+    random.seed(7)
+    aliases = [f"whale_{i}.sol" for i in range(args.aliases)]
+    tokens = [{"name": f"Token (#{i})", "symbol": f"TK-{i}", "mint": f"Mint{i:040d}"} for i in range(args.tokens)]
+
+    print(f"{'alert':>15} {'template':>10} {'f-string':>10}  (µs per alert)")
+    for kind, (render, legacy) in CASES.items():
+        count = args.alerts // 10 if kind == "portfolio" else args.alerts
+        values = [make_values(kind, i, aliases, tokens) for i in range(count)]
+        for v in values[:100]:
+            assert render(v) == legacy(v), f"{kind} renders differ"
+
+        timings = []
+        for renderer in (render, legacy):
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                for v in values:
+                    renderer(v)
+                best = min(best, time.perf_counter() - start)
+            timings.append(best / count * 1e6)
+        print(f"{kind:>15} {timings[0]:>10.2f} {timings[1]:>10.2f}")
+    print(f"escape memo: {templates.escape_memo.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--alerts", type=int, default=20000)
+    parser.add_argument("--aliases", type=int, default=300)
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5, help="best of N runs")
+    main(parser.parse_args())
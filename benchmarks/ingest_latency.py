@@ -0,0 +1,184 @@
+"""Alert-path latency: WebSocket subscription ingest vs webhook delivery
+
+Runs entirely against a local stand-in: a WebSocket endpoint that speaks
+enough of ``logsSubscribe`` to notify signatures, a fake Helius
+parsed-transactions endpoint, and a local webhook receiver. Latency is
+measured from the moment a transaction is "confirmed" by the stand-in to
+the moment the pipeline's ``ingest`` receives it.
+
+Helius-side webhook batching cannot be reproduced locally; pass
+``--webhook-delay`` to model it (observed delays are usually 0.5–2s).
+
+    python benchmarks/ingest_latency.py --wallets 200 --txs 500 --webhook-delay 1.0
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+import aiohttp
+
+import helius_client
+from database import Database
+from dedupe import SignatureDeduper
+from ws_ingest import WebSocketIngest
+from wallet_registry import WalletRegistry
+
+HOST, PORT = "127.0.0.1", 18765
+
+
+class StandIn:
+    """Local Solana WebSocket + Helius parsed-transactions stand-in"""
+
+    def __init__(self):
+        self.sockets = []  # (ws, {subscription id: address})
+        self.confirmed_at = {}
+        self.app = web.Application()
+        self.app.router.add_get("/ws", self.handle_ws)
+        self.app.router.add_post("/v0/transactions", self.handle_parsed)
+
+    async def handle_ws(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscriptions = {}
+        self.sockets.append((ws, subscriptions))
+        async for message in ws:
+            body = message.json()
+            if body["method"] == "logsSubscribe":
+                sub_id = random.getrandbits(31)
+                subscriptions[sub_id] = body["params"][0]["mentions"][0]
+                await ws.send_json({"jsonrpc": "2.0", "id": body["id"], "result": sub_id})
+            elif body["method"] == "logsUnsubscribe":
+                subscriptions.pop(body["params"][0], None)
+                await ws.send_json({"jsonrpc": "2.0", "id": body["id"], "result": True})
+        return ws
+
+    async def handle_parsed(self, request):
+        body = await request.json()
+        return web.json_response([
+            {"signature": sig, "timestamp": int(time.time()), "type": "TRANSFER"}
+            for sig in body["transactions"]
+        ])
+
+    async def confirm(self, address: str, signature: str):
+        self.confirmed_at[signature] = time.perf_counter()
+        for ws, subscriptions in self.sockets:
+            for sub_id, subscribed in subscriptions.items():
+                if subscribed == address:
+                    await ws.send_json({
+                        "jsonrpc": "2.0", "method": "logsNotification",
+                        "params": {"subscription": sub_id, "result": {"value": {"signature": signature, "err": None}}}
+                    })
+
+
+class Sessions:
+    """Minimal HTTPSessionManager stand-in exposing ``.session``"""
+
+    def __init__(self, session):
+        self.session = session
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:>10}: n={len(latencies)} p50={statistics.median(latencies) * 1000:.1f}ms "
+          f"p95={p95 * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms")
+
+
+async def run_websocket(stand_in, db_path, wallets, txs, rate, connections):
+    latencies, done = [], asyncio.Event()
+
+    async def ingest(transactions):
+        now = time.perf_counter()
+        latencies.extend(now - stand_in.confirmed_at[tx["signature"]] for tx in transactions)
+        if len(latencies) >= txs:
+            done.set()
+
+    async with aiohttp.ClientSession() as session:
+        registry = WalletRegistry(db_path)
+        await registry.load()
+        ws_ingest = WebSocketIngest(
+            registry, Sessions(session), SignatureDeduper(), ingest,
+            f"ws://{HOST}:{PORT}/ws", connections=connections
+        )
+        await ws_ingest.start()
+        while sum(len(subs) for _, subs in stand_in.sockets) < len(wallets):
+            await asyncio.sleep(0.05)
+        for i in range(txs):
+            await stand_in.confirm(random.choice(wallets), f"ws-{i}")
+            await asyncio.sleep(1 / rate)
+        await asyncio.wait_for(done.wait(), timeout=30)
+        await ws_ingest.stop()
+    return latencies
+
+
+async def run_webhook(stand_in, txs, rate, webhook_delay):
+    latencies, done = [], asyncio.Event()
+
+    async def handle_webhook(request):
+        now = time.perf_counter()
+        latencies.extend(now - stand_in.confirmed_at[tx["signature"]] for tx in await request.json())
+        if len(latencies) >= txs:
+            done.set()
+        return web.Response(status=200)
+
+    app = web.Application()
+    app.router.add_post("/webhook", handle_webhook)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT + 1).start()
+
+    async with aiohttp.ClientSession() as session:
+        async def deliver(signature):
+            await asyncio.sleep(webhook_delay)
+            await session.post(f"http://{HOST}:{PORT + 1}/webhook", json=[{"signature": signature}])
+
+        deliveries = []
+        for i in range(txs):
+            signature = f"wh-{i}"
+            stand_in.confirmed_at[signature] = time.perf_counter()
+            deliveries.append(asyncio.create_task(deliver(signature)))
+            await asyncio.sleep(1 / rate)
+        await asyncio.gather(*deliveries)
+        await asyncio.wait_for(done.wait(), timeout=30)
+    await runner.cleanup()
+    return latencies
+
+
+async def main(args):
+    stand_in = StandIn()
+    runner = web.AppRunner(stand_in.app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+    helius_client.PARSED_TRANSACTIONS_URL = f"http://{HOST}:{PORT}/v0/transactions"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        db = Database(db_path)
+        await db.connect()
+        wallets = [f"Wallet{i:040d}" for i in range(args.wallets)]
+        for i, address in enumerate(wallets):
+            await db.save_wallet(address, f"w{i}")
+        await db.close()
+
+        report("websocket", await run_websocket(stand_in, db_path, wallets, args.txs, args.rate, args.connections))
+        report("webhook", await run_webhook(stand_in, args.txs, args.rate, args.webhook_delay))
+
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wallets", type=int, default=100)
+    parser.add_argument("--txs", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=200, help="transactions per second")
+    parser.add_argument("--connections", type=int, default=2)
+    parser.add_argument("--webhook-delay", type=float, default=0.0, help="modelled Helius batching delay (s)")
+    asyncio.run(main(parser.parse_args()))
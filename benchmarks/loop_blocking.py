@@ -0,0 +1,104 @@
+"""Event loop blocking check for the wallet and transaction paths
+
+Runs the solcrawl.py command and webhook handlers against a throwaway
+database with a stand-in Telegram bot, inside
+``LoopMonitor.assert_nonblocking()``. Any stall longer than
+``--threshold`` fails the run with the offending stack, so this can gate
+CI. A deliberate ``time.sleep`` is checked first to prove the detector
+fires.
+
+    python benchmarks/loop_blocking.py --wallets 2000 --txs 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import solcrawl
+from database import Database
+from loop_monitor import LoopBlockedError, LoopMonitor
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, chat_id, text):
+        self.sent += 1
+
+
+class FakeMessage:
+    async def reply_text(self, text):
+        pass
+
+
+def fake_update():
+    return SimpleNamespace(message=FakeMessage())
+
+
+def make_tx(i, wallets):
+    accounts = random.sample(wallets, 3) + [f"Other{i:040d}"] * 20
+    return {
+        "signature": f"sig{i:060d}",
+        "timestamp": int(time.time()),
+        "type": "SWAP",
+        "accountData": [{"account": account} for account in accounts],
+        "tokenTransfers": [{
+            "mint": "So11111111111111111111111111111111111111112",
+            "tokenAmount": 1.5,
+            "fromUserAccount": accounts[0],
+            "toUserAccount": accounts[-1]
+        }]
+    }
+
+
+async def main(args) -> int:
+    monitor = LoopMonitor(threshold=args.threshold)
+
+    try:
+        async with monitor.assert_nonblocking():
+            time.sleep(args.threshold * 2)
+        print("detector: FAILED to flag a deliberate time.sleep")
+        return 1
+    except LoopBlockedError:
+        print("detector: flags a deliberate time.sleep")
+
+    monitor = LoopMonitor(threshold=args.threshold)
+    with tempfile.TemporaryDirectory() as tmp:
+        solcrawl.db = Database(os.path.join(tmp, "check.db"))
+        await solcrawl.db.connect()
+        wallets = [f"Wallet{i:038d}" for i in range(args.wallets)]
+        app = SimpleNamespace(bot=FakeBot())
+        try:
+            async with monitor.assert_nonblocking():
+                for i, address in enumerate(wallets):
+                    await solcrawl.save_wallet(address, f"w{i}")
+                for i in range(args.txs):
+                    await solcrawl.process_transaction(make_tx(i, wallets), app)
+                for i in range(0, args.wallets, max(args.wallets // 50, 1)):
+                    context = SimpleNamespace(args=[f"w{i}"])
+                    await solcrawl.wallet_status_command(fake_update(), context)
+                await solcrawl.list_wallets_command(fake_update(), SimpleNamespace(args=[]))
+        except LoopBlockedError as e:
+            print(f"handlers: {e}")
+            return 1
+        finally:
+            await solcrawl.db.close()
+
+    print(f"handlers: no stall over {args.threshold * 1000:.0f} ms "
+          f"({args.txs} transactions, {app.bot.sent} alerts, worst {monitor.max_stall * 1000:.1f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wallets", type=int, default=500)
+    parser.add_argument("--txs", type=int, default=200)
+    parser.add_argument("--threshold", type=float, default=0.1, help="seconds")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,119 @@
+"""Startup cost: import time of ``bot`` and time until webhooks are accepted
+
+Part one runs ``python -X importtime -c "import bot"`` and lists the
+slowest imports by cumulative time. Part two launches ``bot.py`` against
+a throwaway database and port and measures, from process spawn:
+
+* accepting – first HTTP response on /webhook (deliveries are buffered)
+* ready     – "Webhook pipeline ready" logged (buffered work is processed)
+
+Telegram initialisation is not needed for either milestone, so this runs
+offline; the bot process is killed once both are observed.
+
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(top: int):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import bot"],
+        cwd=ROOT, capture_output=True, text=True, env=dict(os.environ, LOG_FILE="")
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line.replace("import time:", "").split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+
+    total = next((cumulative for cumulative, _, name in rows if name == "bot"), 0)
+    print(f"import bot: {total / 1000:.0f} ms")
+    for cumulative, _, name in sorted(rows, reverse=True)[1:top + 1]:
+        print(f"  {cumulative / 1000:7.1f} ms  {name}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_once(timeout: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        port = free_port()
+        log_file = os.path.join(tmp, "bot.log")
+        env = dict(
+            os.environ,
+            DATABASE_URL=os.path.join(tmp, "bench.db"),
+            WEBHOOK_HOST="127.0.0.1",
+            WEBHOOK_PORT=str(port),
+            LOG_FILE=log_file,
+            PROFILE_DIR=os.path.join(tmp, "profiles"),
+            # Nothing below talks to Helius; keep background jobs off
+            HELIUS_API_KEY="benchmark",
+            HELIUS_WEBHOOK_IDS="",
+            INGEST_MODE="webhook",
+            BACKFILL_INTERVAL="0",
+            RECONCILE_INTERVAL="0",
+        )
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "bot.py"], cwd=ROOT, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        accepting = ready = None
+        try:
+            while time.perf_counter() - started < timeout and not (accepting and ready):
+                if accepting is None:
+                    try:
+                        urllib.request.urlopen(
+                            urllib.request.Request(f"http://127.0.0.1:{port}/webhook", data=b"[]"), timeout=1
+                        )
+                        accepting = time.perf_counter() - started
+                    except urllib.error.HTTPError:
+                        accepting = time.perf_counter() - started
+                    except (urllib.error.URLError, ConnectionError):
+                        pass
+                if ready is None and os.path.exists(log_file):
+                    with open(log_file, encoding="utf-8") as f:
+                        if "Webhook pipeline ready" in f.read():
+                            ready = time.perf_counter() - started
+                time.sleep(0.005)
+        finally:
+            process.kill()
+            process.wait()
+        return accepting, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    import_profile(args.top)
+
+    results = [measure_once(args.timeout) for _ in range(args.runs)]
+    for label, index in (("accepting webhooks", 0), ("pipeline ready", 1)):
+        values = [r[index] for r in results if r[index] is not None]
+        if values:
+            print(f"{label}: median {statistics.median(values) * 1000:.0f} ms over {len(values)} runs")
+        else:
+            print(f"{label}: not reached within {args.timeout}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Command round-trip latency: Telegram long polling vs webhook updates
+
+Runs PalmBot against a local Bot API stand-in (``TELEGRAM_BASE_URL`` is
+pointed at it) that serves ``getUpdates`` long polls, ``setWebhook`` and
+``sendMessage``. Commands arrive at ``--rate`` per second; latency is
+measured from the moment the stand-in has an update to the moment the
+bot's reply reaches it. In webhook mode updates are pushed to the real
+WebhookServer route with the secret token header.
+
+``--rtt`` models the network round trip to Telegram: each request and
+response crosses half of it. With polling, updates that arrive while a
+``getUpdates`` response is in flight wait for the next poll. Updates are
+handled one at a time and each reply takes ``rtt / 2`` to send, so rates
+near ``2 / rtt`` measure queueing rather than delivery.
+
+``--spam N`` has one user fire N uncached /portfolio commands (Helius
+answering after ``--helius-delay``) as the run starts; the other users'
+latency shows whether they wait behind it. ``--sequential`` turns off
+concurrent update handling for comparison.
+
+    python benchmarks/telegram_latency.py --commands 300 --rate 10 --rtt 0.1
+    python benchmarks/telegram_latency.py --spam 10 --helius-delay 2 --sequential
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+import aiohttp
+
+from config import settings
+from database import Database
+from telegram_bot import PalmBot
+from webhook_server import WebhookServer
+
+HOST, PORT = "127.0.0.1", 18775
+COMMANDS = ("/menu", "/listwallets")
+SPAMMER = 1
+
+
+class BotApiStandIn:
+    """Just enough of the Bot API for PalmBot to poll, take webhooks and reply"""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.pending = asyncio.Queue()
+        self.webhook = None  # (url, secret token)
+        self.sent_at = {}
+        self.replied = {}
+        self.answered = 0
+        self.all_replied = asyncio.Event()
+        self.expected = 0
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self.handle)
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        await asyncio.sleep(self.rtt / 2)  # request on its way to Telegram
+
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Palm", "username": "palm_bench_bot"}
+        elif method == "setWebhook":
+            self.webhook = (params["url"], params.get("secret_token"))
+            result = True
+        elif method == "deleteWebhook":
+            self.webhook = None
+            result = True
+        elif method == "getUpdates":
+            result = []
+            try:
+                result.append(await asyncio.wait_for(self.pending.get(), float(params.get("timeout") or 0)))
+                while not self.pending.empty():
+                    result.append(self.pending.get_nowait())
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.sleep(self.rtt / 2)  # response on its way back
+        elif method in ("sendMessage", "sendDocument"):
+            chat_id = int(params["chat_id"])
+            if chat_id in self.sent_at and chat_id not in self.replied:
+                self.replied[chat_id] = time.perf_counter()
+                self.answered += 1
+                if self.answered >= self.expected:
+                    self.all_replied.set()
+            result = {"message_id": chat_id, "date": int(time.time()), "text": params.get("text", ""),
+                      "chat": {"id": chat_id, "type": "private"}}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def reset(self, expected: int):
+        self.sent_at.clear()
+        self.replied.clear()
+        self.answered = 0
+        self.all_replied.clear()
+        self.expected = expected
+
+
+class SlowHelius:
+    """Helius stand-in whose portfolio lookups take ``delay`` seconds"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def get_portfolio(self, address):
+        await asyncio.sleep(self.delay)
+        return 1.0, []
+
+
+def make_update(i: int, command: str = None, chat_id: int = None) -> dict:
+    command = command or COMMANDS[i % len(COMMANDS)]
+    chat_id = chat_id or 1000 + i  # one chat per command so replies can be matched
+    return {
+        "update_id": i + 1,
+        "message": {
+            "message_id": i + 1,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "bench"},
+            "text": command,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command.split()[0])}]
+        }
+    }
+
+
+def report(name, stand_in, bot):
+    latencies = sorted(stand_in.replied[chat] - sent for chat, sent in stand_in.sent_at.items()
+                       if chat in stand_in.replied)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:>8}: n={len(latencies)} p50={statistics.median(latencies) * 1000:.1f}ms "
+          f"p95={p95 * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms")
+    if bot.processor:
+        for command, stats in sorted(bot.processor.stats()["handlers"].items()):
+            print(f"{'':>10}/{command}: n={stats['count']} p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms "
+                  f"wait p95={stats['wait_p95_ms']}ms")
+
+
+async def run(mode, stand_in, db, server, args):
+    stand_in.reset(args.commands)
+    bot = await PalmBot.create(settings.telegram_bot_token, db, SlowHelius(args.helius_delay))
+    if mode == "webhook":
+        server.telegram_handler = bot.process_webhook_update
+        await bot.start(f"http://{HOST}:{PORT + 1}{settings.telegram_webhook_path}", settings.telegram_secret_token)
+    else:
+        await bot.start()
+    assert bot.mode == mode, f"bot started in {bot.mode} mode"
+
+    async with aiohttp.ClientSession() as session:
+        async def push(update):
+            await asyncio.sleep(stand_in.rtt / 2)
+            url, secret = stand_in.webhook
+            async with session.post(url, json=update,
+                                    headers={"X-Telegram-Bot-Api-Secret-Token": secret}) as response:
+                assert response.status == 200, response.status
+
+        async def deliver(update):
+            if mode == "webhook":
+                pushes.append(asyncio.create_task(push(update)))
+            else:
+                stand_in.pending.put_nowait(update)
+
+        pushes = []
+        for j in range(args.spam):
+            await deliver(make_update(100000 + j, f"/portfolio {mode}{j}", SPAMMER))
+        for i in range(args.commands):
+            update = make_update(i)
+            stand_in.sent_at[update["message"]["chat"]["id"]] = time.perf_counter()
+            await deliver(update)
+            await asyncio.sleep(1 / args.rate)
+        await asyncio.gather(*pushes)
+        await asyncio.wait_for(stand_in.all_replied.wait(), timeout=60)
+
+    server.telegram_handler = None
+    await bot.stop()
+    report(mode, stand_in, bot)
+
+
+async def main(args):
+    stand_in = BotApiStandIn(args.rtt)
+    runner = web.AppRunner(stand_in.app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+    settings.telegram_base_url = f"http://{HOST}:{PORT}"
+    settings.webhook_host, settings.webhook_port, settings.webhook_workers = HOST, PORT + 1, 1
+    if args.sequential:
+        settings.command_workers = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"))
+        await db.connect()
+        for mode in ("polling", "webhook"):
+            for j in range(args.spam):
+                await db.add_subscription(SPAMMER, f"{mode}Whale{j:030d}", f"{mode}{j}")
+        server = WebhookServer(db)
+        await server.listen()
+        try:
+            for mode in ("polling", "webhook"):
+                await run(mode, stand_in, db, server, args)
+        finally:
+            await server.runner.cleanup()
+            await db.close()
+
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=10, help="commands per second")
+    parser.add_argument("--rtt", type=float, default=0.1, help="modelled round trip to Telegram (s)")
+    parser.add_argument("--spam", type=int, default=0, help="slow /portfolio commands from one user")
+    parser.add_argument("--helius-delay", type=float, default=2.0, help="seconds per portfolio lookup")
+    parser.add_argument("--sequential", action="store_true", help="handle one update at a time")
+    asyncio.run(main(parser.parse_args()))
@@ -1,54 +1,112 @@
 import asyncio
+import importlib
 import logging
 from contextlib import asynccontextmanager
 from config import settings
 from database import Database
 from webhook_server import WebhookServer
-from telegram_bot import PalmBot
 from logger import configure_logging
 from helius_client import HeliusClient
 from resource_monitor import ResourceMonitor
 from connection_pool import HTTPSessionManager
+from memory_diagnostics import memory_diagnostics
+from loop_monitor import loop_monitor
+from rpc_router import rpc_pool
+from reconciler import Reconciler
+from webhook_sync import WebhookSync
+from wallet_registry import WalletRegistry
 
-# Configure logging
+# Logging and sessions are set up under __main__ / in main(): ingest workers
+# are spawned, so they re-import this module and must not open bot.log
 logger = logging.getLogger(__name__)
-configure_logging()
-session_manager = HTTPSessionManager()
 
 @asynccontextmanager
-async def lifespan():
+async def lifespan(db: Database, session_manager: HTTPSessionManager):
     """Manage application lifecycle with proper resource cleanup"""
-    db = Database(settings.database_url)
     try:
-        await db.connect()  # Explicit connection
-        logger.info("Database connection established")
         async with HeliusClient(settings.helius_api_key, session_manager) as helius:
-            yield db, helius  # Yield both db and helius
+            yield helius
     finally:
         await db.close()
         logger.info("Database connection closed")
 
+async def create_bot(db: Database, helius: HeliusClient, webhook_sync: WebhookSync, registry: WalletRegistry):
+    """Import and initialize the Telegram bot (a network round trip to Telegram)"""
+    # telegram is the heaviest import; load it in a thread so the loop keeps accepting webhooks
+    telegram_bot = await asyncio.to_thread(importlib.import_module, "telegram_bot")
+    return await telegram_bot.PalmBot.create(settings.telegram_bot_token, db, helius, webhook_sync, registry)
+
+async def start_bot(bot, webhook_server: WebhookServer):
+    """Start the bot in the configured update mode, polling when webhooks can't be served"""
+    if bot.processor:
+        webhook_server.command_stats = bot.processor.stats
+    if settings.telegram_mode != "webhook":
+        await bot.start()
+        return
+    if not settings.telegram_webhook_url:
+        logger.warning("TELEGRAM_MODE=webhook but TELEGRAM_WEBHOOK_URL is not set; polling instead")
+    elif not webhook_server.serves_http:
+        logger.warning("Telegram webhooks need the HTTP server in this process; polling instead")
+    else:
+        webhook_server.telegram_handler = bot.process_webhook_update
+        await bot.start(settings.telegram_webhook_url, settings.telegram_secret_token)
+        if bot.mode != "webhook":
+            webhook_server.telegram_handler = None
+        return
+    await bot.start()
+
 async def main():
     """Main application entry point with proper error handling"""
-    # Initialize
+    # Accept (and buffer) webhooks before anything slow happens
+    db = Database(settings.database_url)
+    webhook_server = WebhookServer(db)
+    await webhook_server.listen()
+
     resource_monitor = ResourceMonitor(interval=300)  # Log every 5 minutes
     await resource_monitor.start()
-    async with lifespan() as (db, helius):
+    await memory_diagnostics.start()
+    await loop_monitor.start()
+
+    async with lifespan(db, HTTPSessionManager()) as helius:
         bot = None
-        webhook_server = None
+        bot_task = None
+        reconciler = None
+        webhook_sync = None
         
         try:
             # Initialize components
             logger.info("Initializing application components")
-            bot = await PalmBot.create(settings.telegram_bot_token, db, helius)
-            webhook_server = WebhookServer(bot.application, db)
-            
-            # Start components
-            logger.info("Starting webhook server")
+            webhook_sync = WebhookSync(
+                db, helius,
+                [wid.strip() for wid in settings.helius_webhook_ids.split(",") if wid.strip()],
+                debounce=settings.webhook_sync_debounce,
+                max_addresses=settings.helius_webhook_max_addresses
+            )
+            # Telegram initialize and DB connect + migrate are independent
+            bot_task = asyncio.create_task(create_bot(db, helius, webhook_sync, webhook_server.registry))
+            await db.connect()
+            logger.info("Database connection established")
+            adopted = await db.adopt_unsubscribed_wallets(settings.telegram_chat_id)
+            if adopted:
+                logger.info(f"Subscribed the main chat to {adopted} wallets without subscribers")
+
+            logger.info("Starting webhook pipeline")
             await webhook_server.start()
-            
+
+            bot = await bot_task
             logger.info("Starting Telegram bot")
-            await bot.start()
+            await start_bot(bot, webhook_server)
+
+            reconciler = Reconciler(
+                db, helius,
+                interval=settings.reconcile_interval,
+                chunk_size=settings.reconcile_chunk_size,
+                concurrency=settings.reconcile_concurrency
+            )
+            await reconciler.start()
+            webhook_server.reconciler_stats = reconciler.stats
+            await webhook_sync.start()
+            webhook_server.webhook_sync_stats = webhook_sync.stats
             
             # Keep application running
             logger.info("Application startup complete")
@@ -64,19 +122,31 @@ async def main():
             """Enhanced shutdown sequence"""
             logger.info("Starting application shutdown")
             
+            if reconciler:
+                await reconciler.stop()
+            if webhook_sync:
+                await webhook_sync.stop()
+
+            if bot_task and not bot_task.done():
+                bot_task.cancel()
+                await asyncio.gather(bot_task, return_exceptions=True)
+
             # 1. Stop webhook server first
-            if webhook_server:
-                await webhook_server.stop()
+            await webhook_server.stop()
             
             # 2. Stop Telegram bot
             if bot:
                 await bot.stop()
             
+            await memory_diagnostics.stop()
+            await loop_monitor.stop()
+
             # 3. Close database
             if db:
                 await db.close()
             
             # 4. Close all HTTP connections
+            await rpc_pool.close()
             if hasattr(webhook_server, 'session_manager'):
                 await webhook_server.session_manager.stop()
             
@@ -94,10 +164,13 @@ async def main():
             logger.info("Application shutdown complete")
 
 if __name__ == "__main__":
+    log_listener = configure_logging()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Application terminated by user")
     except Exception as e:
         logger.critical(f"Fatal error: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+    finally:
+        log_listener.stop()
\ No newline at end of file
@@ -1,5 +1,6 @@
 # config.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
+import hashlib
 
 class Settings(BaseSettings):
     telegram_bot_token: str
@@ -11,14 +12,116 @@ class Settings(BaseSettings):
     CACHE_TTL: int 
     webhook_secret: str
 
+    # Webhook ingestion
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_workers: int = 1  # >1 forks ingest processes sharing the port
+    admin_port: int = 0  # /metrics and Telegram webhooks when webhook_workers > 1; 0 = webhook_port + 1
+    registry_refresh_interval: int = 30
+    ingest_mode: str = "webhook"  # or "websocket" (logsSubscribe, no public URL needed)
+    solana_ws_url: str = ""  # defaults to the Helius RPC endpoint over wss://
+    ws_connections: int = 2  # sockets the subscriptions are spread over
+    ws_batch_delay: float = 0.05  # seconds to collect signatures per fetch
+    helius_webhook_ids: str = ""  # comma-separated; keeps their accountAddresses in sync
+    webhook_sync_debounce: float = 5.0
+    helius_webhook_max_addresses: int = 100_000
+    executor_partitions: int = 16
+    executor_max_concurrency: int = 8
+    max_in_flight_requests: int = 64
+    shed_queue_depth: int = 500  # start dropping generic alerts
+    max_queue_depth: int = 2000  # refuse deliveries with 503
+    overload_retry_after: int = 5
+
+    # Alert coalescing for hot wallets
+    digest_window: int = 60  # seconds
+    digest_threshold: int = 20  # alerts per window before switching to digests
+    digest_interval: int = 60  # seconds between digests
+
+    # Send alerts before token metadata resolves, then edit them in place
+    two_phase_alerts: bool = True
+    enrichment_deadline: float = 5.0
+
+    # Telegram updates: "polling" or "webhook" (served by the Helius webhook server)
+    telegram_mode: str = "polling"
+    telegram_webhook_url: str = ""  # public URL Telegram posts to; must reach TELEGRAM_WEBHOOK_PATH
+    telegram_webhook_path: str = "/telegram"
+    telegram_webhook_secret: str = ""  # defaults to a hash of the bot token
+    telegram_base_url: str = ""  # self-hosted Bot API server, e.g. http://localhost:8081
+
+    # Telegram command handling (0 command workers = one update at a time)
+    command_workers: int = 8  # commands answered from the database
+    command_network_workers: int = 4  # commands that wait on Helius / RPC
+    command_queue_per_chat: int = 10  # further updates from a busy sender are dropped
+
+    # /importwallets limits
+    wallet_import_max: int = 5000  # wallets per file
+    wallet_import_max_bytes: int = 2_000_000
+
+    # Alert routing (notification_rules table, re-read periodically)
+    notification_rules_reload: int = 30  # seconds
+
+    # Telegram outbox
+    outbox_max_attempts: int = 8
+    telegram_send_interval: float = 0.05  # seconds between sends
+    admin_user_ids: str = ""  # comma-separated Telegram user ids
+
+    # Logging
+    log_file: str = "bot.log"
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_backup_count: int = 5
+    log_json: bool = False
+    log_sample_rates: str = ""  # e.g. "webhook_server=0.1,parse_data=0.05"
+
+    # Profiling (PROFILE_SAMPLE_RATE=0.01 traces 1% of transactions)
+    profile_sample_rate: float = 0.0
+    profile_dir: str = "profiles"
+
+    # Memory diagnostics (tracemalloc adds overhead, so it is opt-in)
+    memory_diagnostics: bool = False
+    memory_diagnostics_interval: int = 600
+    memory_diagnostics_top_n: int = 10
+
+    # Warn (with the offending stack) when the event loop stalls this long; 0 disables
+    loop_block_threshold: float = 0.1  # seconds
+
+    # Shared RPC budget, requests per second per endpoint host
+    rpc_rate_limits: str = "mainnet.helius-rpc.com=10,api.helius.xyz=5,api.mainnet-beta.solana.com=4"
+    rpc_default_rate: float = 5.0
+
+    # RPC endpoint pool (Helius RPC + SOLANA_CLUSTER_URL + extras)
+    rpc_extra_urls: str = ""  # comma-separated
+    rpc_hedge_requests: bool = True  # hedge interactive / live-alert reads past the primary's p95
+    rpc_hedge_min_delay: float = 0.05
+
+    # Missed-activity backfill via getSignaturesForAddress (0 disables)
+    backfill_interval: int = 300  # keep below the 900s dedupe window
+    backfill_max_signatures: int = 500  # per wallet per sweep
+    backfill_batch_size: int = 100  # signatures per parsed-transactions call
+    backfill_concurrency: int = 4
+
+    # Balance/holdings reconciliation sweep (0 disables)
+    reconcile_interval: int = 3600  # pause between full passes
+    reconcile_chunk_size: int = 100  # getMultipleAccounts takes at most 100 keys
+    reconcile_concurrency: int = 4  # parallel holdings fetches
+
     @property
     def das_endpoint(self) -> str:
         return f"https://mainnet.helius-rpc.com/?api-key={self.helius_api_key}"
 
+    @property
+    def telegram_secret_token(self) -> str:
+        """X-Telegram-Bot-Api-Secret-Token value (1-256 chars of A-Z, a-z, 0-9, _ and -)"""
+        return self.telegram_webhook_secret or hashlib.sha256(self.telegram_bot_token.encode()).hexdigest()[:32]
+
+    @property
+    def telegram_api_url(self) -> str:
+        """Bot API root: the self-hosted server when configured, else api.telegram.org"""
+        return (self.telegram_base_url or "https://api.telegram.org").rstrip("/")
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False
     )
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
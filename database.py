@@ -1,6 +1,6 @@
 import aiosqlite
 from contextlib import asynccontextmanager
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, AsyncIterator, Tuple
 import json
 from datetime import datetime
 import asyncio
@@ -13,6 +13,10 @@ class Database:
     def __init__(self, db_path: str):
         self.db_path = db_path.split("///")[-1]
         self.pool: Optional[aiosqlite.Connection] = None
+        # One connection in autocommit mode is shared by every coroutine, so
+        # writes take turns: a BEGIN inside another coroutine's transaction
+        # fails, and a commit would end someone else's half-done one
+        self._write_lock = asyncio.Lock()
 
     async def connect(self):
         """Create thread-safe connection pool"""
@@ -42,6 +46,24 @@ class Database:
             finally:
                 self.pool = None
 
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Run several statements atomically; rolled back if the block raises"""
+        async with self._write_lock:
+            await self.pool.execute("BEGIN")
+            try:
+                yield self.pool
+                await self.pool.execute("COMMIT")
+            except BaseException:
+                if self.pool.in_transaction:
+                    await self.pool.execute("ROLLBACK")
+                raise
+
+    async def _write(self, sql: str, params=()) -> aiosqlite.Cursor:
+        """A single statement, committed on its own outside any open transaction"""
+        async with self._write_lock:
+            return await self.pool.execute(sql, params)
+
     async def _migrate(self):
         """Initialize database schema with proper cursor management"""
         try:
@@ -58,7 +80,8 @@ class Database:
                     sol_balance REAL DEFAULT 0,
                     tokens TEXT,
                     last_asset_check INTEGER DEFAULT 0,
-                    last_activity_at INTEGER DEFAULT 0
+                    last_activity_at INTEGER DEFAULT 0,
+                    last_signature TEXT
                 )''')
 
             # Get existing columns
@@ -70,10 +93,85 @@ class Database:
             # Add missing columns
             for col, col_type in [('last_activity_at', 'INTEGER'),
                                 ('tokens', 'TEXT'),
-                                ('sol_balance', 'REAL')]:
+                                ('sol_balance', 'REAL'),
+                                ('last_signature', 'TEXT')]:
                 if col not in columns:
                     await self.pool.execute(f"ALTER TABLE wallets ADD COLUMN {col} {col_type}")
 
+            # Telegram delivery queue and messages that exhausted their retries
+            await self.pool.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id TEXT NOT NULL,
+                    method TEXT NOT NULL DEFAULT 'sendMessage',
+                    payload TEXT NOT NULL,
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL DEFAULT 0,
+                    last_error TEXT,
+                    created_at INTEGER DEFAULT 0
+                )''')
+            await self.pool.execute('''
+                CREATE TABLE IF NOT EXISTS dead_letters (
+                    id INTEGER PRIMARY KEY,
+                    chat_id TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    attempts INTEGER DEFAULT 0,
+                    last_error TEXT,
+                    created_at INTEGER DEFAULT 0,
+                    failed_at INTEGER DEFAULT 0
+                )''')
+
+            # Recently processed signatures, kept across restarts for dedupe
+            await self.pool.execute('''
+                CREATE TABLE IF NOT EXISTS seen_signatures (
+                    signature TEXT PRIMARY KEY,
+                    seen_at REAL NOT NULL
+                )''')
+
+            # Small key/value store for resumable background jobs
+            await self.pool.execute('''
+                CREATE TABLE IF NOT EXISTS job_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )''')
+
+            # Mint -> Metaplex metadata PDA, so restarts skip the bump-seed search
+            await self.pool.execute('''
+                CREATE TABLE IF NOT EXISTS metadata_pdas (
+                    mint TEXT PRIMARY KEY,
+                    pda TEXT NOT NULL
+                ) WITHOUT ROWID''')
+
+            # Which chats follow which wallets (aliases are per chat)
+            await self.pool.execute('''
+                CREATE TABLE IF NOT EXISTS subscriptions (
+                    chat_id TEXT NOT NULL,
+                    address TEXT NOT NULL,
+                    alias TEXT NOT NULL,
+                    created_at INTEGER DEFAULT 0,
+                    PRIMARY KEY (chat_id, address),
+                    UNIQUE (chat_id, alias)
+                )''')
+            await self.pool.execute(
+                "CREATE INDEX IF NOT EXISTS idx_subscriptions_address ON subscriptions (address)"
+            )
+
+            # Alert routing rules; empty criteria match everything
+            await self.pool.execute('''
+                CREATE TABLE IF NOT EXISTS notification_rules (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_ids TEXT NOT NULL,
+                    tx_type TEXT,
+                    wallet TEXT,
+                    tag TEXT,
+                    mint TEXT,
+                    source TEXT,
+                    min_amount REAL,
+                    max_amount REAL,
+                    enabled INTEGER DEFAULT 1
+                )''')
+
             # Commit transaction
             await self.pool.execute("COMMIT")
             
@@ -93,26 +191,144 @@ class Database:
             result = await cursor.fetchone()
             return dict(result) if result else None
 
+    async def get_wallets_by_addresses(self, addresses: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Tracked wallets among ``addresses``, keyed by address"""
+        addresses = list(dict.fromkeys(addresses))
+        wallets = {}
+        for start in range(0, len(addresses), 500):  # stay under SQLite's bound-variable limit
+            chunk = addresses[start:start + 500]
+            async with self.pool.execute(
+                f"SELECT * FROM wallets WHERE address IN ({','.join('?' * len(chunk))})", chunk
+            ) as cursor:
+                for row in await cursor.fetchall():
+                    wallets[row['address']] = dict(row)
+        return wallets
+
+    async def get_subscription(self, chat_id: str, identifier: str) -> Optional[Dict[str, Any]]:
+        """A wallet the chat follows, by address or the chat's alias for it"""
+        async with self.pool.execute(
+            """SELECT w.address, s.alias, w.last_checked, w.tx_count, w.sol_balance, w.tokens,
+                      w.last_asset_check, w.last_activity_at,
+                      MAX(w.last_activity_at, w.last_asset_check) AS last_modified
+               FROM subscriptions s JOIN wallets w ON w.address = s.address
+               WHERE s.chat_id = ? AND (s.address = ? OR s.alias = LOWER(?))""",
+            (str(chat_id), identifier, identifier)
+        ) as cursor:
+            result = await cursor.fetchone()
+            return dict(result) if result else None
+
+    async def list_subscriptions(self, chat_id: str) -> List[Dict[str, Any]]:
+        async with self.pool.execute(
+            "SELECT address, alias FROM subscriptions WHERE chat_id = ? ORDER BY alias", (str(chat_id),)
+        ) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def add_subscription(self, chat_id: str, address: str, alias: str) -> None:
+        """Follow a wallet from a chat, tracking it if no chat did yet"""
+        alias = alias.lower()
+        now = int(datetime.now().timestamp())
+        try:
+            async with self.transaction() as conn:
+                # wallets.alias is global and another chat may already use this name
+                for candidate in (alias, f"{alias}-{address[:4].lower()}", address.lower()):
+                    await conn.execute(
+                        """INSERT INTO wallets (address, alias, last_checked) VALUES (?, ?, ?)
+                           ON CONFLICT DO NOTHING""",
+                        (address, candidate, now)
+                    )
+                    async with conn.execute("SELECT 1 FROM wallets WHERE address = ?", (address,)) as check:
+                        if await check.fetchone():
+                            break
+                await conn.execute(
+                    "INSERT INTO subscriptions (chat_id, address, alias, created_at) VALUES (?, ?, ?, ?)",
+                    (str(chat_id), address, alias, now)
+                )
+        except aiosqlite.IntegrityError as e:
+            raise ValueError(f"Alias '{alias}' or this wallet is already tracked in this chat") from e
+
+    async def add_subscriptions(self, chat_id: str, wallets: List[Tuple[str, str]]) -> List[str]:
+        """Follow many ``(address, alias)`` pairs in one transaction; returns newly tracked addresses
+
+        Aliases clashing with another chat's wallet fall back as in
+        ``add_subscription``; a clash within this chat rolls everything back.
+        """
+        now = int(datetime.now().timestamp())
+        wallets = [(address, alias.lower()) for address, alias in wallets]
+        try:
+            async with self.transaction() as conn:
+                # Read inside the lock so a concurrent add cannot change what counts as new
+                tracked = await self.get_wallets_by_addresses([address for address, _ in wallets])
+                # Each pass only inserts the wallets the previous alias candidate left out
+                for candidates in (
+                    [(address, alias, now) for address, alias in wallets],
+                    [(address, f"{alias}-{address[:4].lower()}", now) for address, alias in wallets],
+                    [(address, address.lower(), now) for address, _ in wallets]
+                ):
+                    await conn.executemany(
+                        """INSERT INTO wallets (address, alias, last_checked) VALUES (?, ?, ?)
+                           ON CONFLICT DO NOTHING""",
+                        candidates
+                    )
+                await conn.executemany(
+                    "INSERT INTO subscriptions (chat_id, address, alias, created_at) VALUES (?, ?, ?, ?)",
+                    [(str(chat_id), address, alias, now) for address, alias in wallets]
+                )
+        except aiosqlite.IntegrityError as e:
+            raise ValueError(f"An alias or wallet is already tracked in this chat: {str(e)}") from e
+        return [address for address, _ in wallets if address not in tracked]
+
+    async def iter_subscriptions(self, chat_id: str, batch_size: int = 1000) -> AsyncIterator[List[Dict[str, Any]]]:
+        """A chat's subscriptions in batches, for exports too large to hold as dicts at once"""
+        async with self.pool.execute(
+            "SELECT address, alias FROM subscriptions WHERE chat_id = ? ORDER BY alias", (str(chat_id),)
+        ) as cursor:
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield [dict(row) for row in rows]
+
+    async def remove_subscription(self, chat_id: str, address: str) -> bool:
+        """Unfollow a wallet; returns True if no chat follows it any more (it was untracked)"""
+        async with self.transaction() as conn:
+            await conn.execute(
+                "DELETE FROM subscriptions WHERE chat_id = ? AND address = ?", (str(chat_id), address)
+            )
+            cursor = await conn.execute(
+                """DELETE FROM wallets WHERE address = ?
+                   AND NOT EXISTS (SELECT 1 FROM subscriptions WHERE address = ?)""",
+                (address, address)
+            )
+        return cursor.rowcount > 0
+
+    async def adopt_unsubscribed_wallets(self, chat_id: str) -> int:
+        """Subscribe ``chat_id`` to tracked wallets no chat follows (pre-subscription data)"""
+        cursor = await self._write(
+            """INSERT OR IGNORE INTO subscriptions (chat_id, address, alias, created_at)
+               SELECT ?, address, alias, ? FROM wallets
+               WHERE address NOT IN (SELECT address FROM subscriptions)""",
+            (str(chat_id), int(datetime.now().timestamp()))
+        )
+        return cursor.rowcount
+
     async def save_wallet(self, address: str, alias: str) -> None:
         try:
-            await self.pool.execute(
+            await self._write(
                 "INSERT INTO wallets (address, alias, last_checked) VALUES (?, ?, ?)",
                 (address, alias.lower(), int(datetime.now().timestamp()))
             )
-            await self.pool.commit()
         except aiosqlite.IntegrityError as e:
             raise ValueError(f"Alias '{alias}' already exists") from e
 
     async def remove_wallet(self, address: str) -> None:
-        await self.pool.execute("DELETE FROM wallets WHERE address = ?", (address,))
-        await self.pool.commit()
+        await self._write("DELETE FROM wallets WHERE address = ?", (address,))
 
     async def load_all_wallets(self) -> List[Dict[str, Any]]:
         async with self.pool.execute("SELECT * FROM wallets") as cursor:
             return [dict(row) for row in await cursor.fetchall()]
 
     async def update_portfolio(self, address: str, sol_balance: float, tokens: List[Dict]) -> None:
-        await self.pool.execute(
+        await self._write(
             """UPDATE wallets 
             SET sol_balance = ?, 
                 tokens = ?,
@@ -120,18 +336,195 @@ class Database:
             WHERE address = ?""",
             (sol_balance, json.dumps(tokens), int(datetime.now().timestamp()), address)
             )
-        await self.pool.commit()
 
-    async def record_wallet_activity(self, address: str) -> None:
-        await self.pool.execute('''
+    async def update_portfolios(self, rows: List[Tuple[str, float, List[Dict]]]) -> None:
+        """``update_portfolio`` for many ``(address, sol_balance, tokens)`` rows in one commit"""
+        now = int(datetime.now().timestamp())
+        async with self.transaction() as conn:
+            await conn.executemany(
+                "UPDATE wallets SET sol_balance = ?, tokens = ?, last_asset_check = ? WHERE address = ?",
+                [(sol_balance, json.dumps(tokens), now, address) for address, sol_balance, tokens in rows]
+            )
+
+    async def record_wallet_activity(self, address: str, timestamp: Optional[int] = None) -> None:
+        """Count a transaction; ``timestamp`` is its block time (backfilled txs are older than now)"""
+        await self._write('''
             UPDATE wallets 
             SET 
-                last_activity_at = ?,
+                last_activity_at = MAX(COALESCE(last_activity_at, 0), ?),
                 tx_count = tx_count + 1
             WHERE address = ?
-        ''', (int(datetime.now().timestamp()), address))
-        await self.pool.commit()
+        ''', (int(timestamp or datetime.now().timestamp()), address))
+
+    async def get_wallets_after(self, address: str, limit: int) -> List[Dict[str, Any]]:
+        """Next chunk of wallets in address order, for resumable sweeps"""
+        async with self.pool.execute(
+            "SELECT address, sol_balance, tokens FROM wallets WHERE address > ? ORDER BY address LIMIT ?",
+            (address, limit)
+        ) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def get_job_state(self, key: str) -> Optional[str]:
+        async with self.pool.execute("SELECT value FROM job_state WHERE key = ?", (key,)) as cursor:
+            row = await cursor.fetchone()
+            return row['value'] if row else None
+
+    async def set_job_state(self, key: str, value: str) -> None:
+        await self._write(
+            "INSERT OR REPLACE INTO job_state (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    async def set_job_states(self, values: Dict[str, str]) -> None:
+        """Several job_state keys in one transaction (a cursor and its counters)"""
+        async with self.transaction() as conn:
+            await conn.executemany(
+                "INSERT OR REPLACE INTO job_state (key, value) VALUES (?, ?)", list(values.items())
+            )
+
+    async def get_signature_cursors(self) -> List[Dict[str, Any]]:
+        async with self.pool.execute("SELECT address, last_signature FROM wallets") as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def set_last_signature(self, address: str, signature: str) -> None:
+        await self._write(
+            "UPDATE wallets SET last_signature = ? WHERE address = ?", (signature, address)
+        )
+
+    async def save_seen_signatures(self, entries: List[tuple]) -> None:
+        """Replace the persisted dedupe window with (signature, seen_at) pairs"""
+        async with self.transaction() as conn:
+            await conn.execute("DELETE FROM seen_signatures")
+            await conn.executemany(
+                "INSERT OR REPLACE INTO seen_signatures (signature, seen_at) VALUES (?, ?)", entries
+            )
+
+    async def load_seen_signatures(self, since: float) -> List[tuple]:
+        async with self.pool.execute(
+            "SELECT signature, seen_at FROM seen_signatures WHERE seen_at >= ?", (since,)
+        ) as cursor:
+            return [(row['signature'], row['seen_at']) for row in await cursor.fetchall()]
+
+    async def load_metadata_pdas(self, limit: int) -> List[tuple]:
+        async with self.pool.execute("SELECT mint, pda FROM metadata_pdas LIMIT ?", (limit,)) as cursor:
+            return [(row['mint'], row['pda']) for row in await cursor.fetchall()]
+
+    async def save_metadata_pdas(self, pairs: List[tuple]) -> None:
+        """Remember (mint, pda) derivations; a mint's PDA never changes"""
+        if not pairs:
+            return
+        async with self.transaction() as conn:
+            await conn.executemany("INSERT OR IGNORE INTO metadata_pdas (mint, pda) VALUES (?, ?)", pairs)
+
+    async def load_notification_rules(self) -> List[Dict[str, Any]]:
+        async with self.pool.execute(
+            """SELECT id, chat_ids, tx_type, wallet, tag, mint, source, min_amount, max_amount
+               FROM notification_rules WHERE enabled = 1 ORDER BY id"""
+        ) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def add_notification_rule(self, chat_ids: str, **criteria: Any) -> int:
+        columns = ["chat_ids", *criteria]
+        cursor = await self._write(
+            f"INSERT INTO notification_rules ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            (chat_ids, *criteria.values())
+        )
+        return cursor.lastrowid
+
+    async def delete_notification_rule(self, rule_id: int) -> bool:
+        cursor = await self._write("DELETE FROM notification_rules WHERE id = ?", (rule_id,))
+        return cursor.rowcount > 0
 
     async def get_all_wallet_addresses(self) -> List[str]:
         async with self.pool.execute("SELECT address FROM wallets") as cursor:
-            return [row['address'] for row in await cursor.fetchall()]
\ No newline at end of file
+            return [row['address'] for row in await cursor.fetchall()]
+
+    async def enqueue_outbox(self, chat_id: str, method: str, payload: Dict[str, Any]) -> int:
+        cursor = await self._write(
+            "INSERT INTO outbox (chat_id, method, payload, created_at) VALUES (?, ?, ?, ?)",
+            (str(chat_id), method, json.dumps(payload), int(datetime.now().timestamp()))
+        )
+        return cursor.lastrowid
+
+    async def enqueue_outbox_many(self, method: str, payloads: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        """Queue one message per chat (chat id -> payload) in one transaction"""
+        now = int(datetime.now().timestamp())
+        outbox_ids = {}
+        async with self.transaction() as conn:
+            for chat_id, payload in payloads.items():
+                cursor = await conn.execute(
+                    "INSERT INTO outbox (chat_id, method, payload, created_at) VALUES (?, ?, ?, ?)",
+                    (str(chat_id), method, json.dumps(payload), now)
+                )
+                outbox_ids[str(chat_id)] = cursor.lastrowid
+        return outbox_ids
+
+    async def get_due_outbox(self, now: float, limit: int = 50) -> List[Dict[str, Any]]:
+        """Due messages, first attempts ahead of retries"""
+        async with self.pool.execute(
+            """SELECT * FROM outbox
+               WHERE next_attempt_at <= ?
+               ORDER BY attempts > 0, id
+               LIMIT ?""",
+            (now, limit)
+        ) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def get_outbox(self, outbox_id: int) -> Optional[Dict[str, Any]]:
+        async with self.pool.execute("SELECT * FROM outbox WHERE id = ?", (outbox_id,)) as cursor:
+            row = await cursor.fetchone()
+            return dict(row) if row else None
+
+    async def get_next_outbox_attempt(self) -> Optional[float]:
+        async with self.pool.execute("SELECT MIN(next_attempt_at) AS next_at FROM outbox") as cursor:
+            row = await cursor.fetchone()
+            return row['next_at'] if row else None
+
+    async def update_outbox_payload(self, outbox_id: int, payload: Dict[str, Any]) -> bool:
+        """Rewrite a message that has not been delivered yet"""
+        cursor = await self._write(
+            "UPDATE outbox SET payload = ? WHERE id = ?", (json.dumps(payload), outbox_id)
+        )
+        return cursor.rowcount > 0
+
+    async def reschedule_outbox(self, outbox_id: int, attempts: int, next_attempt_at: float, error: str) -> None:
+        await self._write(
+            "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (attempts, next_attempt_at, error, outbox_id)
+        )
+
+    async def delete_outbox(self, outbox_id: int) -> None:
+        await self._write("DELETE FROM outbox WHERE id = ?", (outbox_id,))
+
+    async def move_to_dead_letters(self, outbox_id: int, attempts: int, error: str) -> None:
+        async with self.transaction() as conn:
+            await conn.execute(
+                """INSERT INTO dead_letters
+                   (id, chat_id, method, payload, attempts, last_error, created_at, failed_at)
+                   SELECT id, chat_id, method, payload, ?, ?, created_at, ?
+                   FROM outbox WHERE id = ?""",
+                (attempts, error, int(datetime.now().timestamp()), outbox_id)
+            )
+            await conn.execute("DELETE FROM outbox WHERE id = ?", (outbox_id,))
+
+    async def list_dead_letters(self, limit: int = 10) -> List[Dict[str, Any]]:
+        async with self.pool.execute(
+            "SELECT * FROM dead_letters ORDER BY failed_at DESC LIMIT ?", (limit,)
+        ) as cursor:
+            return [dict(row) for row in await cursor.fetchall()]
+
+    async def count_dead_letters(self) -> int:
+        async with self.pool.execute("SELECT COUNT(*) AS n FROM dead_letters") as cursor:
+            return (await cursor.fetchone())['n']
+
+    async def replay_dead_letters(self, dead_letter_id: Optional[int] = None) -> int:
+        """Move one (or every) dead letter back into the outbox for a fresh set of retries"""
+        where, params = ("WHERE id = ?", (dead_letter_id,)) if dead_letter_id is not None else ("", ())
+        async with self.transaction() as conn:
+            cursor = await conn.execute(
+                f"""INSERT INTO outbox (chat_id, method, payload, created_at)
+                    SELECT chat_id, method, payload, created_at FROM dead_letters {where}""",
+                params
+            )
+            replayed = cursor.rowcount
+            await conn.execute(f"DELETE FROM dead_letters {where}", params)
+        return replayed
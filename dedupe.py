@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+import time
+
+
+class SignatureDeduper:
+    """Bounded record of recently seen transaction signatures"""
+
+    def __init__(self, max_size: int = 50_000, ttl: int = 900):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+        self.duplicates = 0
+
+    def seen(self, signature: Optional[str]) -> bool:
+        """Return True if the signature was already seen, otherwise record it"""
+        if not signature:
+            return False
+
+        now = time.monotonic()
+        self._expire(now)
+
+        if signature in self._seen:
+            self.duplicates += 1
+            return True
+
+        self._seen[signature] = now
+        if len(self._seen) > self.max_size:
+            self._seen.popitem(last=False)
+        return False
+
+    def _expire(self, now: float):
+        """Drop entries older than the TTL (oldest first)"""
+        cutoff = now - self.ttl
+        while self._seen:
+            signature, seen_at = next(iter(self._seen.items()))
+            if seen_at >= cutoff:
+                break
+            self._seen.popitem(last=False)
+
+    def __contains__(self, signature: Optional[str]) -> bool:
+        """Membership check that does not record the signature"""
+        self._expire(time.monotonic())
+        return signature in self._seen
+
+    def snapshot(self) -> List[Tuple[str, float]]:
+        """Live entries as (signature, wall-clock seen time), oldest first"""
+        now = time.monotonic()
+        self._expire(now)
+        offset = time.time() - now
+        return [(signature, seen_at + offset) for signature, seen_at in self._seen.items()]
+
+    def restore(self, entries: Iterable[Tuple[str, float]]):
+        """Reload entries from ``snapshot()``, e.g. after a restart"""
+        offset = time.time() - time.monotonic()
+        for signature, seen_at in sorted(entries, key=lambda entry: entry[1]):
+            self._seen[signature] = seen_at - offset
+        self._expire(time.monotonic())
+        while len(self._seen) > self.max_size:
+            self._seen.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._seen)
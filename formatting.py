@@ -0,0 +1,8 @@
+# Same character set python-telegram-bot escapes for MarkdownV2; kept here so
+# the alert path does not have to import the telegram package
+_MARKDOWN_V2 = str.maketrans({char: "\\" + char for char in "\\_*[]()~`>#+-=|{}.!"})
+
+
+def escape_markdown(text: str) -> str:
+    """Escape text for Telegram MarkdownV2"""
+    return text.translate(_MARKDOWN_V2)
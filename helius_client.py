@@ -5,9 +5,35 @@ from aiohttp_retry import RetryClient, ExponentialRetry
 from config import settings
 import asyncio
 from connection_pool import HTTPSessionManager
+from rpc_scheduler import rpc_scheduler
+from rpc_router import RpcResponseError, rpc_pool
 
 logger = logging.getLogger(__name__)
 
+PARSED_TRANSACTIONS_URL = "https://api.helius.xyz/v0/transactions"
+WEBHOOKS_URL = "https://api.helius.xyz/v0/webhooks"
+
+
+async def fetch_parsed_transactions(session: aiohttp.ClientSession, signatures: List[str],
+                                    commitment: Optional[str] = None, budgeted: bool = True) -> List[Dict[str, Any]]:
+    """Fetch Helius enhanced transactions (the webhook payload format) by signature
+
+    Pass ``budgeted=False`` if the caller already acquired RPC budget.
+    """
+    params = {"api-key": settings.helius_api_key}
+    if commitment:
+        params["commitment"] = commitment
+    if budgeted:
+        await rpc_scheduler.acquire(PARSED_TRANSACTIONS_URL)
+    async with session.post(
+        PARSED_TRANSACTIONS_URL,
+        params=params,
+        json={"transactions": signatures}
+    ) as response:
+        response.raise_for_status()
+        return await response.json()
+
+
 class HeliusClient:
     def __init__(self, api_key: str, session_manager: HTTPSessionManager):
         self.session_manager = session_manager
@@ -15,7 +41,6 @@ class HeliusClient:
         if not api_key:
             raise ValueError("HELIUS_API_KEY must be provided")
         self.api_key = api_key
-        self.solana_rpc_url = "https://api.mainnet-beta.solana.com"
         self.helius_base_url = f"https://mainnet.helius-rpc.com/?api-key={self.api_key}"
         self.client: Optional[RetryClient] = None
         self._session: Optional[aiohttp.ClientSession] = None
@@ -50,7 +75,7 @@ class HeliusClient:
         try:
             async with asyncio.TaskGroup() as tg:
                 sol_task = tg.create_task(self._get_sol_balance(wallet_address))
-                tokens_task = tg.create_task(self._get_token_assets(wallet_address))
+                tokens_task = tg.create_task(self.get_token_assets(wallet_address))
             
             return sol_task.result(), tokens_task.result()
         except Exception as e:
@@ -58,48 +83,81 @@ class HeliusClient:
             raise
 
     async def _get_sol_balance(self, wallet_address: str) -> float:
-        """Get SOL balance using Solana public RPC"""
+        """Get SOL balance from the best available RPC endpoint"""
+        result = await rpc_pool.call("getBalance", [wallet_address])
+        return float(result['value']) / (10 ** 9)
+
+    async def get_token_assets(self, wallet_address: str) -> List[Dict[str, Any]]:
+        """Get fungible token holdings using Helius getAssetsByOwner"""
+        return self._parse_token_data(await self.get_assets_by_owner(wallet_address))
+
+    async def get_assets_by_owner(self, wallet_address: str, page_size: int = 1000) -> List[Dict[str, Any]]:
+        """All DAS assets (fungible and NFTs) of a wallet, following pagination"""
         if not self.client:
             raise RuntimeError("Client not initialized")
 
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getBalance",
-            "params": [wallet_address]
-        }
-        
-        async with self.client.post(self.solana_rpc_url, json=payload) as response:
+        items = []
+        page = 1
+        while True:
+            payload = {
+                "jsonrpc": "2.0",
+                "id": "my-id",
+                "method": "getAssetsByOwner",
+                "params": {
+                    "ownerAddress": wallet_address,
+                    "page": page,
+                    "limit": page_size,
+                    "displayOptions": {"showFungible": True}
+                }
+            }
+
+            await rpc_scheduler.acquire(self.helius_base_url)
+            async with self.client.post(self.helius_base_url, json=payload) as response:
+                response.raise_for_status()
+                data = await response.json()
+            if 'error' in data:
+                raise RpcResponseError(f"getAssetsByOwner: {data['error']}")
+
+            batch = (data.get('result') or {}).get('items', [])
+            items.extend(batch)
+            if len(batch) < page_size:
+                return items
+            page += 1
+
+    async def get_webhook(self, webhook_id: str) -> Dict[str, Any]:
+        """Fetch a Helius webhook's configuration, including accountAddresses"""
+        if not self.client:
+            raise RuntimeError("Client not initialized")
+
+        await rpc_scheduler.acquire(WEBHOOKS_URL)
+        async with self.client.get(f"{WEBHOOKS_URL}/{webhook_id}", params={"api-key": self.api_key}) as response:
             response.raise_for_status()
-            data = await response.json()
-            return float(data['result']['value']) / (10 ** 9)
+            return await response.json()
 
-    async def _get_token_assets(self, wallet_address: str) -> List[Dict[str, Any]]:
-        """Get token assets using Helius getAssetsByOwner method"""
+    async def set_webhook_addresses(self, webhook: Dict[str, Any], addresses: List[str]) -> None:
+        """Replace a webhook's accountAddresses, keeping the rest of its configuration"""
         if not self.client:
             raise RuntimeError("Client not initialized")
 
+        # Helius edits are full replacements, so echo back the existing settings
         payload = {
-            "jsonrpc": "2.0",
-            "id": "my-id",
-            "method": "getAssetsByOwner",
-            "params": {
-                "ownerAddress": wallet_address,
-                "displayOptions": {"showFungible": True}
-            }
+            key: webhook[key]
+            for key in ("webhookURL", "transactionTypes", "webhookType", "authHeader", "txnStatus", "encoding")
+            if webhook.get(key) is not None
         }
-        
-        async with self.client.post(self.helius_base_url, json=payload) as response:
+        payload["accountAddresses"] = addresses
+        await rpc_scheduler.acquire(WEBHOOKS_URL)
+        async with self.client.put(
+            f"{WEBHOOKS_URL}/{webhook['webhookID']}", params={"api-key": self.api_key}, json=payload
+        ) as response:
             response.raise_for_status()
-            data = await response.json()
-            return self._parse_token_data(data)
 
-    def _parse_token_data(self, data: Dict) -> List[Dict[str, Any]]:
+    def _parse_token_data(self, items: List[Dict]) -> List[Dict[str, Any]]:
         """Parse token data with enhanced validation and error handling"""
         try:
-            items = data.get('result', {}).get('items', [])
             return [
                 {
+                    'mint': item.get('id'),
                     'name': item['content']['metadata'].get('name', 'Unknown Token'),
                     'symbol': item['token_info'].get('symbol', 'UNKNOWN'),
                     'amount': item['token_info'].get('balance', 0),
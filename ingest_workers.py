@@ -0,0 +1,196 @@
+from aiohttp import web
+from config import settings
+from dedupe import SignatureDeduper
+from load_shedder import LoadShedder, Overloaded, overloaded_response
+from wallet_registry import WalletRegistry
+from parse_data import involved_addresses
+from logger import configure_logging
+from typing import Awaitable, Callable, Dict, List
+import multiprocessing
+import queue
+import logging
+import asyncio
+import json
+
+logger = logging.getLogger(__name__)
+
+# Fields the delivery process actually reads from a webhook transaction
+WORK_ITEM_FIELDS = (
+    'signature', 'timestamp', 'type', 'source', 'description', 'feePayer',
+    'accountData', 'tokenTransfers', 'nativeTransfers'
+)
+
+
+def compact_transaction(tx_data: dict) -> dict:
+    """Strip a webhook transaction down to what the delivery process needs"""
+    item = {key: tx_data[key] for key in WORK_ITEM_FIELDS if key in tx_data}
+    if 'accountData' in item:
+        # Only balance changes are used downstream
+        item['accountData'] = [
+            {'account': acc.get('account'), 'nativeBalanceChange': acc.get('nativeBalanceChange', 0)}
+            for acc in item['accountData']
+        ]
+    return item
+
+
+class IngestWorker:
+    """Single ingest process: decode, dedupe, pre-filter and forward work items"""
+
+    def __init__(self, worker_id: int, host: str, port: int, db_path: str, work_queue, registry_version):
+        self.worker_id = worker_id
+        self.host = host
+        self.port = port
+        self.work_queue = work_queue
+        self.registry_version = registry_version
+        self.registry = WalletRegistry(db_path, settings.registry_refresh_interval)
+        self.deduper = SignatureDeduper()
+        self.shedder = LoadShedder.from_settings()
+        self.app = web.Application()
+        self.app.router.add_post("/webhook", self.handle_webhook)
+
+    async def handle_webhook(self, request):
+        if request.headers.get('Authorization') != settings.webhook_secret:
+            logger.warning("[worker %s] Unauthorized webhook attempt", self.worker_id)
+            return web.Response(status=403)
+
+        try:
+            self.shedder.enter()
+        except Overloaded as e:
+            return overloaded_response(e)
+
+        try:
+            data = await request.json()
+            transactions = data if isinstance(data, list) else [data]
+            transactions = [
+                tx for tx in transactions
+                if isinstance(tx, dict) and self.registry.tracks_any(involved_addresses(tx))
+            ]
+            # The shared queue is the delivery backlog seen by every worker
+            admitted = self.shedder.admit(transactions, self.work_queue.qsize())
+        except Overloaded as e:
+            return overloaded_response(e)
+        except json.JSONDecodeError:
+            return web.Response(status=400)
+        finally:
+            self.shedder.exit()
+
+        forwarded = 0
+        for tx in admitted:
+            if not self.deduper.seen(tx.get('signature')):
+                self.work_queue.put(compact_transaction(tx))
+                forwarded += 1
+
+        logger.debug("[worker %s] Forwarded %d/%d transactions", self.worker_id, forwarded, len(transactions))
+        return web.Response(status=200)
+
+    async def _watch_registry(self, poll_interval: float = 0.25):
+        """Reload the registry as soon as the delivery process reports a wallet change"""
+        seen = self.registry_version.value
+        while True:
+            await asyncio.sleep(poll_interval)
+            if self.registry_version.value == seen:
+                continue
+            seen = self.registry_version.value
+            try:
+                await self.registry.load()
+            except Exception as e:
+                logger.error("[worker %s] Registry reload failed: %s", self.worker_id, e)
+
+    async def run(self):
+        await self.registry.start()
+        watcher = asyncio.create_task(self._watch_registry())
+        runner = web.AppRunner(self.app)
+        await runner.setup()
+        site = web.TCPSite(runner, self.host, self.port, reuse_port=True)
+        await site.start()
+        logger.info("Ingest worker %s listening on %s:%s", self.worker_id, self.host, self.port)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            watcher.cancel()
+            await self.registry.stop()
+            await runner.cleanup()
+
+
+def _run_worker(worker_id: int, host: str, port: int, db_path: str, work_queue, registry_version):
+    """Process entry point for an ingest worker"""
+    # Workers log to stdout only; the delivery process owns the log file
+    log_listener = configure_logging(log_file=None)
+    worker = IngestWorker(worker_id, host, port, db_path, work_queue, registry_version)
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log_listener.stop()
+
+
+class IngestWorkerPool:
+    """Fork N ingest processes sharing the webhook port via SO_REUSEPORT
+
+    Workers only serve /webhook. Wallet edits made in the delivery process
+    reach them through a shared version counter they poll, so a new
+    wallet's traffic is not dropped until the next periodic refresh.
+    """
+
+    def __init__(self, num_workers: int, host: str, port: int, db_path: str, batch_size: int = 100):
+        self.num_workers = num_workers
+        self.host = host
+        self.port = port
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._ctx = multiprocessing.get_context("spawn")
+        self.work_queue = self._ctx.Queue()
+        self.registry_version = self._ctx.Value("L", 0, lock=False)
+        self.processes: List[multiprocessing.Process] = []
+        self._stopping = False
+
+    def start(self):
+        for worker_id in range(self.num_workers):
+            process = self._ctx.Process(
+                target=_run_worker,
+                args=(worker_id, self.host, self.port, self.db_path, self.work_queue, self.registry_version),
+                name=f"ingest-worker-{worker_id}",
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+        logger.info("Started %s ingest workers on port %s", self.num_workers, self.port)
+
+    def notify_registry_changed(self):
+        """Tell every worker to reload its wallet registry"""
+        self.registry_version.value += 1
+
+    def _get_batch(self) -> List[Dict]:
+        """Block briefly for one item, then drain whatever else is ready"""
+        try:
+            batch = [self.work_queue.get(timeout=1)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.work_queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    async def drain(self, handler: Callable[[List[Dict]], Awaitable[None]]):
+        """Feed work items from the workers into the delivery pipeline"""
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            batch = await loop.run_in_executor(None, self._get_batch)
+            if batch:
+                try:
+                    await handler(batch)
+                except Exception as e:
+                    logger.error("Delivery batch failed: %s", e, exc_info=True)
+
+    def stop(self):
+        self._stopping = True
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join(timeout=5)
+        self.processes.clear()
+        logger.info("Ingest workers stopped")
@@ -0,0 +1,94 @@
+from aiohttp import web
+from collections import Counter
+from config import settings
+from typing import Dict, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Transaction types that always get a dedicated alert
+HIGH_PRIORITY_TYPES = frozenset({'SWAP', 'TRANSFER'})
+
+
+class Overloaded(Exception):
+    """Raised when a webhook delivery cannot be accepted right now"""
+
+    def __init__(self, status: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class LoadShedder:
+    """Admission control for webhook deliveries
+
+    Below ``shed_depth`` everything is accepted. Between ``shed_depth`` and
+    ``max_depth`` low-priority transactions (generic alerts) are only
+    counted. Once even high-priority work would exceed ``max_depth`` the
+    whole delivery is refused so Helius backs off and redelivers.
+    """
+
+    def __init__(self, max_in_flight: int = 64, shed_depth: int = 500,
+                 max_depth: int = 2000, retry_after: int = 5):
+        self.max_in_flight = max_in_flight
+        self.shed_depth = shed_depth
+        self.max_depth = max_depth
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.shed: Counter = Counter()
+        self.rejected: Counter = Counter()
+
+    @classmethod
+    def from_settings(cls) -> "LoadShedder":
+        return cls(
+            max_in_flight=settings.max_in_flight_requests,
+            shed_depth=settings.shed_queue_depth,
+            max_depth=settings.max_queue_depth,
+            retry_after=settings.overload_retry_after
+        )
+
+    def enter(self):
+        """Claim a request slot or raise Overloaded (429)"""
+        if self.in_flight >= self.max_in_flight:
+            self.rejected[429] += 1
+            raise Overloaded(429, self.retry_after, "Too many concurrent deliveries")
+        self.in_flight += 1
+
+    def exit(self):
+        self.in_flight -= 1
+
+    def admit(self, transactions: List[Dict], queue_depth: int) -> List[Dict]:
+        """Return the transactions to process; raise Overloaded (503) if none can be queued"""
+        if queue_depth < self.shed_depth:
+            return transactions
+
+        accepted, dropped = self._split(transactions)
+        if queue_depth + len(accepted) > self.max_depth:
+            self.rejected[503] += 1
+            raise Overloaded(503, self.retry_after, f"Queue depth {queue_depth} over limit")
+
+        for tx in dropped:
+            self.shed[tx.get('type', 'Unknown')] += 1
+        if dropped:
+            logger.warning(f"Shedding {len(dropped)} low-priority transactions (queue depth {queue_depth})")
+        return accepted
+
+    @staticmethod
+    def _split(transactions: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        high, low = [], []
+        for tx in transactions:
+            (high if tx.get('type') in HIGH_PRIORITY_TYPES else low).append(tx)
+        return high, low
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "shed": dict(self.shed),
+            "rejected": {str(status): count for status, count in self.rejected.items()}
+        }
+
+
+def overloaded_response(error: Overloaded) -> web.Response:
+    """429/503 with Retry-After so Helius backs off and redelivers"""
+    logger.warning(f"Refusing webhook delivery: {str(error)}")
+    return web.Response(status=error.status, headers={'Retry-After': str(error.retry_after)})
@@ -1,16 +1,107 @@
 import logging
+import logging.handlers
+import copy
+import json
+import queue
+import random
 import sys
+from typing import Dict, Optional
+from config import settings
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of INFO/DEBUG records from high-volume loggers
+
+    Rates apply to a logger and its children; WARNING and above always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        name = record.name
+        while name:
+            if name in self.rates:
+                return random.random() < self.rates[name]
+            name = name.rpartition('.')[0]
+        return True
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "webhook_server=0.1,parse_data=0.01" into a rate map"""
+    rates = {}
+    for part in spec.split(','):
+        if '=' in part:
+            name, rate = part.split('=', 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+class CopyingQueueHandler(logging.handlers.QueueHandler):
+    """Enqueue a shallow copy of the record without formatting it
+
+    The stock ``prepare()`` merges args into ``msg`` on the caller's thread;
+    here message and exception formatting is left to the listener's handlers.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
+
+def configure_logging(log_file: Optional[str] = settings.log_file) -> logging.handlers.QueueListener:
+    """Route all logging through a queue drained by a background thread
+
+    The event loop only pays for filtering and enqueueing a record; file
+    and stdout I/O happen on the listener thread. Call ``stop()`` on the
+    returned listener at shutdown to flush pending records.
+    """
+    formatter = JsonFormatter() if settings.log_json else logging.Formatter(TEXT_FORMAT)
+
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=settings.log_max_bytes,
+            backupCount=settings.log_backup_count,
+            encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = CopyingQueueHandler(log_queue)
+    # Sampled-out records are dropped before they are formatted or queued
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(settings.log_sample_rates)))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(logging.INFO)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
 
-def configure_logging():
-    logging.basicConfig(
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        level=logging.INFO,
-        handlers=[
-            logging.FileHandler("bot.log"),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
     # Reduce noise from external libraries
     logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.getLogger("aiohttp").setLevel(logging.WARNING)
-    logging.getLogger("asyncio").setLevel(logging.WARNING)
\ No newline at end of file
+    logging.getLogger("asyncio").setLevel(logging.WARNING)
+    return listener
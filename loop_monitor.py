@@ -0,0 +1,117 @@
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Optional
+from config import settings
+from profiling import StackSampler
+import threading
+import asyncio
+import logging
+import time
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+class LoopBlockedError(Exception):
+    """The event loop stalled for longer than the monitor's threshold"""
+
+
+class LoopMonitor:
+    """Detect code that blocks the event loop and record where it was
+
+    A heartbeat task wakes every ``interval``; a watchdog thread checks
+    that it keeps doing so. Once the loop has been stuck past
+    ``threshold`` the watchdog captures the loop thread's stack (the
+    blocking call is on it at that moment) and the heartbeat records the
+    full stall when the loop comes back.
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.02, max_events: int = 50):
+        self.threshold = threshold
+        self.interval = interval
+        self.events: Deque[dict] = deque(maxlen=max_events)
+        self.stalls = 0
+        self.max_stall = 0.0
+        self._beat = 0.0
+        self._stack: Optional[str] = None  # captured during the current stall
+        self._loop_thread: Optional[int] = None
+        self._stopped = threading.Event()
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._task and not self._task.done())
+
+    async def start(self):
+        if not self.threshold or self.running:
+            return
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped = threading.Event()
+        self._task = asyncio.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, args=(self._stopped,), name="loop-monitor", daemon=True).start()
+        logger.info(f"Event loop monitor started (threshold {self.threshold * 1000:.0f} ms)")
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            stall = now - self._beat - self.interval
+            self._beat = now
+            self.max_stall = max(self.max_stall, stall)
+            if stall >= self.threshold:
+                self._record(stall)
+
+    def _watch(self, stopped: threading.Event):
+        while not stopped.wait(self.interval):
+            if self._stack is None and time.monotonic() - self._beat >= self.threshold:
+                frame = sys._current_frames().get(self._loop_thread)
+                if frame is not None:
+                    self._stack = StackSampler._collapse(frame)
+
+    def _record(self, stall: float):
+        stack, self._stack = self._stack or "unknown", None
+        self.stalls += 1
+        self.events.append({"at": time.time(), "duration_ms": round(stall * 1000, 1), "stack": stack})
+        logger.warning(f"Event loop blocked for {stall * 1000:.0f} ms in {';'.join(stack.split(';')[-3:])}")
+
+    @asynccontextmanager
+    async def assert_nonblocking(self):
+        """Raise LoopBlockedError if the loop stalls inside the block (for tests and checks)"""
+        owned = not self.running
+        if owned:
+            await self.start()
+        before = self.stalls
+        try:
+            yield self
+            # A stall in the last statement is only recorded on the next heartbeat
+            await asyncio.sleep(self.interval * 2)
+        finally:
+            if owned:
+                await self.stop()
+        blocked = self.stalls - before
+        if blocked:
+            worst = max(list(self.events)[-blocked:], key=lambda event: event["duration_ms"])
+            raise LoopBlockedError(
+                f"event loop blocked {blocked} time(s), worst {worst['duration_ms']} ms in {worst['stack']}"
+            )
+
+    def stats(self) -> dict:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "stalls": self.stalls,
+            "max_stall_ms": round(self.max_stall * 1000, 1),
+            "recent": list(self.events)[-5:]
+        }
+
+
+loop_monitor = LoopMonitor(threshold=settings.loop_block_threshold)
@@ -0,0 +1,162 @@
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+from config import settings
+import tracemalloc
+import itertools
+import asyncio
+import logging
+import sys
+import gc
+
+logger = logging.getLogger(__name__)
+
+
+def approx_size(obj: Any, sample: int = 200) -> int:
+    """Approximate deep size of a container in bytes
+
+    Containers are measured on their first ``sample`` items and the result
+    extrapolated, so accounting stays cheap for caches with many entries.
+    """
+    seen = set()
+
+    def sizeof(value: Any, depth: int) -> int:
+        if id(value) in seen or depth > 4:
+            return 0
+        seen.add(id(value))
+        size = sys.getsizeof(value)
+
+        if isinstance(value, dict):
+            items = list(itertools.islice(value.items(), sample))
+            measured = sum(sizeof(k, depth + 1) + sizeof(v, depth + 1) for k, v in items)
+        elif isinstance(value, (list, tuple, set, frozenset, deque)):
+            items = list(itertools.islice(value, sample))
+            measured = sum(sizeof(v, depth + 1) for v in items)
+        elif hasattr(value, '__dict__') and not isinstance(value, type):
+            return size + sizeof(vars(value), depth + 1)
+        else:
+            return size
+
+        total = len(value)
+        if items and total > len(items):
+            measured = measured * total // len(items)
+        return size + measured
+
+    return sizeof(obj, 0)
+
+
+class CacheRegistry:
+    """Named in-memory caches whose size we want to account for"""
+
+    def __init__(self):
+        self._caches: Dict[str, Callable[[], Any]] = {}
+
+    def register(self, name: str, getter: Callable[[], Any]):
+        """Register a cache by a callable returning its backing container"""
+        self._caches[name] = getter
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        report = {}
+        for name, getter in self._caches.items():
+            try:
+                container = getter()
+                report[name] = {"entries": len(container), "approx_bytes": approx_size(container)}
+            except Exception as e:
+                logger.warning(f"Cache accounting failed for {name}: {str(e)}")
+        return report
+
+
+class MemoryDiagnostics:
+    """Periodic tracemalloc allocation-site diffs plus gc statistics"""
+
+    def __init__(self, enabled: bool = False, interval: int = 600, top_n: int = 10, frames: int = 1):
+        self.enabled = enabled
+        self.interval = interval
+        self.top_n = top_n
+        self.frames = frames
+        self.caches = CacheRegistry()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self.last_diff: List[Dict[str, Any]] = []
+        self._task = None
+
+    async def start(self):
+        if not self.enabled:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._baseline = self._previous = self._snapshot()
+        self._task = asyncio.create_task(self._diff_loop())
+        logger.info(f"Memory diagnostics started (every {self.interval}s, top {self.top_n})")
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    async def _diff_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.take_diff()
+            except Exception as e:
+                logger.error(f"Memory diff failed: {str(e)}")
+
+    def take_diff(self, since_start: bool = False) -> List[Dict[str, Any]]:
+        """Top-N allocation sites by growth since the last (or first) snapshot"""
+        if not tracemalloc.is_tracing():
+            return []
+        # Snapshotting walks every trace; keep it off the hot path but accept the pause here
+        snapshot = self._snapshot()
+        reference = self._baseline if since_start else self._previous
+        if reference is None:
+            self._baseline = self._previous = snapshot
+            return []
+        stats = snapshot.compare_to(reference, 'lineno')[:self.top_n]
+        self.last_diff = [
+            {
+                "site": str(stat.traceback),
+                "size_kb": round(stat.size / 1024, 1),
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count_diff": stat.count_diff
+            }
+            for stat in stats
+        ]
+        self._previous = snapshot
+        for entry in self.last_diff[:3]:
+            logger.info(f"Allocation growth: {entry['site']} {entry['size_diff_kb']:+.1f} KiB")
+        return self.last_diff
+
+    @staticmethod
+    def gc_stats() -> Dict[str, Any]:
+        return {
+            "counts": gc.get_count(),
+            "generations": gc.get_stats(),
+            "garbage": len(gc.garbage)
+        }
+
+    def report(self) -> Dict[str, Any]:
+        report = {"caches": self.caches.stats(), "gc": self.gc_stats()}
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            report["traced"] = {"current_kb": current // 1024, "peak_kb": peak // 1024}
+            report["top_growth"] = self.last_diff
+        return report
+
+
+memory_diagnostics = MemoryDiagnostics(
+    enabled=settings.memory_diagnostics,
+    interval=settings.memory_diagnostics_interval,
+    top_n=settings.memory_diagnostics_top_n
+)
@@ -0,0 +1,215 @@
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from database import Database
+import asyncio
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Criteria in the order a rule is indexed by: the first one a rule sets
+# is its lookup key, so selective keys keep the candidate lists short
+INDEX_KEYS = ("wallet", "mint", "tag", "source", "tx_type")
+
+
+def alias_tag(alias: str) -> str:
+    """Tag of an alias: its first segment, so ``whale-1`` and ``whale_sol`` are ``whale``"""
+    return re.split(r"[-_:.]", alias.lower(), maxsplit=1)[0]
+
+
+@dataclass(frozen=True)
+class Alert:
+    """What routing rules can match an alert on
+
+    ``amount`` is in SOL for native transfers and SOL-paired swaps and in
+    token units for single token transfers; None when there is no single
+    meaningful amount.
+    """
+    tx_type: str = "UNKNOWN"
+    wallets: Tuple[str, ...] = ()
+    aliases: Tuple[str, ...] = ()
+    mints: Tuple[str, ...] = ()
+    source: Optional[str] = None
+    amount: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: int
+    chat_ids: Tuple[str, ...]
+    tx_type: Optional[str] = None
+    wallet: Optional[str] = None
+    tag: Optional[str] = None
+    mint: Optional[str] = None
+    source: Optional[str] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Rule":
+        upper = lambda value: value.upper() if value else None
+        return cls(
+            id=row['id'],
+            chat_ids=tuple(chat.strip() for chat in row['chat_ids'].split(",") if chat.strip()),
+            tx_type=upper(row['tx_type']),
+            wallet=row['wallet'] or None,
+            tag=row['tag'].lower() if row['tag'] else None,
+            mint=row['mint'] or None,
+            source=upper(row['source']),
+            min_amount=row['min_amount'],
+            max_amount=row['max_amount']
+        )
+
+    def matches(self, alert: Alert, tags: Tuple[str, ...]) -> bool:
+        if self.tx_type and self.tx_type != alert.tx_type:
+            return False
+        if self.wallet and self.wallet not in alert.wallets:
+            return False
+        if self.tag and self.tag not in tags:
+            return False
+        if self.mint and self.mint not in alert.mints:
+            return False
+        if self.source and self.source != (alert.source or "").upper():
+            return False
+        if self.min_amount is not None or self.max_amount is not None:
+            if alert.amount is None:
+                return False
+            if self.min_amount is not None and alert.amount < self.min_amount:
+                return False
+            if self.max_amount is not None and alert.amount > self.max_amount:
+                return False
+        return True
+
+    def describe(self) -> str:
+        criteria = [
+            f"{name}={value}" for name, value in (
+                ("type", self.tx_type), ("wallet", self.wallet), ("tag", self.tag),
+                ("mint", self.mint), ("source", self.source),
+                ("min", self.min_amount), ("max", self.max_amount)
+            ) if value is not None
+        ]
+        return f"{' '.join(criteria) or 'everything'} -> {','.join(self.chat_ids)}"
+
+
+class NotificationRouter:
+    """Map alerts to Telegram chats using rules from ``notification_rules``
+
+    Every matching rule contributes its chats; with ``fallback`` an alert
+    no rule matches goes to ``default_chat``. Rules are compiled into per-criterion hash
+    indexes (each rule filed under its most selective key), so routing
+    only checks the handful of rules that could apply no matter how many
+    exist. The table is re-read every ``reload_interval`` seconds and
+    recompiled when it changed.
+    """
+
+    def __init__(self, db: Database, default_chat: str, swap_chat: Optional[str] = None,
+                 reload_interval: int = 30):
+        self.db = db
+        self.default_chat = str(default_chat)
+        self.swap_chat = str(swap_chat) if swap_chat else None
+        self.reload_interval = reload_interval
+        self.rules: List[Rule] = []
+        self._rows: List[tuple] = []
+        self._index: Dict[str, Dict[str, List[Rule]]] = {}
+        self._catch_all: List[Rule] = []
+        self._task = None
+        self.reloads = 0
+        self.routed = Counter()
+        self.unmatched = 0
+
+    async def start(self):
+        await self._seed_defaults()
+        await self.load()
+        self._task = asyncio.create_task(self._reload_loop())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _seed_defaults(self):
+        """First run: swaps also go to the token chat (subscribers get their wallets' alerts)"""
+        if await self.db.get_job_state("notification_rules_seeded"):
+            return
+        if self.swap_chat and self.swap_chat != self.default_chat and not await self.db.load_notification_rules():
+            await self.db.add_notification_rule(self.swap_chat, tx_type="SWAP")
+        await self.db.set_job_state("notification_rules_seeded", "1")
+
+    async def _reload_loop(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"Notification rules reload failed: {str(e)}")
+
+    async def load(self):
+        """Read the rules table and recompile if anything changed"""
+        rows = await self.db.load_notification_rules()
+        snapshot = [tuple(row.values()) for row in rows]
+        if snapshot == self._rows and self.reloads:
+            return
+        rules = []
+        for row in rows:
+            rule = Rule.from_row(row)
+            if rule.chat_ids:
+                rules.append(rule)
+            else:
+                logger.warning(f"Notification rule #{row['id']} has no chats; ignored")
+        self.compile(rules)
+        self._rows = snapshot
+        self.reloads += 1
+        logger.info(f"Loaded {len(rules)} notification rules")
+
+    def compile(self, rules: List[Rule]):
+        index: Dict[str, Dict[str, List[Rule]]] = {key: defaultdict(list) for key in INDEX_KEYS}
+        catch_all = []
+        for rule in rules:
+            key = next((key for key in INDEX_KEYS if getattr(rule, key)), None)
+            if key:
+                index[key][getattr(rule, key)].append(rule)
+            else:
+                catch_all.append(rule)
+        # Swap in whole so routing never sees a half-built index
+        self._index = {key: dict(buckets) for key, buckets in index.items()}
+        self._catch_all = catch_all
+        self.rules = rules
+
+    def route(self, alert: Optional[Alert] = None, fallback: bool = True) -> List[str]:
+        """Chats an alert should be sent to, in rule order"""
+        alert = alert or Alert()
+        tags = tuple({alias_tag(alias) for alias in alert.aliases})
+        index = self._index
+        candidates = list(self._catch_all)
+        if index:
+            for key, values in (
+                ("wallet", alert.wallets), ("mint", alert.mints), ("tag", tags),
+                ("source", ((alert.source or "").upper(),)), ("tx_type", (alert.tx_type,))
+            ):
+                buckets = index[key]
+                if buckets:
+                    for value in values:
+                        candidates.extend(buckets.get(value, ()))
+
+        chats = {}
+        for rule in sorted(candidates, key=lambda rule: rule.id):
+            if rule.matches(alert, tags):
+                chats.update(dict.fromkeys(rule.chat_ids))
+        if not chats and fallback:
+            self.unmatched += 1
+            chats[self.default_chat] = None
+        self.routed.update(chats.keys())
+        return list(chats)
+
+    def stats(self) -> dict:
+        return {
+            "rules": len(self.rules),
+            "catch_all_rules": len(self._catch_all),
+            "reloads": self.reloads,
+            "unmatched": self.unmatched,
+            "routed": dict(self.routed)
+        }
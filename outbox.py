@@ -0,0 +1,255 @@
+from config import settings
+from connection_pool import HTTPSessionManager
+from database import Database
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import aiohttp
+import asyncio
+import logging
+import json
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryError(Exception):
+    """Telegram refused or failed to deliver a message"""
+
+    def __init__(self, message: str, permanent: bool = False, retry_after: Optional[float] = None,
+                 unavailable: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+        self.retry_after = retry_after
+        # Rate limited or Telegram unreachable: not the message's fault
+        self.unavailable = unavailable or retry_after is not None
+
+
+class Outbox:
+    """SQLite-backed Telegram outbox with at-least-once delivery
+
+    Notifications are written to the ``outbox`` table before any network
+    call. A single sender loop delivers them in order, paced by
+    ``send_interval``, with first attempts always ahead of retries.
+    Failures back off exponentially; after ``max_attempts`` (or on a
+    permanent error) the message moves to ``dead_letters`` where it can be
+    inspected and replayed from the bot. Server errors and timeouts count
+    as attempts on the message that hit them. A rate limit or a failure to
+    reach Telegram at all pauses the whole sender instead and does not use
+    up an attempt, so an outage delays alerts rather than dropping them.
+    """
+
+    def __init__(self, db: Database, session_manager: HTTPSessionManager,
+                 max_attempts: int = 8, base_delay: float = 2.0, max_delay: float = 300.0,
+                 send_interval: float = 0.05):
+        self.db = db
+        self.session_manager = session_manager
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.send_interval = send_interval
+        self._wakeup = asyncio.Event()
+        self._waiters: Dict[int, asyncio.Future] = {}
+        self._in_progress: set = set()
+        # Held while a batch is claimed, so replace_pending cannot race the sender
+        self._claim = asyncio.Lock()
+        self._paused_until = 0.0
+        self._outage_streak = 0
+        # Recently delivered outbox id -> Telegram message id, for late waiters
+        self._recent: "OrderedDict[int, Optional[int]]" = OrderedDict()
+        self._task = None
+        self.delivered = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self.pauses = 0
+
+    async def start(self):
+        self._task = asyncio.create_task(self._sender_loop())
+        logger.info("Outbox sender started")
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for future in self._waiters.values():
+            if not future.done():
+                future.cancel()
+        self._waiters.clear()
+
+    async def send_many(self, texts: Dict[str, str]) -> Dict[str, int]:
+        """Queue MarkdownV2 messages (chat id -> text) in one transaction; returns chat id -> outbox id"""
+        if not texts:
+            return {}
+        outbox_ids = await self.db.enqueue_outbox_many('sendMessage', {
+            chat_id: {'text': text, 'parse_mode': 'MarkdownV2', 'disable_web_page_preview': True}
+            for chat_id, text in texts.items()
+        })
+        self._wakeup.set()
+        return outbox_ids
+
+    async def edit(self, message_id: int, text: str, chat_id: Optional[str] = None) -> int:
+        """Queue an edit of an already delivered message"""
+        return await self.enqueue('editMessageText', chat_id or settings.telegram_chat_id, {
+            'message_id': message_id,
+            'text': text,
+            'parse_mode': 'MarkdownV2',
+            'disable_web_page_preview': True
+        })
+
+    async def enqueue(self, method: str, chat_id: str, payload: Dict[str, Any]) -> int:
+        outbox_id = await self.db.enqueue_outbox(chat_id, method, payload)
+        self._wakeup.set()
+        return outbox_id
+
+    async def replace_pending(self, outbox_id: int, text: str) -> bool:
+        """Swap the text of a message still waiting in the outbox"""
+        async with self._claim:
+            if outbox_id in self._in_progress:
+                return False
+            row = await self.db.get_outbox(outbox_id)
+            if not row:
+                return False
+            payload = json.loads(row['payload'])
+            payload['text'] = text
+            return await self.db.update_outbox_payload(outbox_id, payload)
+
+    async def wait_delivered(self, outbox_id: int, timeout: float) -> Optional[int]:
+        """Wait for a queued message to go out; returns its Telegram message id"""
+        if outbox_id in self._recent:
+            return self._recent[outbox_id]
+        future = self._waiters.setdefault(outbox_id, asyncio.get_running_loop().create_future())
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            return None
+
+    def _resolve(self, outbox_id: int, message_id: Optional[int]):
+        self._recent[outbox_id] = message_id
+        if len(self._recent) > 1000:
+            self._recent.popitem(last=False)
+        future = self._waiters.pop(outbox_id, None)
+        if future and not future.done():
+            future.set_result(message_id)
+
+    async def _sender_loop(self):
+        while True:
+            try:
+                paused_for = self._paused_until - time.time()
+                if paused_for > 0:
+                    await asyncio.sleep(paused_for)
+                    continue
+                async with self._claim:
+                    rows = await self.db.get_due_outbox(time.time())
+                    self._in_progress = {row['id'] for row in rows}
+                if not rows:
+                    await self._sleep_until_due()
+                    continue
+                for row in rows:
+                    if not await self._process(row):
+                        break  # Telegram unavailable; the rest of the batch waits out the pause
+                    await asyncio.sleep(self.send_interval)
+                self._in_progress = set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._in_progress = set()
+                logger.error("Outbox sender error: %s", e, exc_info=True)
+                await asyncio.sleep(1)
+
+    async def _sleep_until_due(self):
+        next_at = await self.db.get_next_outbox_attempt()
+        timeout = 5.0 if next_at is None else max(0.0, min(5.0, next_at - time.time()))
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _process(self, row: Dict[str, Any]) -> bool:
+        """Deliver one message; returns False if the sender has to pause"""
+        payload = json.loads(row['payload'])
+        attempts = row['attempts'] + 1
+        try:
+            message_id = await self._deliver(row['method'], row['chat_id'], payload)
+        except DeliveryError as e:
+            if e.unavailable:
+                await self._pause(row, e)
+                return False
+            if e.permanent or attempts >= self.max_attempts:
+                logger.error("Outbox message %s dead-lettered after %s attempts: %s", row['id'], attempts, e)
+                await self.db.move_to_dead_letters(row['id'], attempts, str(e))
+                self.dead_lettered += 1
+                self._resolve(row['id'], None)
+                return True
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+            logger.warning("Outbox message %s failed (attempt %s), retrying in %ss: %s", row['id'], attempts, delay, e)
+            await self.db.reschedule_outbox(row['id'], attempts, time.time() + delay, str(e))
+            self.retried += 1
+            return True
+
+        self._outage_streak = 0
+        await self.db.delete_outbox(row['id'])
+        self.delivered += 1
+        self._resolve(row['id'], message_id)
+        return True
+
+    async def _pause(self, row: Dict[str, Any], error: DeliveryError):
+        """Hold all sending for ``retry_after`` (or a growing backoff); the attempt is not counted"""
+        delay = error.retry_after or min(self.max_delay, self.base_delay * 2 ** self._outage_streak)
+        self._outage_streak += 1
+        self._paused_until = time.time() + delay
+        self.pauses += 1
+        logger.warning("Telegram unavailable, pausing the outbox for %ss: %s", delay, error)
+        await self.db.reschedule_outbox(row['id'], row['attempts'], self._paused_until, str(error))
+
+    async def _deliver(self, method: str, chat_id: str, payload: Dict[str, Any]) -> Optional[int]:
+        try:
+            return await self._call(method, {'chat_id': chat_id, **payload})
+        except DeliveryError as e:
+            # Broken MarkdownV2 will never parse; send the same text unformatted once
+            if 'parse entities' in str(e) and 'parse_mode' in payload:
+                plain = {k: v for k, v in payload.items() if k != 'parse_mode'}
+                return await self._call(method, {'chat_id': chat_id, **plain})
+            raise
+
+    async def _call(self, method: str, body: Dict[str, Any]) -> Optional[int]:
+        url = f"{settings.telegram_api_url}/bot{settings.telegram_bot_token}/{method}"
+        try:
+            async with self.session_manager.session.post(
+                url, json=body, timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                data = await response.json(content_type=None)
+        except asyncio.TimeoutError as e:
+            # This request took too long; retried as an attempt on this message
+            raise DeliveryError(f"{type(e).__name__}: {str(e)}")
+        except aiohttp.ClientConnectionError as e:
+            # Telegram could not be reached at all; every message would fail the same way
+            raise DeliveryError(f"{type(e).__name__}: {str(e)}", unavailable=True)
+        except (aiohttp.ClientError, json.JSONDecodeError) as e:
+            raise DeliveryError(f"{type(e).__name__}: {str(e)}")
+
+        if data.get('ok'):
+            result = data.get('result')
+            return result.get('message_id') if isinstance(result, dict) else None
+
+        description = data.get('description', 'Unknown error')
+        code = data.get('error_code', response.status)
+        if 'message is not modified' in description:
+            return body.get('message_id')
+        if code == 429:
+            retry_after = data.get('parameters', {}).get('retry_after', 1)
+            raise DeliveryError(description, retry_after=retry_after + 1)
+        # Other 4xx errors will fail the same way every time; 5xx are retried with backoff
+        raise DeliveryError(f"{code}: {description}", permanent=400 <= code < 500)
+
+    def stats(self) -> dict:
+        return {
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "dead_lettered": self.dead_lettered,
+            "pauses": self.pauses,
+            "paused_for_s": round(max(0.0, self._paused_until - time.time()), 1),
+            "waiters": len(self._waiters)
+        }
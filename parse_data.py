@@ -2,10 +2,12 @@ from decimal import Decimal
 from typing import Optional, Dict, List
 from time_utils import format_time_ago
 from datetime import datetime, timezone
-from solana.rpc.async_api import AsyncClient
-from solders.pubkey import Pubkey
 from database import Database
+from rpc_router import rpc_pool
+from token_cache import token_cache
+from token_metadata import decode_token_info, UNKNOWN_TOKEN
 import logging
+import base64
 import json
 import re
 
@@ -26,14 +28,14 @@ async def parse_transactions(tx_data, db) -> Dict:
             - 'wallet': The wallet address that triggered the transaction.
             - 'tx_type': The type of transaction (TRANSFER, SWAP, etc.).
     """
-    logger.info("PARSING TRANSACTION")
+    logger.debug("Parsing transaction %s", tx_data.get('signature'))
     wallet = tx_data.get('feePayer', 'Unknown')
 
     # Determine transaction type
     tx_type = tx_data.get('type', 'Unknown')
     if tx_type == "TRANSFER":
         desc = tx_data.get('description', '').split()  
-        logger.info(f"Description words: {desc}")
+        logger.debug("Description words: %s", desc)
         wallet = await find_addr(desc, db)
         return {
             'wallet': wallet,
@@ -45,8 +47,18 @@ async def parse_transactions(tx_data, db) -> Dict:
         'tx_type': tx_type
     }
 
+def involved_addresses(tx_data: dict) -> set:
+    """Collect every account a webhook transaction touches"""
+    addresses = {tx_data.get('feePayer')}
+    addresses.update(acc.get('account') for acc in tx_data.get('accountData') or [])
+    for transfer in (tx_data.get('tokenTransfers') or []) + (tx_data.get('nativeTransfers') or []):
+        addresses.add(transfer.get('fromUserAccount'))
+        addresses.add(transfer.get('toUserAccount'))
+    addresses.discard(None)
+    return addresses
+
 async def parse_transfer(tx_data: dict) -> dict:
-    """Parse transfer data with async token info lookup"""
+    """Parse transfer data; token names are filled in later by resolve_tokens"""
     transfers = tx_data.get('tokenTransfers', [])
     account_data = tx_data.get('accountData', [])
 
@@ -65,26 +77,23 @@ async def parse_transfer(tx_data: dict) -> dict:
         transfer = transfers[0]
         amount = Decimal(transfer.get('tokenAmount', 0))
         mint = transfer.get('mint')
-        token_name, symbol = await get_token_info(mint)  # Proper async call
-        
+
         return {
             'is_native': False,
             'is_single_token': True,
             'amount': amount,
-            'token': {'name': token_name, 'symbol': symbol},
+            'token': {'mint': mint, 'name': None, 'symbol': None},
             'from': transfer.get('fromUserAccount'),
             'to': transfer.get('toUserAccount'),
             'timestamp': tx_data.get('timestamp'),
             'signature': tx_data.get('signature', '')[:10] + '...'
         }
 
-    # Batch transfers need async processing
     processed_transfers = []
     for transfer in transfers:
-        token_name, symbol = await get_token_info(transfer.get('mint'))
         processed_transfers.append({
             'amount': Decimal(transfer.get('tokenAmount', 0)),
-            'token': {'name': token_name, 'symbol': symbol},
+            'token': {'mint': transfer.get('mint'), 'name': None, 'symbol': None},
             'from': transfer.get('fromUserAccount'),
             'to': transfer.get('toUserAccount')
         })
@@ -136,8 +145,8 @@ def parse_swap(tx_data: dict) -> Optional[dict]:
                 sold_transfer = token_transfers[0]
                 sold_token = {
                     'mint': sold_transfer['mint'],
-                    'symbol': get_token_info(sold_transfer['mint'], 'symbol'),
-                    'name': get_token_info(sold_transfer['mint'], 'name'),
+                    'symbol': None,
+                    'name': None,
                     'amount': abs(sold_transfer['tokenAmount']),
                     'decimals': sold_transfer['rawTokenAmount']['decimals']
                 }
@@ -147,8 +156,8 @@ def parse_swap(tx_data: dict) -> Optional[dict]:
                 bought_transfer = token_transfers[1]
                 bought_token = {
                     'mint': bought_transfer['mint'],
-                    'symbol': get_token_info(bought_transfer['mint'], 'symbol'),
-                    'name': get_token_info(bought_transfer['mint'], 'name'),
+                    'symbol': None,
+                    'name': None,
                     'amount': bought_transfer['tokenAmount'],
                     'decimals': bought_transfer['rawTokenAmount']['decimals']
                 }
@@ -167,39 +176,114 @@ def parse_swap(tx_data: dict) -> Optional[dict]:
         logger.error(f"Swap parsing error: {str(e)}")
         return None
                 
-async def get_token_info(token_mint_str: str, rpc_url: str = "https://api.mainnet-beta.solana.com") -> tuple[str, str]:
-    """Fetch token metadata asynchronously with proper await syntax."""
-    client = AsyncClient(rpc_url)  # Use async client
-    token_mint = Pubkey.from_string(token_mint_str)
-    metadata_program_id = Pubkey.from_string("metaqbxxUerdq28cj1RbAWkYQm3ybzjb6a8bt518x1s")
-    
-    # Get metadata PDA
-    metadata_pda = Pubkey.find_program_address(
-        [b"metadata", bytes(metadata_program_id), bytes(token_mint)],
-        metadata_program_id
-    )[0]
-
-    # Proper async call
-    account_info = await client.get_account_info(metadata_pda)
-    
-    if account_info.value is None:
-        return "Unknown Token", "UNK"
+def token_symbol(token: dict) -> str:
+    """Symbol for display, falling back to the shortened mint before enrichment"""
+    if token.get('symbol'):
+        return token['symbol']
+    mint = token.get('mint') or ''
+    return f"{mint[:4]}…{mint[-4:]}" if mint else 'UNK'
+
+
+def token_name(token: dict) -> str:
+    return token.get('name') or token.get('mint') or 'Unknown Token'
+
+
+def _apply_token_infos(tokens: List[dict], infos: Dict[str, tuple[str, str]]) -> bool:
+    """Set name/symbol from looked-up infos; unknown mints keep the mint fallback"""
+    changed = False
+    for token in tokens:
+        info = infos.get(token.get('mint'))
+        if info is not None and info != UNKNOWN_TOKEN:
+            token['name'], token['symbol'] = info
+            changed = True
+    return changed
+
+
+def fill_cached_tokens(tokens: List[dict]) -> List[dict]:
+    """Fill in name/symbol from the token cache; returns the tokens still missing"""
+    unresolved = [t for t in tokens if t.get('mint') and not t.get('symbol')]
+    cached = {}
+    for mint in dict.fromkeys(t['mint'] for t in unresolved):
+        info = token_cache.get(mint)
+        if info is not None:
+            cached[mint] = info
+    _apply_token_infos(unresolved, cached)
+    return [t for t in unresolved if t['mint'] not in cached]
+
+
+async def resolve_tokens(tokens: List[dict]) -> bool:
+    """Fetch name/symbol for the tokens ``fill_cached_tokens`` left missing
+
+    Returns True only if the fetch added metadata the tokens were missing.
+    """
+    pending = [t for t in tokens if t.get('mint') and not t.get('symbol')]
+    mints = list(dict.fromkeys(t['mint'] for t in pending))
+    if not mints:
+        return False
+
+    try:
+        fetched = await _fetch_token_infos(mints)
+    except Exception as e:
+        logger.warning(f"Token info lookup failed for {', '.join(mints)}: {str(e)}")
+        return False
+    return _apply_token_infos(pending, fetched)
+
+
+def transfer_tokens(transfer_data: dict) -> List[dict]:
+    """Token dicts of a parsed transfer, to be resolved in place"""
+    if transfer_data.get('is_native'):
+        return []
+    if transfer_data.get('is_single_token'):
+        return [transfer_data['token']]
+    return [t['token'] for t in transfer_data.get('transfers', [])]
+
+
+def swap_tokens(swap_data: dict) -> List[dict]:
+    """Token dicts of a parsed swap, to be resolved in place"""
+    return [t for t in (swap_data.get('sold_token'), swap_data.get('bought_token')) if t]
+
+
+async def get_token_info(token_mint_str: str) -> tuple[str, str]:
+    """Fetch token metadata from the best available RPC endpoint"""
+    return (await get_token_infos([token_mint_str]))[token_mint_str]
+
+
+async def get_token_infos(mints: List[str], warm: bool = False) -> Dict[str, tuple[str, str]]:
+    """Token metadata for many mints: cache first, then one getMultipleAccounts per 50 misses
+
+    Each call fetches the mints themselves (Token-2022 metadata extension)
+    and their Metaplex metadata accounts together. ``warm=True`` is for
+    preloading; it does not count towards the cache hit rate and marks the
+    loaded entries as warm-started.
+    """
+    resolved = {}
+    missing = []
+    for mint in dict.fromkeys(mints):
+        info = None if warm else token_cache.get(mint)
+        if info is not None:
+            resolved[mint] = info
+        elif not (warm and mint in token_cache):
+            missing.append(mint)
+    resolved.update(await _fetch_token_infos(missing, warm))
+    return resolved
 
-    data = bytes(account_info.value.data)
-    offset = 68
-    
-    # Parse name and symbol
-    name = data[offset:offset+32].rstrip(b'\x00').decode('utf-8', 'ignore')
-    offset += 32
-    
-    symbol_length = int.from_bytes(data[offset:offset+4], byteorder='little')
-    offset += 4
-    symbol = data[offset:offset+10][:symbol_length].decode('utf-8', 'ignore')
 
-    return (
-        name.replace('\x00', '').strip() or "Unknown Token",
-        symbol.replace('\x00', '').strip() or "UNK"
-    )
+async def _fetch_token_infos(missing: List[str], warm: bool = False) -> Dict[str, tuple[str, str]]:
+    """Fetch and cache metadata for mints known not to be cached"""
+    resolved = {}
+    # getMultipleAccounts takes up to 100 keys: 50 mints plus their metadata PDAs
+    for start in range(0, len(missing), 50):
+        chunk = missing[start:start + 50]
+        result = await rpc_pool.call(
+            "getMultipleAccounts",
+            [chunk + [token_cache.metadata_pda(mint) for mint in chunk], {"encoding": "base64"}]
+        )
+        accounts = [base64.b64decode(account['data'][0]) if account else None for account in result['value']]
+        for mint, mint_data, metadata_data in zip(chunk, accounts, accounts[len(chunk):]):
+            info = decode_token_info(mint_data, metadata_data)
+            token_cache.put(mint, info, warm=warm)
+            resolved[mint] = info
+    return resolved
 
 
 async def find_addr(desc: list[str], db: Database) -> Optional[str]:
@@ -211,4 +295,4 @@ async def find_addr(desc: list[str], db: Database) -> Optional[str]:
         normalized_addr = addr.lower().strip('.,!?')
         if normalized_addr in normalized_wallet_addresses:
             return addr.strip('.,!?')
-    return None
\ No newline at end of file
+    return None
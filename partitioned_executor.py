@@ -0,0 +1,95 @@
+from typing import Any, Awaitable, Callable, List, Optional
+import asyncio
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class PartitionedExecutor:
+    """Run async jobs serially per key and in parallel across keys
+
+    Keys are hashed into a fixed number of partitions, each drained by a
+    single worker, so jobs sharing a key (a wallet address) complete in
+    submission order. A global semaphore caps how many jobs run at once
+    across all partitions.
+    """
+
+    def __init__(self, partitions: int = 16, max_concurrency: int = 8):
+        self.partitions = partitions
+        self.max_concurrency = max_concurrency
+        self._queues: List[asyncio.Queue] = [asyncio.Queue() for _ in range(partitions)]
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._workers: List[asyncio.Task] = []
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self):
+        self._workers = [
+            asyncio.create_task(self._worker(queue), name=f"partition-{idx}")
+            for idx, queue in enumerate(self._queues)
+        ]
+        logger.info(f"Partitioned executor started ({self.partitions} partitions, "
+                    f"max {self.max_concurrency} concurrent)")
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Fail anything still queued so callers are not left waiting
+        for queue in self._queues:
+            while not queue.empty():
+                _, future = queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+
+    def partition_for(self, key: Optional[str]) -> int:
+        return zlib.crc32((key or "").encode()) % self.partitions
+
+    def submit(self, key: Optional[str], job: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """Queue a job on its key's partition; returns a future for its result"""
+        future = asyncio.get_running_loop().create_future()
+        self._queues[self.partition_for(key)].put_nowait((job, future))
+        return future
+
+    @property
+    def queued(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            job, future = await queue.get()
+            try:
+                if future.cancelled():
+                    continue
+                async with self._semaphore:
+                    self.in_flight += 1
+                    try:
+                        result = await job()
+                    finally:
+                        self.in_flight -= 1
+                self.completed += 1
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                queue.task_done()
+
+    def stats(self) -> dict:
+        return {
+            "partitions": self.partitions,
+            "max_concurrency": self.max_concurrency,
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed
+        }
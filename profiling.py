@@ -0,0 +1,166 @@
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+from config import settings
+import itertools
+import asyncio
+import threading
+import logging
+import random
+import json
+import time
+import sys
+import os
+
+logger = logging.getLogger(__name__)
+
+# Trace id of the transaction currently being processed (None = not sampled)
+_current_trace: ContextVar[Optional[int]] = ContextVar("current_trace", default=None)
+
+
+def _timestamp() -> str:
+    return datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+class Tracer:
+    """Sampled per-transaction stage spans, exported as Chrome trace events
+
+    ``trace()`` decides once per transaction whether it is sampled; every
+    ``span()`` entered underneath (across awaits, via contextvars) is then
+    recorded with its duration. Each transaction gets its own track, so
+    the dump opens in chrome://tracing or Perfetto as one row per tx.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, output_dir: str = "profiles", max_events: int = 100_000):
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.max_events = max_events
+        self._events: List[Dict] = []
+        self._ids = itertools.count(1)
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def trace(self, name: str, **args):
+        """Start a (possibly sampled) trace for one unit of work"""
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            yield
+            return
+        token = _current_trace.set(next(self._ids))
+        try:
+            with self.span(name, **args):
+                yield
+        finally:
+            _current_trace.reset(token)
+
+    def span(self, name: str, **args):
+        """Record a stage of the current trace; no-op when it is not sampled"""
+        trace_id = _current_trace.get()
+        if trace_id is None:
+            return nullcontext()
+        return self._record(trace_id, name, args)
+
+    @contextmanager
+    def _record(self, trace_id: int, name: str, args: Dict):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._events.append({
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": os.getpid(),
+                "tid": trace_id,
+                "args": args
+            })
+            if len(self._events) >= self.max_events:
+                self._flush()
+
+    def _flush(self):
+        """Write a full buffer from a worker thread so the loop is not blocked on disk"""
+        events, self._events = self._events, []
+        try:
+            asyncio.get_running_loop().run_in_executor(None, self._write, events)
+        except RuntimeError:
+            self._write(events)
+
+    def dump(self) -> Optional[str]:
+        """Write buffered spans to a Chrome trace file and clear the buffer"""
+        if not self._events:
+            return None
+        events, self._events = self._events, []
+        return self._write(events)
+
+    def _write(self, events: List[Dict]) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"trace-{_timestamp()}.json")
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        logger.info(f"Wrote {len(events)} spans to {path}")
+        return path
+
+    def stats(self) -> dict:
+        return {"sample_rate": self.sample_rate, "buffered_spans": len(self._events)}
+
+
+class StackSampler:
+    """Statistical sampler of one thread's Python stack for a bounded window
+
+    Output is in collapsed-stack format (``frame;frame;frame count``) that
+    flamegraph.pl and speedscope load directly.
+    """
+
+    def __init__(self, output_dir: str = "profiles", interval: float = 0.005):
+        self.output_dir = output_dir
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(self, duration: float, target_thread: Optional[int] = None) -> bool:
+        """Sample ``target_thread`` (default: the caller's) for ``duration`` seconds"""
+        if self.running:
+            return False
+        target = target_thread or threading.get_ident()
+        self._thread = threading.Thread(
+            target=self._run, args=(target, duration), name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def _run(self, target: int, duration: float):
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                stacks[self._collapse(frame)] += 1
+            time.sleep(self.interval)
+        self._write(stacks)
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(frames))
+
+    def _write(self, stacks: Counter):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"stacks-{_timestamp()}.txt")
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"Wrote {sum(stacks.values())} stack samples to {path}")
+
+
+tracer = Tracer(sample_rate=settings.profile_sample_rate, output_dir=settings.profile_dir)
+stack_sampler = StackSampler(output_dir=settings.profile_dir)
@@ -0,0 +1,158 @@
+from database import Database
+from helius_client import HeliusClient
+from rpc_router import rpc_pool
+from rpc_scheduler import rpc_priority, Priority
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import json
+import time
+
+logger = logging.getLogger(__name__)
+
+CURSOR_KEY = "reconcile_cursor"
+PASS_KEY = "reconcile_pass"  # counters of the pass the cursor belongs to
+LAST_PASS_KEY = "reconcile_last_pass"
+LAMPORTS_PER_SOL = 10 ** 9
+
+
+def _canonical_tokens(tokens: Any) -> str:
+    """Order-insensitive form of a holdings list for comparison"""
+    if isinstance(tokens, str):
+        try:
+            tokens = json.loads(tokens)
+        except ValueError:
+            return tokens
+    return json.dumps(sorted((tokens or []), key=lambda t: json.dumps(t, sort_keys=True)), sort_keys=True)
+
+
+async def get_sol_balances(addresses: List[str]) -> Dict[str, float]:
+    """SOL balances for up to 100 addresses in one ``getMultipleAccounts`` call"""
+    # Zero-length data slice: only lamports are needed
+    result = await rpc_pool.call(
+        "getMultipleAccounts",
+        [addresses, {"encoding": "base64", "dataSlice": {"offset": 0, "length": 0}}]
+    )
+    return {
+        address: (account or {}).get('lamports', 0) / LAMPORTS_PER_SOL
+        for address, account in zip(addresses, result['value'])
+    }
+
+
+class Reconciler:
+    """Continuously correct cached balances and holdings for every wallet
+
+    Wallets are walked in address order, ``chunk_size`` at a time. SOL
+    balances for a chunk come from one ``getMultipleAccounts`` call;
+    holdings are fetched with bounded concurrency. Only rows whose
+    balance or holdings differ from the cache are written. The position
+    and the pass counters are persisted together after each chunk, so a
+    restart resumes mid-pass with accurate totals. All RPC runs at
+    background priority under the shared budget.
+    """
+
+    def __init__(self, db: Database, helius: HeliusClient, interval: int = 3600,
+                 chunk_size: int = 100, concurrency: int = 4):
+        self.db = db
+        self.helius = helius
+        self.interval = interval
+        self.chunk_size = min(chunk_size, 100)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._task = None
+        self._pass: Dict[str, int] = self._new_pass()
+        self.last_pass: Optional[Dict[str, int]] = None
+        self.passes = 0
+
+    @staticmethod
+    def _new_pass() -> Dict[str, int]:
+        return {"checked": 0, "balance_mismatches": 0, "holdings_mismatches": 0, "updated": 0, "failed": 0}
+
+    async def start(self):
+        if self.interval <= 0:
+            return
+        self._task = asyncio.create_task(self._run())
+        logger.info("Reconciliation sweep started (chunks of %s)", self.chunk_size)
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        cursor = await self.db.get_job_state(CURSOR_KEY) or ""
+        self.last_pass = self._load_counters(await self.db.get_job_state(LAST_PASS_KEY))
+        if cursor:
+            self._pass = self._load_counters(await self.db.get_job_state(PASS_KEY)) or self._new_pass()
+        while True:
+            try:
+                with rpc_priority(Priority.BACKGROUND):
+                    cursor = await self.reconcile_chunk(cursor)
+            except Exception as e:
+                logger.error("Reconciliation chunk failed: %s", e, exc_info=True)
+                await asyncio.sleep(60)
+                continue
+
+            if not cursor:
+                await self._finish_pass()
+                await asyncio.sleep(self.interval)
+
+    async def reconcile_chunk(self, cursor: str) -> str:
+        """Reconcile the wallets after ``cursor``; returns the next cursor ("" = pass complete)"""
+        wallets = await self.db.get_wallets_after(cursor, self.chunk_size)
+        if not wallets:
+            return ""
+
+        balances = await get_sol_balances([w['address'] for w in wallets])
+        await asyncio.gather(*(self._reconcile_wallet(w, balances.get(w['address'])) for w in wallets))
+
+        cursor = wallets[-1]['address'] if len(wallets) == self.chunk_size else ""
+        await self.db.set_job_states({CURSOR_KEY: cursor, PASS_KEY: json.dumps(self._pass)})
+        return cursor
+
+    @classmethod
+    def _load_counters(cls, value: Optional[str]) -> Optional[Dict[str, int]]:
+        try:
+            counters = json.loads(value) if value else None
+        except ValueError:
+            return None
+        return dict(cls._new_pass(), **counters) if isinstance(counters, dict) else None
+
+    async def _reconcile_wallet(self, wallet: Dict[str, Any], sol_balance: Optional[float]):
+        address = wallet['address']
+        async with self._semaphore:
+            try:
+                tokens = await self.helius.get_token_assets(address)
+            except Exception as e:
+                self._pass["failed"] += 1
+                logger.warning("Holdings fetch failed for %s: %s", address, e)
+                return
+
+        self._pass["checked"] += 1
+        if sol_balance is None:
+            sol_balance = wallet.get('sol_balance') or 0.0
+        balance_changed = abs((wallet.get('sol_balance') or 0.0) - sol_balance) >= 1e-9
+        holdings_changed = _canonical_tokens(wallet.get('tokens')) != _canonical_tokens(tokens)
+        if not (balance_changed or holdings_changed):
+            return
+
+        self._pass["balance_mismatches"] += balance_changed
+        self._pass["holdings_mismatches"] += holdings_changed
+        self._pass["updated"] += 1
+        await self.db.update_portfolio(address, sol_balance, tokens)
+
+    async def _finish_pass(self):
+        summary = dict(self._pass, finished_at=int(time.time()))
+        await self.db.set_job_state(LAST_PASS_KEY, json.dumps(summary))
+        self.passes += 1
+        self.last_pass = summary
+        self._pass = self._new_pass()
+        logger.info(
+            "Reconciliation pass complete: %s checked, %s balance and %s holdings discrepancies, %s failed",
+            summary['checked'], summary['balance_mismatches'], summary['holdings_mismatches'], summary['failed']
+        )
+
+    def stats(self) -> dict:
+        return {"passes": self.passes, "current_pass": dict(self._pass), "last_pass": self.last_pass}
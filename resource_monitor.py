@@ -1,5 +1,4 @@
 import resource
-import psutil
 from datetime import datetime
 import logging
 import asyncio
@@ -35,6 +34,8 @@ class ResourceMonitor:
     def log_resources(self):
         """Log current resource usage"""
         try:
+            import psutil  # deferred: not needed until the first sample
+
             process = psutil.Process()
             connections = process.net_connections(kind='tcp') 
             mem = psutil.virtual_memory()
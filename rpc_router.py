@@ -0,0 +1,233 @@
+from collections import deque
+from typing import Any, Deque, List, Optional
+from urllib.parse import urlparse
+from config import settings
+from rpc_scheduler import Priority, current_priority, rpc_scheduler
+import aiohttp
+import asyncio
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RpcError(Exception):
+    """An RPC endpoint failed or returned a JSON-RPC error"""
+
+
+class RpcResponseError(RpcError):
+    """The endpoint answered with a JSON-RPC ``error``; another endpoint would say the same"""
+
+
+class CircuitBreaker:
+    """Stop sending to an endpoint after repeated failures, probe again later"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this opened the circuit"""
+        self.failures += 1
+        if self.state == "half_open" or (self.opened_at is None and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+
+class Endpoint:
+    """One RPC URL with EWMA latency / error tracking"""
+
+    FAILURE_PENALTY = 1.0
+
+    def __init__(self, name: str, url: str, alpha: float = 0.2):
+        self.name = name
+        self.url = url
+        self.alpha = alpha
+        self.ewma_latency = 0.3
+        self.ewma_errors = 0.0
+        self.samples: Deque[float] = deque(maxlen=200)
+        self.breaker = CircuitBreaker()
+        self.requests = 0
+
+    @property
+    def score(self) -> float:
+        """Lower is better: latency inflated by the recent error rate"""
+        return self.ewma_latency * (1 + 4 * self.ewma_errors)
+
+    def p95(self) -> float:
+        if len(self.samples) < 20:
+            return self.ewma_latency * 2
+        ordered = sorted(self.samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def record(self, latency: float, ok: bool):
+        self.requests += 1
+        self.ewma_errors = (1 - self.alpha) * self.ewma_errors + self.alpha * (0.0 if ok else 1.0)
+        # Failures count as at least a second so a fast-failing endpoint does not look fast
+        sample = latency if ok else max(latency, self.FAILURE_PENALTY)
+        self.ewma_latency = (1 - self.alpha) * self.ewma_latency + self.alpha * sample
+        if ok:
+            self.samples.append(latency)
+            self.breaker.record_success()
+        elif self.breaker.record_failure():
+            logger.warning(f"Circuit opened for RPC endpoint {self.name} after {self.breaker.failures} failures")
+
+    def stats(self) -> dict:
+        return {
+            "url": urlparse(self.url).hostname,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1),
+            "p95_ms": round(self.p95() * 1000, 1),
+            "error_rate": round(self.ewma_errors, 3),
+            "circuit": self.breaker.state,
+            "requests": self.requests
+        }
+
+
+class EndpointPool:
+    """Route JSON-RPC calls to the currently best endpoint
+
+    Endpoints are ranked by EWMA latency weighted by error rate, skipping
+    any whose circuit breaker is open. A failed call falls through to the
+    next endpoint. With ``hedge=True`` a duplicate request is sent to the
+    runner-up once the primary exceeds its own p95 latency, and whichever
+    answers first wins. By default only latency-critical calls
+    (interactive or live-alert priority) are hedged; background jobs
+    never pay for a duplicate request.
+    """
+
+    def __init__(self, endpoints: List[Endpoint], timeout: float = 10.0, max_attempts: int = 3):
+        self.endpoints = endpoints
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ids = itertools.count(1)
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @classmethod
+    def from_settings(cls) -> "EndpointPool":
+        endpoints = [
+            Endpoint("helius", settings.das_endpoint),
+            Endpoint("public", settings.solana_cluster_url),
+        ]
+        extra = [url.strip() for url in settings.rpc_extra_urls.split(",") if url.strip()]
+        endpoints.extend(Endpoint(f"extra{idx}", url) for idx, url in enumerate(extra, 1))
+        return cls(endpoints)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    def ranked(self) -> List[Endpoint]:
+        available = [e for e in self.endpoints if e.breaker.allow()]
+        # If every breaker is open, try them all rather than fail outright
+        return sorted(available or self.endpoints, key=lambda e: e.score)
+
+    async def call(self, method: str, params: list, hedge: Optional[bool] = None) -> Any:
+        """Send a JSON-RPC request and return its ``result``"""
+        if hedge is None:
+            hedge = settings.rpc_hedge_requests and current_priority() <= Priority.LIVE_ALERT
+        candidates = self.ranked()[:self.max_attempts]
+        last_error: Optional[Exception] = None
+
+        while candidates:
+            primary = candidates.pop(0)
+            try:
+                if hedge and candidates:
+                    return await self._hedged(method, params, primary, candidates[0])
+                return await self._send(primary, method, params)
+            except RpcResponseError:
+                raise
+            except RpcError as e:
+                last_error = e
+                logger.warning(f"RPC {method} failed on {primary.name}: {str(e)}")
+        raise last_error or RpcError("No RPC endpoints configured")
+
+    async def _hedged(self, method: str, params: list, primary: Endpoint, secondary: Endpoint) -> Any:
+        first = asyncio.create_task(self._send(primary, method, params))
+        try:
+            done, _ = await asyncio.wait({first}, timeout=max(settings.rpc_hedge_min_delay, primary.p95()))
+        except asyncio.CancelledError:
+            # The caller gave up (e.g. an enrichment deadline): do not leave the request running
+            first.cancel()
+            raise
+        if done:
+            return first.result()
+
+        self.hedges += 1
+        second = asyncio.create_task(self._send(secondary, method, params))
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+                    if isinstance(error, RpcResponseError):
+                        raise error
+        finally:
+            for task in pending:
+                task.cancel()
+        raise error
+
+    async def _send(self, endpoint: Endpoint, method: str, params: list) -> Any:
+        await rpc_scheduler.acquire(endpoint.url)
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+        started = time.monotonic()
+        try:
+            async with self.session.post(endpoint.url, json=payload) as response:
+                if response.status >= 400:
+                    raise RpcError(f"HTTP {response.status}")
+                data = await response.json(content_type=None)
+        except asyncio.CancelledError:
+            raise
+        except RpcError:
+            endpoint.record(time.monotonic() - started, ok=False)
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            endpoint.record(time.monotonic() - started, ok=False)
+            raise RpcError(f"{type(e).__name__}: {str(e)}") from e
+
+        endpoint.record(time.monotonic() - started, ok=True)
+        if 'error' in data:
+            raise RpcResponseError(f"{data['error'].get('code')}: {data['error'].get('message')}")
+        return data.get('result')
+
+    def stats(self) -> dict:
+        return {
+            "endpoints": {e.name: e.stats() for e in self.endpoints},
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins
+        }
+
+
+rpc_pool = EndpointPool.from_settings()
@@ -0,0 +1,160 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from config import settings
+import itertools
+import asyncio
+import logging
+import heapq
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """RPC priority classes; lower values are served first"""
+    INTERACTIVE = 0   # bot commands a user is waiting on
+    LIVE_ALERT = 1    # enrichment for alerts being delivered now
+    BACKGROUND = 2    # refresh, backfill and reconciliation jobs
+
+
+_current_priority: ContextVar[Priority] = ContextVar("rpc_priority", default=Priority.LIVE_ALERT)
+
+
+def current_priority() -> Priority:
+    """Priority RPCs issued from the current context run at"""
+    return _current_priority.get()
+
+
+@contextmanager
+def rpc_priority(priority: Priority):
+    """Run every RPC issued inside the block (and tasks it spawns) at ``priority``"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def endpoint_for(url: str) -> str:
+    """Budget key for a URL: its host (API keys in the query are ignored)"""
+    return urlparse(url).hostname or url
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class RpcScheduler:
+    """Shared requests-per-second budget for every outbound RPC
+
+    Each endpoint host has a token bucket. Callers ``await acquire(url)``
+    before sending; when the bucket is empty they queue and are released
+    strictly by priority class (then FIFO), so background jobs never take
+    budget an interactive command or live alert is waiting for.
+    """
+
+    def __init__(self, rates: Dict[str, float], default_rate: float = 5.0, burst_seconds: float = 1.0):
+        self.rates = rates
+        self.default_rate = default_rate
+        self.burst_seconds = burst_seconds
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._waiters: Dict[str, List[Tuple[int, int, asyncio.Future]]] = defaultdict(list)
+        self._dispatchers: Dict[str, asyncio.Task] = {}
+        self._seq = itertools.count()
+        self._requests = defaultdict(int)
+        self._wait_seconds = defaultdict(float)
+
+    def _bucket(self, endpoint: str) -> TokenBucket:
+        if endpoint not in self._buckets:
+            rate = self.rates.get(endpoint, self.default_rate)
+            self._buckets[endpoint] = TokenBucket(rate, max(1.0, rate * self.burst_seconds))
+        return self._buckets[endpoint]
+
+    async def acquire(self, url: str, priority: Optional[Priority] = None):
+        """Wait for one request's worth of budget on the URL's endpoint"""
+        priority = _current_priority.get() if priority is None else priority
+        endpoint = endpoint_for(url)
+        started = time.monotonic()
+
+        if not self._waiters[endpoint] and self._bucket(endpoint).try_take():
+            self._record(endpoint, priority, 0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters[endpoint], (int(priority), next(self._seq), future))
+        dispatcher = self._dispatchers.get(endpoint)
+        if dispatcher is None or dispatcher.done():
+            self._dispatchers[endpoint] = asyncio.create_task(self._dispatch(endpoint))
+        await future
+        self._record(endpoint, priority, time.monotonic() - started)
+
+    async def _dispatch(self, endpoint: str):
+        bucket = self._bucket(endpoint)
+        waiters = self._waiters[endpoint]
+        while waiters:
+            if not bucket.try_take():
+                await asyncio.sleep(bucket.wait_time())
+                continue
+            while waiters:
+                _, _, future = heapq.heappop(waiters)
+                if not future.done():
+                    future.set_result(None)
+                    break
+            else:
+                # Everyone waiting was cancelled; give the token back
+                bucket.tokens += 1
+
+    def _record(self, endpoint: str, priority: Priority, waited: float):
+        key = (endpoint, priority.name.lower())
+        self._requests[key] += 1
+        self._wait_seconds[key] += waited
+
+    def stats(self) -> dict:
+        """Requests and queueing delay per endpoint and priority class"""
+        report = {}
+        for (endpoint, priority), count in self._requests.items():
+            report.setdefault(endpoint, {})[priority] = {
+                "requests": count,
+                "avg_wait_ms": round(self._wait_seconds[(endpoint, priority)] / count * 1000, 1)
+            }
+        for endpoint, bucket in self._buckets.items():
+            report.setdefault(endpoint, {})["rate_per_second"] = bucket.rate
+            report[endpoint]["queued"] = len(self._waiters[endpoint])
+        return report
+
+
+def parse_rate_limits(spec: str) -> Dict[str, float]:
+    """Parse "host=rps,host=rps" into a rate map"""
+    rates = {}
+    for part in spec.split(','):
+        if '=' in part:
+            host, rate = part.split('=', 1)
+            rates[host.strip()] = float(rate)
+    return rates
+
+
+rpc_scheduler = RpcScheduler(parse_rate_limits(settings.rpc_rate_limits), default_rate=settings.rpc_default_rate)
@@ -3,33 +3,80 @@ import io
 import json
 import logging
 import asyncio
-from typing import Any
+from typing import Any, Optional
 import asyncio
 
 from telegram import Update, InputFile
-from telegram.ext import Application, CommandHandler, CallbackContext
+from telegram.ext import Application, CommandHandler, CallbackContext, MessageHandler, filters
 from telegram.helpers import escape_markdown
-from telegram.error import RetryAfter
+from telegram.error import RetryAfter, TelegramError
 
 from database import Database
 from config import settings
 from helius_client import HeliusClient
 from time_utils import format_time_ago
+from profiling import tracer, stack_sampler
+from memory_diagnostics import memory_diagnostics
+from rpc_scheduler import Priority, rpc_priority
+from webhook_sync import WebhookSync
+from wallet_registry import WalletRegistry
+from notification_router import Rule
+from update_processor import FairUpdateProcessor
+from templates import md
+import templates
+from wallet_import import fetch_initial_portfolios, is_solana_address, plan_import, read_text, write_export
 
 logger = logging.getLogger(__name__)
 
+# /routes add key -> notification_rules column
+ROUTE_CRITERIA = {
+    'type': 'tx_type', 'wallet': 'wallet', 'tag': 'tag', 'mint': 'mint',
+    'source': 'source', 'min': 'min_amount', 'max': 'max_amount'
+}
+
+# Static, so escaped once at import
+MENU_TEXT = (
+    "🌴 *Private Palm Bot* 🌴\n\n"
+    f"/addwallet <address\\> <alias\\> \\- *{md('Add wallet')}*\n"
+    f"/removewallet <alias\\|address\\> \\- *{md('Remove wallet')}*\n"
+    f"/listwallets \\- *{md('Show monitored wallets')}*\n"
+    f"/importwallets \\- *{md('Add wallets from a CSV/TXT file')}*\n"
+    f"/exportwallets \\- *{md('Download wallets as CSV')}*\n"
+    f"/walletstatus <alias\\|address\\> \\- *{md('Check status')}*\n"
+    f"/portfolio <alias\\|address\\> \\- *{md('Show portfolio')}*\n"
+    f"/menu \\- *{md('Show command menu')}*"
+)
+
+
 class PalmBot:
-    def __init__(self, token: str, db: Database, helius_client: HeliusClient):
-        self.application = Application.builder().token(token).build()
+    def __init__(self, token: str, db: Database, helius_client: HeliusClient,
+                 webhook_sync: Optional[WebhookSync] = None, registry: Optional[WalletRegistry] = None):
+        builder = Application.builder().token(token)
+        if settings.telegram_base_url:
+            # Self-hosted Bot API server
+            base_url = settings.telegram_api_url
+            builder = builder.base_url(f"{base_url}/bot").base_file_url(f"{base_url}/file/bot")
+        self.processor = None
+        if settings.command_workers > 0:
+            self.processor = FairUpdateProcessor.from_settings()
+            builder = builder.concurrent_updates(self.processor)
+        self.application = builder.build()
+        self.mode = None
         self.db = db
         self.helius_client = helius_client
+        self.webhook_sync = webhook_sync
+        self.registry = registry
+        self._registry_refresh = None
+        self._registry_dirty = False
+        self._background = set()
         self._register_handlers()
         self.updater = None
         logger.info("PalmBot initialized")
 
     @classmethod
-    async def create(cls, token: str, db: Database, helius_client: HeliusClient):
-        instance = cls(token, db, helius_client)
+    async def create(cls, token: str, db: Database, helius_client: HeliusClient,
+                     webhook_sync: Optional[WebhookSync] = None, registry: Optional[WalletRegistry] = None):
+        instance = cls(token, db, helius_client, webhook_sync, registry)
         await instance.setup()
         return instance
 
@@ -38,12 +85,35 @@ class PalmBot:
         self.updater = self.application.updater
         logger.info("PalmBot setup completed")
 
-    async def start(self):
-        if not self.application.running:
-            await self.application.start()
-            if self.updater:
-                await self.updater.start_polling()
-            logger.info("PalmBot started in polling mode")
+    async def start(self, webhook_url: Optional[str] = None, secret_token: Optional[str] = None):
+        """Start receiving updates: pushed to ``webhook_url`` if given, else by polling
+
+        In webhook mode the HTTP server hands updates to
+        ``process_webhook_update``; if Telegram refuses the webhook the bot
+        falls back to polling.
+        """
+        if self.application.running:
+            return
+        await self.application.start()
+        if webhook_url:
+            try:
+                await self.application.bot.set_webhook(
+                    webhook_url, secret_token=secret_token, allowed_updates=Update.ALL_TYPES
+                )
+                self.mode = "webhook"
+                logger.info(f"PalmBot started in webhook mode ({webhook_url})")
+                return
+            except TelegramError as e:
+                logger.error(f"Telegram webhook registration failed, falling back to polling: {str(e)}")
+        if self.updater:
+            # Also removes any webhook left from a previous run
+            await self.updater.start_polling(allowed_updates=Update.ALL_TYPES)
+        self.mode = "polling"
+        logger.info("PalmBot started in polling mode")
+
+    async def process_webhook_update(self, data: dict):
+        """Queue an update delivered to the Telegram webhook route"""
+        await self.application.update_queue.put(Update.de_json(data, self.application.bot))
 
     def _register_handlers(self):
         handlers = [
@@ -51,8 +121,20 @@ class PalmBot:
             CommandHandler("addwallet", self.add_wallet_command),
             CommandHandler("removewallet", self.remove_wallet_command),
             CommandHandler("listwallets", self.list_wallets_command),
+            CommandHandler("importwallets", self.import_wallets_command),
+            # A document captioned /importwallets is not a command message
+            MessageHandler(
+                filters.Document.ALL & filters.CaptionRegex(r"^/importwallets(@\w+)?(\s|$)"),
+                self.import_wallets_command
+            ),
+            CommandHandler("exportwallets", self.export_wallets_command),
             CommandHandler("walletstatus", self.wallet_status_command),
             CommandHandler("portfolio", self.portfolio_command),
+            CommandHandler("deadletters", self.dead_letters_command),
+            CommandHandler("replay", self.replay_command),
+            CommandHandler("routes", self.routes_command),
+            CommandHandler("profile", self.profile_command),
+            CommandHandler("memstats", self.memstats_command),
         ]
         for handler in handlers:
             self.application.add_handler(handler)
@@ -80,17 +162,16 @@ class PalmBot:
     def _escape(self, text: str) -> str:
         return escape_markdown(str(text), version=2)
 
-    async def menu_command(self, update: Update, context: CallbackContext):
-        menu_text = (
-            "🌴 *Private Palm Bot* 🌴\n\n"
-            f"/addwallet <address\\> <alias\\> \\- *{self._escape('Add wallet')}*\n"
-            f"/removewallet <alias\\|address\\> \\- *{self._escape('Remove wallet')}*\n"
-            f"/listwallets \\- *{self._escape('Show monitored wallets')}*\n"
-            f"/walletstatus <alias\\|address\\> \\- *{self._escape('Check status')}*\n"
-            f"/portfolio <alias\\|address\\> \\- *{self._escape('Show portfolio')}*\n"
-            f"/menu \\- *{self._escape('Show command menu')}*"
+    def _is_admin(self, update: Update) -> bool:
+        """Admins are the main alert chat plus any ADMIN_USER_IDS"""
+        admin_ids = {uid.strip() for uid in settings.admin_user_ids.split(",") if uid.strip()}
+        return (
+            str(update.effective_chat.id) == str(settings.telegram_chat_id)
+            or (update.effective_user is not None and str(update.effective_user.id) in admin_ids)
         )
-        await self._safe_reply(update, menu_text)
+
+    async def menu_command(self, update: Update, context: CallbackContext):
+        await self._safe_reply(update, MENU_TEXT)
 
     async def add_wallet_command(self, update: Update, context: CallbackContext):
         try:
@@ -100,14 +181,20 @@ class PalmBot:
                 return
 
             address, alias = args[0].strip(), args[1].strip().lower()
-            await self.db.save_wallet(address, alias)
+            if not is_solana_address(address):
+                await self._safe_reply(update, "❌ Invalid Solana address")
+                return
+            await self.db.add_subscription(update.effective_chat.id, address, alias)
+            self._wallets_changed()
             response = (
                 "✅ *Wallet added:*\n"
                 f"Address: `{self._escape(address)}`\n"
                 f"Alias: *{self._escape(alias)}*"
             )
             await self._safe_reply(update, response)
-            logger.info(f"Added new wallet: {alias} ({address})")
+            logger.info(f"Added new wallet: {alias} ({address}) for chat {update.effective_chat.id}")
+        except ValueError as e:
+            await self._safe_reply(update, f"❌ {self._escape(str(e))}")
         except Exception as e:
             logger.error(f"Error in add_wallet_command: {str(e)}")
             await self._safe_reply(update, "⚠️ Error adding wallet")
@@ -119,22 +206,118 @@ class PalmBot:
                 return
 
             identifier = context.args[0].strip()
-            wallet = await self.db.get_wallet(identifier)
+            wallet = await self.db.get_subscription(update.effective_chat.id, identifier)
 
             if not wallet:
                 await self._safe_reply(update, "ℹ️ Wallet not found")
                 return
 
-            await self.db.remove_wallet(wallet['address'])
+            untracked = await self.db.remove_subscription(update.effective_chat.id, wallet['address'])
+            self._wallets_changed()
             await self._safe_reply(update, f"✅ Removed wallet: *{self._escape(wallet['alias'])}*")
-            logger.info(f"Removed wallet: {wallet['alias']} ({wallet['address']})")
+            logger.info(
+                f"Removed wallet: {wallet['alias']} ({wallet['address']}) for chat {update.effective_chat.id}"
+                + ("; no longer tracked" if untracked else "")
+            )
         except Exception as e:
             logger.error(f"Error in remove_wallet_command: {str(e)}")
             await self._safe_reply(update, "⚠️ Error removing wallet")
 
+    async def import_wallets_command(self, update: Update, context: CallbackContext):
+        """Follow every wallet in an attached CSV/TXT of ``address[,alias]`` lines"""
+        try:
+            message = update.message
+            document = message.document or (message.reply_to_message and message.reply_to_message.document)
+            if not document:
+                await self._safe_reply(
+                    update, "`Usage: send a CSV/TXT of address,alias lines captioned /importwallets`"
+                )
+                return
+            if (document.file_size or 0) > settings.wallet_import_max_bytes:
+                await self._safe_reply(
+                    update, f"❌ File too large \\(max {settings.wallet_import_max_bytes // 1000} KB\\)"
+                )
+                return
+
+            chat_id = update.effective_chat.id
+            data = bytes(await (await document.get_file()).download_as_bytearray())
+            existing = await self.db.list_subscriptions(chat_id)
+            # Tens of thousands of lines would stall the loop; parse off it
+            plan = await asyncio.to_thread(plan_import, read_text(data), existing, settings.wallet_import_max)
+            new = []
+            if plan.wallets:
+                new = await self.db.add_subscriptions(chat_id, plan.wallets)
+                self._wallets_changed()
+
+            lines = [f"📥 *Imported {len(plan.wallets)} wallets*"]
+            if plan.already_followed or plan.duplicates:
+                lines.append(self._escape(
+                    f"Skipped {plan.already_followed} already followed, {plan.duplicates} repeated in the file"
+                ))
+            if plan.invalid:
+                shown = ", ".join(str(line) for line in plan.invalid[:10])
+                more = f" and {len(plan.invalid) - 10} more" if len(plan.invalid) > 10 else ""
+                lines.append(self._escape(f"Invalid addresses on lines {shown}{more}"))
+            if plan.alias_collisions:
+                lines.append(self._escape(
+                    f"Alias already used: {', '.join(plan.alias_collisions[:10])}"
+                    + (f" and {len(plan.alias_collisions) - 10} more" if len(plan.alias_collisions) > 10 else "")
+                ))
+            if plan.truncated:
+                lines.append(self._escape(f"Stopped at the {settings.wallet_import_max} wallet limit"))
+            if new and self.helius_client:
+                lines.append(self._escape(f"Fetching portfolios for {len(new)} new wallets..."))
+                task = asyncio.create_task(self._fetch_imported(update, new))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+            await self._safe_reply(update, "\n".join(lines))
+            logger.info(f"Imported {len(plan.wallets)} wallets for chat {chat_id}: {plan.summary()}")
+        except ValueError as e:
+            await self._safe_reply(update, f"❌ {self._escape(str(e))}")
+        except Exception as e:
+            logger.error(f"Error in import_wallets_command: {str(e)}", exc_info=True)
+            await self._safe_reply(update, "⚠️ Error importing wallets")
+
+    async def _fetch_imported(self, update: Update, addresses):
+        try:
+            fetched = await fetch_initial_portfolios(
+                self.db, self.helius_client, addresses, concurrency=settings.reconcile_concurrency
+            )
+            await self._safe_reply(update, self._escape(f"📦 Portfolios ready for {fetched}/{len(addresses)} imported wallets"))
+        except Exception as e:
+            logger.error(f"Initial portfolio fetch failed: {str(e)}")
+
+    async def export_wallets_command(self, update: Update, context: CallbackContext):
+        """Send the chat's wallets as a CSV that /importwallets accepts"""
+        try:
+            bio = await write_export(self.db, update.effective_chat.id)
+            await self._reply_document_md(update, document=InputFile(bio), caption="📤 *Monitored wallets*")
+        except Exception as e:
+            logger.error(f"Error in export_wallets_command: {str(e)}")
+            await self._safe_reply(update, "⚠️ Error exporting wallets")
+
+    def _wallets_changed(self):
+        """Resync Helius webhooks and refresh the subscriber index after an edit"""
+        if self.webhook_sync and self.webhook_sync.enabled:
+            self.webhook_sync.request_sync()
+        if self.registry:
+            self._registry_dirty = True
+            if not (self._registry_refresh and not self._registry_refresh.done()):
+                self._registry_refresh = asyncio.create_task(self._refresh_registry())
+
+    async def _refresh_registry(self):
+        # Reload again if another edit landed while a load was reading
+        while self._registry_dirty:
+            self._registry_dirty = False
+            try:
+                await self.registry.load()
+            except Exception as e:
+                logger.error(f"Wallet registry refresh failed: {str(e)}")
+                return
+
     async def list_wallets_command(self, update: Update, context: CallbackContext):
         try:
-            wallets = await self.db.load_all_wallets()
+            wallets = await self.db.list_subscriptions(update.effective_chat.id)
             if wallets:
                 # Escape literal parentheses around the wallet address.
                 wallet_lines = "\n".join(
@@ -154,7 +337,7 @@ class PalmBot:
                 await self._safe_reply(update, "`Usage: /walletstatus <alias|address>`")
                 return
 
-            wallet = await self.db.get_wallet(context.args[0].strip())
+            wallet = await self.db.get_subscription(update.effective_chat.id, context.args[0].strip())
             if not wallet:
                 await self._safe_reply(update, "ℹ️ Wallet not found")
                 return
@@ -179,7 +362,7 @@ class PalmBot:
                 return
 
             identifier = " ".join(context.args).strip().lower()
-            wallet = await self.db.get_wallet(identifier)  # Changed to await
+            wallet = await self.db.get_subscription(update.effective_chat.id, identifier)
             if not wallet:
                 await self._reply_md(update, "ℹ️ Wallet not found")
                 return
@@ -194,8 +377,9 @@ class PalmBot:
 
             if not cache_valid:
                 try:
-                    # Changed to await both lines
-                    sol_balance, tokens = await self.helius_client.get_portfolio(wallet['address'])
+                    # A user is waiting on this; let it jump queued background RPC
+                    with rpc_priority(Priority.INTERACTIVE):
+                        sol_balance, tokens = await self.helius_client.get_portfolio(wallet['address'])
                     await self.db.update_portfolio(wallet['address'], sol_balance, tokens)
                     cache_status = " (live)"
                 except Exception as e:
@@ -205,7 +389,7 @@ class PalmBot:
                 cache_status = " (cached)"
 
             # Retrieve latest data - KEEP ORIGINAL STRUCTURE
-            wallet = await self.db.get_wallet(identifier)  # Changed to await
+            wallet = await self.db.get_subscription(update.effective_chat.id, identifier)
             last_updated = format_time_ago(wallet.get('last_asset_check'))
 
             # Process tokens - ORIGINAL CODE
@@ -221,30 +405,17 @@ class PalmBot:
                 except Exception as e:
                     logger.error(f"Token processing error: {str(e)}", exc_info=True)
 
-            # ORIGINAL MESSAGE TEMPLATE - DO NOT MODIFY
-            message_template = (
-                "✨ *{alias} Portfolio{cache_status}* ✨\n"
-                "_Last updated: {updated}_\n"
-                "`―――――――――――――――――――――――`\n"
-                "*🟣 SOL Balance:*\n"
-                "`{sol_balance}`\n\n"
-                "*🪙 Top Assets \\({total} total\\):*\n"
-                "{assets}\n"
-                "`―――――――――――――――――――――――`\n"
-                "_Full portfolio attached_ \\📎"
-            )
-
-            # ORIGINAL FORMATTING - DO NOT MODIFY
-            formatted_message = message_template.format(
-                alias=escape_markdown(wallet['alias'], version=2),
-                cache_status=escape_markdown(cache_status, version=2),
-                updated=escape_markdown(last_updated, version=2),
-                sol_balance=escape_markdown(f"{wallet.get('sol_balance', 0):12.4f} SOL", version=2),
+            formatted_message = templates.PORTFOLIO.render(
+                alias=wallet['alias'],
+                cache_status=cache_status,
+                updated=last_updated,
+                sol_balance=wallet.get('sol_balance', 0),
                 total=len(tokens),
                 assets="\n".join([
-                    f"{idx:>2}\\. *{escape_markdown(t.get('name', 'Unknown'), version=2)}* "
-                    f"\\({escape_markdown(t.get('symbol', 'UNK'), version=2)}\\)\n"
-                    f"   `{t.get('amount', 0)/10**t.get('decimals',9):15,.4f}`"
+                    templates.PORTFOLIO_ASSET.render(
+                        index=idx, name=t.get('name', 'Unknown'), symbol=t.get('symbol', 'UNK'),
+                        amount=t.get('amount', 0) / 10 ** t.get('decimals', 9)
+                    )
                     for idx, t in enumerate(tokens[:20], 1)
                 ]) if tokens else "*🫙 No token holdings found*"
             )
@@ -298,6 +469,183 @@ class PalmBot:
             logger.error(f"Error in portfolio_command: {str(e)}", exc_info=True)
             await self._reply_md(update, "⚠️ Error showing portfolio")
             
+    async def dead_letters_command(self, update: Update, context: CallbackContext):
+        """Show notifications that exhausted their delivery retries"""
+        try:
+            if not self._is_admin(update):
+                return
+
+            total = await self.db.count_dead_letters()
+            if not total:
+                await self._safe_reply(update, "✅ No dead\\-lettered notifications")
+                return
+
+            lines = []
+            for letter in await self.db.list_dead_letters(limit=10):
+                text = json.loads(letter['payload']).get('text', '')
+                lines.append(
+                    f"• `#{letter['id']}` {self._escape(format_time_ago(letter['failed_at']))}, "
+                    f"{self._escape(letter['attempts'])} attempts\n"
+                    f"  _{self._escape((letter['last_error'] or 'unknown error')[:200])}_\n"
+                    f"  `{self._escape(text[:60])}`"
+                )
+            response = (
+                f"📭 *Dead letters \\({total} total\\):*\n" + "\n".join(lines) +
+                "\n\nUse /replay <id\\|all\\> to requeue"
+            )
+            await self._safe_reply(update, response)
+        except Exception as e:
+            logger.error(f"Error in dead_letters_command: {str(e)}")
+            await self._safe_reply(update, "⚠️ Error listing dead letters")
+
+    async def replay_command(self, update: Update, context: CallbackContext):
+        """Move dead-lettered notifications back into the outbox"""
+        try:
+            if not self._is_admin(update):
+                return
+            if not context.args:
+                await self._safe_reply(update, "`Usage: /replay <id|all>`")
+                return
+
+            target = context.args[0].strip().lower()
+            if target != 'all' and not target.lstrip('#').isdigit():
+                await self._safe_reply(update, "`Usage: /replay <id|all>`")
+                return
+
+            dead_letter_id = None if target == 'all' else int(target.lstrip('#'))
+            replayed = await self.db.replay_dead_letters(dead_letter_id)
+            await self._safe_reply(update, f"🔁 Requeued {replayed} notification{'s' if replayed != 1 else ''}")
+            logger.info(f"Replayed {replayed} dead letters ({target})")
+        except Exception as e:
+            logger.error(f"Error in replay_command: {str(e)}")
+            await self._safe_reply(update, "⚠️ Error replaying dead letters")
+
+    async def routes_command(self, update: Update, context: CallbackContext):
+        """List, add or delete alert routing rules"""
+        usage = (
+            "`Usage: /routes [add <chat_id[,chat_id]> [type=SWAP] [wallet=<alias|address>] "
+            "[tag=whale] [mint=<mint>] [source=JUPITER] [min=1.5] [max=100]|del <id>]`"
+        )
+        try:
+            if not self._is_admin(update):
+                return
+
+            args = context.args or []
+            action = args[0].lower() if args else 'list'
+
+            if action == 'add' and len(args) > 1:
+                criteria = {}
+                for arg in args[2:]:
+                    key, _, value = arg.partition('=')
+                    column = ROUTE_CRITERIA.get(key.lower())
+                    if not column or not value:
+                        await self._safe_reply(update, usage)
+                        return
+                    criteria[column] = float(value) if column.endswith('_amount') else value
+                if 'wallet' in criteria:
+                    # Aliases are per chat, so resolve against this chat's subscriptions
+                    wallet = await self.db.get_subscription(update.effective_chat.id, criteria['wallet'])
+                    if not wallet:
+                        await self._safe_reply(update, "ℹ️ Wallet not found")
+                        return
+                    criteria['wallet'] = wallet['address']
+                rule_id = await self.db.add_notification_rule(args[1], **criteria)
+                response = f"✅ Added route `#{rule_id}`"
+                logger.info(f"Added notification rule #{rule_id}: {args[1]} {criteria}")
+            elif action == 'del' and len(args) > 1 and args[1].lstrip('#').isdigit():
+                deleted = await self.db.delete_notification_rule(int(args[1].lstrip('#')))
+                response = "✅ Route deleted" if deleted else "ℹ️ Route not found"
+            elif action == 'list':
+                rules = [Rule.from_row(row) for row in await self.db.load_notification_rules()]
+                lines = [f"• `#{rule.id}` {self._escape(rule.describe())}" for rule in rules]
+                response = "🧭 *Alert routes:*\n" + ("\n".join(lines) or "_none, everything goes to the main chat_")
+            else:
+                response = usage
+            if action in ('add', 'del') and response != usage:
+                response += f"\n_Applies within {settings.notification_rules_reload}s_"
+            await self._safe_reply(update, response)
+        except ValueError:
+            await self._safe_reply(update, usage)
+        except Exception as e:
+            logger.error(f"Error in routes_command: {str(e)}")
+            await self._safe_reply(update, "⚠️ Error updating routes")
+
+    async def profile_command(self, update: Update, context: CallbackContext):
+        """Toggle span tracing, run the stack sampler or dump collected spans"""
+        usage = "`Usage: /profile [spans <rate>|stack <seconds>|dump]`"
+        try:
+            if not self._is_admin(update):
+                return
+
+            args = context.args or []
+            action = args[0].lower() if args else 'status'
+
+            if action == 'spans' and len(args) > 1:
+                rate = min(max(float(args[1]), 0.0), 1.0)
+                tracer.sample_rate = rate
+                if not rate:
+                    await asyncio.to_thread(tracer.dump)
+                response = f"🧭 Span sampling set to `{self._escape(rate)}`"
+            elif action == 'stack' and len(args) > 1:
+                seconds = min(max(float(args[1]), 1.0), 120.0)
+                # Handlers run on the event loop thread, which is what we want to sample
+                if stack_sampler.start(seconds):
+                    response = f"🔬 Sampling event loop stacks for `{self._escape(seconds)}s`"
+                else:
+                    response = "ℹ️ Stack sampler already running"
+            elif action == 'dump':
+                path = await asyncio.to_thread(tracer.dump)
+                response = f"💾 Spans written to `{self._escape(path)}`" if path else "ℹ️ No spans buffered"
+            elif action == 'status':
+                stats = tracer.stats()
+                response = (
+                    f"🧭 *Profiling*\n"
+                    f"Span sampling: `{self._escape(stats['sample_rate'])}`\n"
+                    f"Buffered spans: `{self._escape(stats['buffered_spans'])}`\n"
+                    f"Stack sampler: `{'running' if stack_sampler.running else 'idle'}`"
+                )
+            else:
+                response = usage
+            await self._safe_reply(update, response)
+        except ValueError:
+            await self._safe_reply(update, usage)
+        except Exception as e:
+            logger.error(f"Error in profile_command: {str(e)}")
+            await self._safe_reply(update, "⚠️ Error updating profiler")
+
+    async def memstats_command(self, update: Update, context: CallbackContext):
+        """Show cache sizes, gc counters and the latest allocation growth"""
+        try:
+            if not self._is_admin(update):
+                return
+
+            if context.args and context.args[0].lower() == 'diff':
+                memory_diagnostics.take_diff(since_start=len(context.args) > 1)
+            report = memory_diagnostics.report()
+
+            lines = ["🧠 *Memory diagnostics*", "*Caches:*"]
+            for name, stats in sorted(report['caches'].items()):
+                lines.append(
+                    f"• {self._escape(name)}: `{stats['entries']}` entries, "
+                    f"`{self._escape(round(stats['approx_bytes'] / 1024, 1))} KiB`"
+                )
+            gc_stats = report['gc']
+            lines.append(f"*GC:* counts `{self._escape(gc_stats['counts'])}`, garbage `{gc_stats['garbage']}`")
+
+            if 'traced' in report:
+                traced = report['traced']
+                lines.append(f"*Traced:* `{traced['current_kb']} KiB` \\(peak `{traced['peak_kb']} KiB`\\)")
+                for entry in report['top_growth'][:5]:
+                    growth = f"{entry['size_diff_kb']:+.1f}"
+                    lines.append(f"• `{self._escape(entry['site'])}` `{self._escape(growth)} KiB`")
+            else:
+                lines.append("_tracemalloc is off \\(set MEMORY_DIAGNOSTICS\\=true\\)_")
+
+            await self._safe_reply(update, "\n".join(lines))
+        except Exception as e:
+            logger.error(f"Error in memstats_command: {str(e)}")
+            await self._safe_reply(update, "⚠️ Error collecting memory stats")
+
     async def stop(self):
         try:
             if self.updater and self.updater.running:
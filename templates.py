@@ -0,0 +1,180 @@
+from string import Formatter
+from typing import Any, Callable, Dict, List, Optional
+from formatting import escape_markdown
+import re
+
+
+class EscapeMemo:
+    """Bounded memo of MarkdownV2-escaped strings
+
+    Aliases, token names, symbols and DEX names repeat across alerts, so
+    they are escaped once; the oldest entries go first when full.
+    """
+
+    def __init__(self, maxsize: int = 8192):
+        self.maxsize = maxsize
+        self._entries: Dict[Any, str] = {}
+        self.misses = 0
+
+    def __call__(self, value) -> str:
+        try:
+            return self._entries[value]
+        except KeyError:
+            pass
+        self.misses += 1
+        if len(self._entries) >= self.maxsize:
+            del self._entries[next(iter(self._entries))]
+        escaped = self._entries[value] = escape_markdown(str(value))
+        return escaped
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "misses": self.misses}
+
+
+escape_memo = EscapeMemo()
+
+
+def md(text: str) -> str:
+    """Escape static text while a template is being defined"""
+    return escape_markdown(text)
+
+
+class Template:
+    """A MarkdownV2 message compiled once and rendered in one pass
+
+    The source is MarkdownV2 (static text is escaped where it is written,
+    by hand or with ``md()``) with ``str.format`` fields:
+
+    - ``{name}`` is escaped through the shared memo: aliases, tokens, DEXes
+    - ``{name!u}`` is escaped without memoizing: signatures, amounts, anything unique
+    - ``{name!m}`` is inserted as is: values that are already MarkdownV2
+
+    A format spec (``{amount!u:.3f}``) is applied before escaping. Field
+    names must be plain identifiers; they become keyword arguments of ``render``.
+    """
+
+    _CONVERSIONS = {None: "_memo", "u": "_escape", "m": "str"}
+
+    def __init__(self, source: str):
+        self.source = source
+        parts: List[str] = []
+        names: List[str] = []
+        namespace = {"_memo": escape_memo, "_escape": escape_markdown}
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if literal:
+                parts.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+            if not field.isidentifier():
+                raise ValueError(f"Template field {{{field}}} must be a plain name")
+            if conversion not in self._CONVERSIONS:
+                raise ValueError(f"Unknown conversion !{conversion} for {{{field}}} in template")
+            value = field
+            if spec:
+                namespace[f"_spec{len(parts)}"] = spec
+                value = f"format({value}, _spec{len(parts)})"
+            elif conversion == "u":
+                value = f"str({value})"
+            parts.append(f"{{{self._CONVERSIONS[conversion]}({value})}}")
+            names.append(field)
+        self.fields = tuple(dict.fromkeys(names))
+        # Compiled to one f-string over keyword arguments: no dict lookups or join when rendering
+        params = "".join(f"{name}, " for name in self.fields)
+        code = f"lambda {'*, ' if params else ''}{params}**_: f{''.join(parts)!r}"
+        # render(**values) -> str, bound per instance to skip a call layer
+        self.render: Callable[..., str] = eval(code, namespace)
+
+    def __call__(self, **values) -> str:
+        return self.render(**values)
+
+
+# Aliases are per chat, so alerts are rendered once with a slot for each
+# tracked wallet and every recipient gets its own alias filled in
+_ALIAS_SLOT_RE = re.compile("\x00([^\x00]+)\x00")
+
+
+def alias_slot(address: str) -> str:
+    """Placeholder for a wallet's alias; passes through escaping unchanged"""
+    return f"\x00{address}\x00"
+
+
+def short_address(address: str) -> str:
+    return f"{address[:4]}…{address[-4:]}"
+
+
+def fill_alias_slots(text: str, alias_of: Callable[[str], Optional[str]]) -> str:
+    """Replace each slot with ``alias_of(address)``, or a short address when it gives none"""
+    if "\x00" not in text:
+        return text
+    return _ALIAS_SLOT_RE.sub(
+        lambda match: escape_memo(alias_of(match.group(1)) or short_address(match.group(1))), text
+    )
+
+
+def format_token_amount(amount: float) -> str:
+    """Three decimals with trailing zeros dropped; whole numbers keep ``.000``"""
+    formatted = f"{amount:.3f}".rstrip('0').rstrip('.')
+    return formatted if '.' in formatted else formatted + '.000'
+
+
+GENERAL = Template(
+    "🔔 New *{tx_type}* Transaction in _{alias}_:\n"
+    "⏱ `{time_ago}`\n"
+    "📜 Sig: `{signature!u}`"
+)
+
+SOL_TRANSFER = Template(
+    "💸 *SOL Transfer*:\n"
+    "Amount: `{amount!u} SOL`\n"
+    "From: {sender!m}\n"
+    "To: {recipient!m}\n"
+    "⏱ {time_ago}\n"
+    "📜 `{signature!u}`"
+)
+
+TOKEN_TRANSFER = Template(
+    "💰 *{name} \\({symbol}\\) Transfer*:\n"
+    "🪙 Amount: `{amount!u} {symbol}`\n"
+    "From: {sender!m}\n"
+    "To: {recipient!m}\n"
+    "⏱ {time_ago}\n"
+    "📜 `{signature!u}`"
+)
+
+BATCH_TRANSFER = Template(
+    "📦 Batch Token Distribution:\n"
+    "Total Transfers: {count}\n"
+    "Details:\n"
+    "{lines!m}"
+    "Time: {time_ago}\n"
+    "Signature: {signature!u}"
+)
+
+BATCH_TRANSFER_LINE = Template("\\- {amount!u} {symbol} from {sender!u}\\.\\.\\. to {recipient!u}\\.\\.\\.\n")
+
+SWAP = Template(
+    "🔄 *New Swap in {alias}*\n"
+    "⬆️ Sold: `{sold_amount!u} {sold_symbol}`\n"
+    "⬇️ Bought: `{bought_amount!u} {bought_symbol}`\n"
+    "🏦 DEX: `{dex}`\n"
+    "⏱ {time_ago}\n"
+    "🔗 [Transaction]({tx_url!u})\n"
+    "📜 *CA:* `{ca}`"
+)
+
+PORTFOLIO = Template(
+    "✨ *{alias} Portfolio{cache_status}* ✨\n"
+    "_Last updated: {updated}_\n"
+    "`―――――――――――――――――――――――`\n"
+    "*🟣 SOL Balance:*\n"
+    "`{sol_balance!u:12.4f} SOL`\n\n"
+    "*🪙 Top Assets \\({total} total\\):*\n"
+    "{assets!m}\n"
+    "`―――――――――――――――――――――――`\n"
+    "_Full portfolio attached_ \\📎"
+)
+
+PORTFOLIO_ASSET = Template(
+    "{index:>2}\\. *{name}* \\({symbol}\\)\n"
+    "   `{amount!m:15,.4f}`"
+)
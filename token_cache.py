@@ -0,0 +1,108 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import time
+
+METADATA_PROGRAM_ID = "metaqbxxUerdq28cj1RbAWkYQm3ybzjb6a8bt518x1s"
+
+
+class TokenInfoCache:
+    """LRU + TTL cache of mint -> (name, symbol), with a metadata PDA memo
+
+    Entries loaded by the warm-start phase are remembered so stats can
+    tell how many live hits were only possible because of it. New PDA
+    derivations are kept aside until ``take_unsaved_pdas`` so they can be
+    persisted; a restart then loads them instead of deriving again.
+    """
+
+    def __init__(self, max_size: int = 20_000, ttl: int = 24 * 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[str, str]]]" = OrderedDict()
+        self._pdas: Dict[str, str] = {}
+        self._unsaved_pdas: Dict[str, str] = {}
+        self.pda_derivations = 0
+        self._warmed: Set[str] = set()
+        self._looked_up: Set[str] = set()
+        self.first_lookups = 0
+        self.first_lookups_warm = 0
+        self.hits = 0
+        self.misses = 0
+        self.warm_hits = 0
+
+    def get(self, mint: str) -> Optional[Tuple[str, str]]:
+        entry = self._entries.get(mint)
+        if mint not in self._looked_up:
+            # First time live traffic needs this mint: was it already preloaded?
+            if len(self._looked_up) >= self.max_size:
+                self._looked_up.clear()
+            self._looked_up.add(mint)
+            self.first_lookups += 1
+            self.first_lookups_warm += mint in self._warmed
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(mint)
+        self.hits += 1
+        if mint in self._warmed:
+            self.warm_hits += 1
+        return entry[1]
+
+    def put(self, mint: str, info: Tuple[str, str], warm: bool = False):
+        self._entries[mint] = (time.monotonic(), info)
+        self._entries.move_to_end(mint)
+        if warm:
+            self._warmed.add(mint)
+        while len(self._entries) > self.max_size:
+            evicted, _ = self._entries.popitem(last=False)
+            self._warmed.discard(evicted)
+
+    def __contains__(self, mint: str) -> bool:
+        entry = self._entries.get(mint)
+        return entry is not None and time.monotonic() - entry[0] <= self.ttl
+
+    def metadata_pda(self, mint: str) -> str:
+        """Metaplex metadata account for a mint (derivation is memoized)"""
+        pda = self._pdas.get(mint)
+        if pda is None:
+            # solders is only needed here; importing it lazily keeps it off the startup path
+            from solders.pubkey import Pubkey
+
+            program_id = Pubkey.from_string(METADATA_PROGRAM_ID)
+            pda = str(Pubkey.find_program_address(
+                [b"metadata", bytes(program_id), bytes(Pubkey.from_string(mint))],
+                program_id
+            )[0])
+            self.pda_derivations += 1
+            if len(self._pdas) >= self.max_size:
+                self._pdas.clear()
+            self._pdas[mint] = pda
+            if len(self._unsaved_pdas) < self.max_size:
+                self._unsaved_pdas[mint] = pda
+        return pda
+
+    def load_pdas(self, pairs: Iterable[Tuple[str, str]]):
+        """Seed the PDA memo with persisted (mint, pda) pairs"""
+        for mint, pda in pairs:
+            if len(self._pdas) >= self.max_size:
+                break
+            self._pdas[mint] = pda
+
+    def take_unsaved_pdas(self) -> List[Tuple[str, str]]:
+        """PDAs derived since the last call, for persisting"""
+        pairs, self._unsaved_pdas = list(self._unsaved_pdas.items()), {}
+        return pairs
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "pdas": len(self._pdas),
+            "pda_derivations": self.pda_derivations,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "warm_hit_share": round(self.warm_hits / self.hits, 3) if self.hits else None,
+            "first_lookups_prewarmed": round(self.first_lookups_warm / self.first_lookups, 3)
+            if self.first_lookups else None
+        }
+
+
+token_cache = TokenInfoCache()
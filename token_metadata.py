@@ -0,0 +1,76 @@
+from typing import Optional, Tuple
+import struct
+
+UNKNOWN_TOKEN = ("Unknown Token", "UNK")
+
+# Metaplex Metadata: key (u8), update authority, mint, then borsh name / symbol / uri
+METAPLEX_METADATA_V1 = 4
+METAPLEX_NAME_OFFSET = 1 + 32 + 32
+
+# Token-2022 mints: 82-byte base mint padded to the 165-byte token account
+# size, an account type byte, then TLV extensions (u16 type, u16 length)
+MINT_SIZE = 82
+ACCOUNT_TYPE_OFFSET = 165
+ACCOUNT_TYPE_MINT = 1
+EXTENSION_UNINITIALIZED = 0
+EXTENSION_TOKEN_METADATA = 19
+# TokenMetadata: update authority, mint, then borsh name / symbol / uri / additional metadata
+TOKEN_METADATA_NAME_OFFSET = 32 + 32
+
+
+def _borsh_string(data: bytes, offset: int) -> Tuple[str, int]:
+    """A u32 length-prefixed UTF-8 string at ``offset``; returns it and the next offset"""
+    (length,) = struct.unpack_from("<I", data, offset)
+    start = offset + 4
+    if start + length > len(data):
+        raise ValueError("string runs past the end of the account")
+    return data[start:start + length].decode("utf-8", "ignore"), start + length
+
+
+def _name_and_symbol(data: bytes, offset: int) -> Tuple[str, str]:
+    name, offset = _borsh_string(data, offset)
+    symbol, _ = _borsh_string(data, offset)
+    # Metaplex pads names and symbols to fixed widths with NULs
+    return name.replace("\x00", "").strip(), symbol.replace("\x00", "").strip()
+
+
+def decode_metaplex(data: bytes) -> Optional[Tuple[str, str]]:
+    """Name and symbol from a Metaplex metadata account, or None if it is not one"""
+    if len(data) < METAPLEX_NAME_OFFSET + 8 or data[0] != METAPLEX_METADATA_V1:
+        return None
+    return _name_and_symbol(data, METAPLEX_NAME_OFFSET)
+
+
+def decode_token2022(data: bytes) -> Optional[Tuple[str, str]]:
+    """Name and symbol from a Token-2022 mint's metadata extension, or None without one"""
+    if len(data) <= ACCOUNT_TYPE_OFFSET or data[ACCOUNT_TYPE_OFFSET] != ACCOUNT_TYPE_MINT:
+        return None
+    offset = ACCOUNT_TYPE_OFFSET + 1
+    while offset + 4 <= len(data):
+        extension, length = struct.unpack_from("<HH", data, offset)
+        offset += 4
+        if extension == EXTENSION_UNINITIALIZED:
+            break
+        if extension == EXTENSION_TOKEN_METADATA:
+            return _name_and_symbol(data[offset:offset + length], TOKEN_METADATA_NAME_OFFSET)
+        offset += length
+    return None
+
+
+def decode_token_info(mint_data: Optional[bytes], metadata_data: Optional[bytes]) -> Tuple[str, str]:
+    """Name and symbol of a mint from its own account and its Metaplex metadata account
+
+    A Token-2022 metadata extension wins (the mint is the canonical
+    source); otherwise the Metaplex account is used. Malformed data falls
+    through to the next source instead of raising.
+    """
+    for decode, data in ((decode_token2022, mint_data), (decode_metaplex, metadata_data)):
+        if not data:
+            continue
+        try:
+            info = decode(data)
+        except (ValueError, struct.error):
+            continue
+        if info and any(info):
+            return info[0] or UNKNOWN_TOKEN[0], info[1] or UNKNOWN_TOKEN[1]
+    return UNKNOWN_TOKEN
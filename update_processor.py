@@ -0,0 +1,177 @@
+from collections import Counter, defaultdict, deque
+from typing import Deque, Dict, Hashable
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from config import settings
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Commands that wait on Helius / RPC; everything else is answered from the database
+NETWORK_COMMANDS = frozenset({"portfolio", "replay", "importwallets"})
+
+
+def command_of(update: object) -> str:
+    """Name an update is accounted under: its /command, else ``other``"""
+    if isinstance(update, Update) and update.effective_message:
+        text = update.effective_message.text or update.effective_message.caption or ""
+        if text.startswith("/"):
+            return text.split(maxsplit=1)[0][1:].split("@", 1)[0].lower()
+    return "other"
+
+
+def sender_of(update: object) -> Hashable:
+    """Fairness key: the (chat, user) pair an update came from"""
+    if isinstance(update, Update):
+        chat, user = update.effective_chat, update.effective_user
+        return (chat.id if chat else None, user.id if user else None)
+    return None
+
+
+class _Lane:
+    """Bounded workers shared round-robin between senders, one update per sender at a time"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.active = 0
+        self.busy = set()
+        # Insertion order is the rotation: a served sender moves to the back
+        self.waiting: Dict[Hashable, Deque[asyncio.Future]] = {}
+
+    def queued(self, sender: Hashable) -> int:
+        return len(self.waiting.get(sender, ()))
+
+    async def acquire(self, sender: Hashable):
+        if self.active < self.workers and sender not in self.busy and sender not in self.waiting:
+            self._admit(sender)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self.waiting.setdefault(sender, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(sender)
+            else:
+                queue = self.waiting.get(sender)
+                if queue and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self.waiting[sender]
+            raise
+
+    def release(self, sender: Hashable):
+        self.active -= 1
+        self.busy.discard(sender)
+        for waiting in list(self.waiting):
+            if self.active >= self.workers:
+                break
+            if waiting in self.busy:
+                continue
+            queue = self.waiting.pop(waiting)
+            # Skip waiters that were cancelled but have not yet run their cleanup
+            future = queue.popleft()
+            while future.done() and queue:
+                future = queue.popleft()
+            if queue:
+                self.waiting[waiting] = queue
+            if future.done():
+                continue
+            self._admit(waiting)
+            future.set_result(None)
+
+    def _admit(self, sender: Hashable):
+        self.active += 1
+        self.busy.add(sender)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "active": self.active,
+            "waiting": sum(len(queue) for queue in self.waiting.values()),
+            "waiting_senders": len(self.waiting)
+        }
+
+
+class FairUpdateProcessor(BaseUpdateProcessor):
+    """Process Telegram updates concurrently without letting one sender starve others
+
+    Updates go to one of two bounded lanes: ``fast`` for commands served
+    from the database and ``network`` for ones that wait on Helius, so a
+    slow /portfolio never holds up /listwallets. Within a lane each
+    (chat, user) runs one update at a time, in order, and free workers go
+    round-robin to the senders that are waiting. A sender with
+    ``max_queued_per_chat`` updates already waiting in a lane has further
+    ones dropped. Latency (arrival to handler done) is kept per command.
+    """
+
+    def __init__(self, workers: int = 8, network_workers: int = 4, max_queued_per_chat: int = 10,
+                 max_pending: int = 256, window: int = 500):
+        # PTB's semaphore bounds updates waiting + running; the lanes bound running
+        super().__init__(max_pending)
+        self.lanes = {"fast": _Lane(workers), "network": _Lane(network_workers)}
+        self.max_queued_per_chat = max_queued_per_chat
+        self.latency: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self.wait: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        self.handled = Counter()
+        self.dropped = Counter()
+
+    @classmethod
+    def from_settings(cls) -> "FairUpdateProcessor":
+        return cls(
+            workers=settings.command_workers,
+            network_workers=settings.command_network_workers,
+            max_queued_per_chat=settings.command_queue_per_chat
+        )
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        arrived = time.perf_counter()
+        command = command_of(update)
+        lane = self.lanes["network" if command in NETWORK_COMMANDS else "fast"]
+        sender = sender_of(update)
+        if lane.queued(sender) >= self.max_queued_per_chat:
+            coroutine.close()
+            self.dropped[command] += 1
+            logger.warning(f"Dropped /{command} from {sender}: {self.max_queued_per_chat} updates already queued")
+            return
+        try:
+            await lane.acquire(sender)
+        except asyncio.CancelledError:
+            coroutine.close()
+            raise
+        started = time.perf_counter()
+        try:
+            await coroutine
+        finally:
+            lane.release(sender)
+            self.latency[command].append(time.perf_counter() - arrived)
+            self.wait[command].append(started - arrived)
+            self.handled[command] += 1
+
+    async def initialize(self) -> None:
+        """Nothing to allocate; lanes are plain counters"""
+
+    async def shutdown(self) -> None:
+        """Nothing to free; PTB awaits the update tasks itself"""
+
+    @staticmethod
+    def _percentiles(samples) -> dict:
+        ordered = sorted(samples)
+        pick = lambda q: round(ordered[min(int(len(ordered) * q), len(ordered) - 1)] * 1000, 1)
+        return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+    def stats(self) -> dict:
+        return {
+            "lanes": {name: lane.stats() for name, lane in self.lanes.items()},
+            "dropped": dict(self.dropped),
+            "handlers": {
+                command: {
+                    "count": self.handled[command],
+                    **self._percentiles(samples),
+                    "wait_p95_ms": self._percentiles(self.wait[command])["p95_ms"]
+                }
+                for command, samples in self.latency.items() if samples
+            }
+        }
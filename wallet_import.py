@@ -0,0 +1,151 @@
+from dataclasses import dataclass, field
+from typing import IO, Dict, Iterable, List, Tuple
+from database import Database
+from helius_client import HeliusClient
+from reconciler import get_sol_balances
+from rpc_scheduler import Priority, rpc_priority
+import asyncio
+import csv
+import io
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_BASE58_VALUES = {char: value for value, char in enumerate(BASE58_ALPHABET)}
+_BASE58_RE = re.compile(r"[1-9A-HJ-NP-Za-km-z]{32,44}")
+MAX_ALIAS_LENGTH = 32
+
+
+def is_solana_address(address: str) -> bool:
+    """Whether ``address`` is base58 for exactly 32 bytes (a public key)
+
+    A regex and one integer decode, cheap enough to run on every line of
+    a large import without loading solders.
+    """
+    if not _BASE58_RE.fullmatch(address):
+        return False
+    value = 0
+    for char in address:
+        value = value * 58 + _BASE58_VALUES[char]
+    # Each leading "1" encodes a zero byte
+    zeros = len(address) - len(address.lstrip("1"))
+    return zeros + (value.bit_length() + 7) // 8 == 32
+
+
+def default_alias(address: str) -> str:
+    return f"{address[:4]}-{address[-4:]}".lower()
+
+
+@dataclass
+class ImportPlan:
+    """Outcome of parsing an import file against a chat's current wallets"""
+    wallets: List[Tuple[str, str]] = field(default_factory=list)  # (address, alias) to insert
+    invalid: List[int] = field(default_factory=list)  # line numbers
+    already_followed: int = 0
+    duplicates: int = 0
+    alias_collisions: List[str] = field(default_factory=list)
+    truncated: bool = False
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "valid": len(self.wallets),
+            "invalid": len(self.invalid),
+            "already_followed": self.already_followed,
+            "duplicates": self.duplicates,
+            "alias_collisions": len(self.alias_collisions)
+        }
+
+
+def plan_import(lines: Iterable[str], existing: Iterable[Dict[str, str]], max_wallets: int) -> ImportPlan:
+    """Validate ``address[,alias]`` rows (either column order, header optional)
+
+    ``existing`` are the chat's current subscriptions; addresses it already
+    follows are skipped and aliases it already uses are collisions. Rows
+    are read one at a time, so ``lines`` can be a file being streamed.
+    """
+    plan = ImportPlan()
+    addresses, aliases, imported = set(), set(), set()
+    for row in existing:
+        addresses.add(row['address'])
+        aliases.add(row['alias'])
+
+    for line_no, row in enumerate(csv.reader(lines), 1):
+        cells = [cell.strip() for cell in row if cell.strip()]
+        if not cells or cells[0].startswith("#"):
+            continue
+        address = next((cell for cell in cells if is_solana_address(cell)), None)
+        if address is None:
+            # A header names its columns; anything else is a bad row
+            if line_no > 1 or "address" not in (cell.lower() for cell in cells):
+                plan.invalid.append(line_no)
+            continue
+        alias = next((cell for cell in cells if cell != address), None)
+        alias = (alias or default_alias(address)).lower()[:MAX_ALIAS_LENGTH]
+
+        if address in imported:
+            plan.duplicates += 1
+            continue
+        if address in addresses:
+            plan.already_followed += 1
+            continue
+        if alias in aliases:
+            plan.alias_collisions.append(alias)
+            continue
+        if len(plan.wallets) >= max_wallets:
+            plan.truncated = True
+            break
+        imported.add(address)
+        aliases.add(alias)
+        plan.wallets.append((address, alias))
+    return plan
+
+
+def read_text(data: bytes) -> IO[str]:
+    """Line-iterable text view over an uploaded file (BOM and bad bytes tolerated)"""
+    return io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", errors="replace", newline="")
+
+
+async def write_export(db: Database, chat_id) -> io.BytesIO:
+    """CSV of a chat's subscriptions in the format ``plan_import`` reads"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(("address", "alias"))
+    async for rows in db.iter_subscriptions(chat_id):
+        writer.writerows((row['address'], row['alias']) for row in rows)
+    bio = io.BytesIO(buffer.getvalue().encode("utf-8"))
+    bio.name = "wallets.csv"
+    return bio
+
+
+async def fetch_initial_portfolios(db: Database, helius: HeliusClient, addresses: List[str],
+                                   concurrency: int = 4, chunk_size: int = 100) -> int:
+    """Fill balances and holdings for newly imported wallets; returns how many were fetched
+
+    SOL balances come from one ``getMultipleAccounts`` per chunk and each
+    chunk is written in one transaction, all at background RPC priority.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    fetched = 0
+
+    async def holdings(address):
+        async with semaphore:
+            try:
+                return await helius.get_token_assets(address)
+            except Exception as e:
+                logger.warning(f"Holdings fetch failed for {address}: {str(e)}")
+                return None
+
+    with rpc_priority(Priority.BACKGROUND):
+        for start in range(0, len(addresses), chunk_size):
+            chunk = addresses[start:start + chunk_size]
+            balances = await get_sol_balances(chunk)
+            tokens = await asyncio.gather(*(holdings(address) for address in chunk))
+            rows = [
+                (address, balances.get(address, 0.0), held)
+                for address, held in zip(chunk, tokens) if held is not None
+            ]
+            await db.update_portfolios(rows)
+            fetched += len(rows)
+    return fetched
@@ -0,0 +1,100 @@
+import aiosqlite
+from itertools import groupby
+from typing import Callable, Dict, Iterable, List, Optional, Set
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class WalletRegistry:
+    """In-memory view of tracked wallet addresses and their aliases
+
+    With ``subscriptions=True`` it also keeps the inverted index from
+    wallet address to the chats subscribed to it (and each chat's alias
+    for it), so an alert can be fanned out with one dict lookup per
+    involved wallet.
+    """
+
+    def __init__(self, db_path: str, refresh_interval: int = 30, subscriptions: bool = False):
+        self.db_path = db_path.split("///")[-1]
+        self.refresh_interval = refresh_interval
+        self.subscriptions = subscriptions
+        self._aliases: Dict[str, str] = {}
+        self._subscribers: Dict[str, Dict[str, str]] = {}  # address -> chat id -> alias
+        self.loaded_at = 0.0
+        # Called after a load that changed the tracked address set
+        self.on_change: Optional[Callable[[], None]] = None
+        self._task = None
+
+    async def load(self):
+        """Reload the registry from the wallets table (read-only connection)"""
+        async with aiosqlite.connect(f"file:{self.db_path}?mode=ro", uri=True) as conn:
+            async with conn.execute("SELECT address, alias FROM wallets") as cursor:
+                rows = await cursor.fetchall()
+            if self.subscriptions:
+                async with conn.execute(
+                    "SELECT address, chat_id, alias FROM subscriptions ORDER BY address"
+                ) as cursor:
+                    pairs = await cursor.fetchall()
+        aliases = {address: alias for address, alias in rows}
+        changed = self.loaded_at > 0 and aliases.keys() != self._aliases.keys()
+        self._aliases = aliases
+        if self.subscriptions:
+            self._subscribers = {
+                address: {chat_id: alias for _, chat_id, alias in group}
+                for address, group in groupby(pairs, key=lambda pair: pair[0])
+            }
+        self.loaded_at = time.monotonic()
+        logger.debug(f"Wallet registry loaded ({len(self._aliases)} wallets)")
+        if changed and self.on_change:
+            self.on_change()
+
+    async def start(self):
+        """Load once and keep refreshing in the background"""
+        await self.load()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.load()
+            except Exception as e:
+                logger.error(f"Wallet registry refresh failed: {str(e)}")
+
+    def addresses(self) -> Set[str]:
+        return set(self._aliases)
+
+    def tracks_any(self, addresses: Iterable[str]) -> bool:
+        return any(address in self._aliases for address in addresses)
+
+    def subscribers_of(self, addresses: Iterable[str]) -> List[str]:
+        """Chats subscribed to any of ``addresses``, each once"""
+        chats: Dict[str, None] = {}
+        for address in addresses:
+            chats.update(dict.fromkeys(self._subscribers.get(address, ())))
+        return list(chats)
+
+    def alias_for(self, address: str) -> Optional[str]:
+        """Global alias (wallets.alias); only for routing and logs, chats have their own"""
+        return self._aliases.get(address)
+
+    def chat_alias(self, chat_id: str, address: str) -> Optional[str]:
+        """The alias ``chat_id`` gave ``address``, or None if it does not follow it"""
+        return self._subscribers.get(address, {}).get(str(chat_id))
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._aliases
+
+    def __len__(self) -> int:
+        return len(self._aliases)
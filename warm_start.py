@@ -0,0 +1,102 @@
+from database import Database
+from parse_data import get_token_infos
+from rpc_scheduler import rpc_priority, Priority
+from token_cache import token_cache
+from wallet_registry import WalletRegistry
+from typing import List, Optional
+import asyncio
+import logging
+import json
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class WarmStart:
+    """Refill in-memory caches from persisted state after a restart
+
+    Runs in the background once the listener is up: loads the wallet
+    registry, loads persisted metadata PDAs and derives the rest for every
+    mint held by a tracked wallet (``wallets.tokens``), then resolves their metadata in batches at
+    background RPC priority. Live lookups that arrive meanwhile are
+    counted, so the report shows how much of the cache was warm before
+    traffic needed it.
+    """
+
+    def __init__(self, db: Database, registry: WalletRegistry, batch_size: int = 100):
+        self.db = db
+        self.registry = registry
+        self.batch_size = batch_size
+        self._task = None
+        self.mints = 0
+        self.loaded = 0
+        self.failed_batches = 0
+        self.duration: Optional[float] = None
+        self.live_lookups_during = 0
+
+    async def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def run(self):
+        started = time.monotonic()
+        try:
+            await self.registry.start()
+            mints = await self._held_mints()
+            self.mints = len(mints)
+            token_cache.load_pdas(await self.db.load_metadata_pdas(token_cache.max_size))
+
+            with rpc_priority(Priority.BACKGROUND):
+                for index, mint in enumerate(mints):
+                    token_cache.metadata_pda(mint)
+                    if index % 200 == 199:
+                        await asyncio.sleep(0)  # PDA derivation is CPU-bound; stay responsive
+                await self.db.save_metadata_pdas(token_cache.take_unsaved_pdas())
+
+                for start in range(0, len(mints), self.batch_size):
+                    try:
+                        loaded = await get_token_infos(mints[start:start + self.batch_size], warm=True)
+                        self.loaded += len(loaded)
+                    except Exception as e:
+                        self.failed_batches += 1
+                        logger.warning(f"Warm start batch failed: {str(e)}")
+        except Exception as e:
+            logger.error(f"Warm start failed: {str(e)}", exc_info=True)
+            return
+
+        self.duration = time.monotonic() - started
+        self.live_lookups_during = token_cache.hits + token_cache.misses
+        logger.info(
+            f"Warm start: {len(self.registry)} wallets, {self.loaded}/{self.mints} mints "
+            f"in {self.duration:.1f}s; {self.live_lookups_during} live lookups arrived before it finished"
+        )
+
+    async def _held_mints(self) -> List[str]:
+        mints = {}
+        for wallet in await self.db.load_all_wallets():
+            try:
+                tokens = json.loads(wallet.get('tokens') or '[]')
+            except ValueError:
+                continue
+            for token in tokens:
+                if isinstance(token, dict) and token.get('mint'):
+                    mints[token['mint']] = None
+        return list(mints)
+
+    def stats(self) -> dict:
+        return {
+            "done": self.duration is not None,
+            "mints": self.mints,
+            "loaded": self.loaded,
+            "failed_batches": self.failed_batches,
+            "duration_s": round(self.duration, 2) if self.duration is not None else None,
+            "live_lookups_during": self.live_lookups_during,
+            "token_cache": token_cache.stats()
+        }
@@ -5,27 +5,98 @@ from database import Database
 from config import settings
 from datetime import datetime, timezone
 from time_utils import format_time_ago
-from telegram.helpers import escape_markdown
-from telegram.error import RetryAfter
-from parse_data import parse_swap, parse_transfer, get_token_info, parse_transactions, find_addr
+from formatting import escape_markdown
+from templates import escape_memo
+import templates
+from parse_data import (
+    parse_swap, parse_transfer, get_token_info, parse_transactions, find_addr, involved_addresses,
+    fill_cached_tokens, resolve_tokens, transfer_tokens, swap_tokens, token_name, token_symbol
+)
 from connection_pool import HTTPSessionManager
+from dedupe import SignatureDeduper
+from ingest_workers import IngestWorkerPool
+from partitioned_executor import PartitionedExecutor
+from load_shedder import LoadShedder, Overloaded, overloaded_response
+from alert_coalescer import AlertCoalescer, SOL_MINT
+from outbox import Outbox
+from notification_router import Alert, NotificationRouter
+from backfill import Backfiller
+from ws_ingest import WebSocketIngest
+from wallet_registry import WalletRegistry
+from warm_start import WarmStart
+from token_cache import token_cache
+from profiling import tracer
+from memory_diagnostics import memory_diagnostics
+from loop_monitor import loop_monitor
+from rpc_scheduler import rpc_scheduler
+from rpc_router import rpc_pool
+from functools import partial
+from typing import Awaitable, Callable, Dict, List, Optional
 from decimal import Decimal, ROUND_HALF_UP
+import hmac
 import json
 import logging
 import asyncio
+import time
 
 logger = logging.getLogger(__name__)
 
 
 class WebhookServer:
-    def __init__(self, tg_application, db: Database):
+    def __init__(self, db: Database):
         self.session_manager = HTTPSessionManager(pool_size=15) 
         self.app = web.Application()
-        self.tg_app = tg_application
         self.db = db
         self.runner = None
         self.site = None
+        self.client_session = None
+        self.deduper = SignatureDeduper()
+        self.executor = PartitionedExecutor(
+            partitions=settings.executor_partitions,
+            max_concurrency=settings.executor_max_concurrency
+        )
+        self.shedder = LoadShedder.from_settings()
+        self.outbox = Outbox(
+            db, self.session_manager,
+            max_attempts=settings.outbox_max_attempts,
+            send_interval=settings.telegram_send_interval
+        )
+        self.router = NotificationRouter(
+            db, settings.telegram_chat_id, settings.telegram_chat_id2,
+            reload_interval=settings.notification_rules_reload
+        )
+        self.coalescer = AlertCoalescer(
+            self._send_digest,
+            window=settings.digest_window,
+            threshold=settings.digest_threshold,
+            flush_interval=settings.digest_interval
+        )
+        self.backfiller = Backfiller(
+            db, self.session_manager, self.deduper, self.ingest,
+            interval=settings.backfill_interval,
+            max_signatures=settings.backfill_max_signatures,
+            batch_size=settings.backfill_batch_size,
+            concurrency=settings.backfill_concurrency
+        )
+        self.registry = WalletRegistry(db.db_path, settings.registry_refresh_interval, subscriptions=True)
+        self.warm_start = WarmStart(db, self.registry)
+        self.ws_ingest = None
+        if settings.ingest_mode == "websocket":
+            self.ws_ingest = WebSocketIngest.from_settings(self.registry, self.session_manager, self.deduper, self.ingest)
+        self.registry.on_change = self._registry_changed
+        self.worker_pool = None
+        # Set by the bot when it receives Telegram updates via webhook
+        self.telegram_handler: Optional[Callable[[dict], Awaitable[None]]] = None
+        self.command_stats: Optional[Callable[[], dict]] = None
+        self.reconciler_stats: Optional[Callable[[], dict]] = None
+        self.webhook_sync_stats: Optional[Callable[[], dict]] = None
+        self._drain_task = None
+        # Deliveries accepted before the pipeline is up wait here
+        self._ready = asyncio.Event()
+        self._startup_buffer = []
+        self._startup_task = None
         self._setup_routes()
+        self._register_caches()
         
         # Add cleanup handlers
         self.app.on_shutdown.append(self._on_shutdown)
@@ -44,6 +115,20 @@ class WebhookServer:
     def _setup_routes(self):
         """Set up webhook routes"""
         self.app.router.add_post("/webhook", self.handle_webhook)
+        self.app.router.add_get("/metrics", self.handle_metrics)
+        self.app.router.add_post(settings.telegram_webhook_path, self.handle_telegram)
+
+    def _register_caches(self):
+        caches = memory_diagnostics.caches
+        caches.register("dedupe_signatures", lambda: self.deduper._seen)
+        caches.register("coalescer_windows", lambda: self.coalescer._times)
+        caches.register("coalescer_digests", lambda: self.coalescer._digests)
+        caches.register("outbox_recent", lambda: self.outbox._recent)
+        caches.register("token_info", lambda: token_cache._entries)
+        caches.register("metadata_pdas", lambda: token_cache._pdas)
+        caches.register("wallet_registry", lambda: self.registry._aliases)
+        caches.register("subscriber_index", lambda: self.registry._subscribers)
+        caches.register("markdown_escapes", lambda: escape_memo._entries)
 
     async def handle_webhook(self, request):
         """Handle incoming webhook requests"""
@@ -52,46 +137,158 @@ class WebhookServer:
             logger.warning("Unauthorized webhook attempt")
             return web.Response(status=403)
 
+        try:
+            self.shedder.enter()
+        except Overloaded as e:
+            return overloaded_response(e)
+
         try:
             data = await request.json()
             transactions = data if isinstance(data, list) else [data]
-            logger.info(f"Processing {len(transactions)} transactions")
-
-            # Process transactions concurrently
-            results = await asyncio.gather(
-                *[self.process_transaction(tx) for tx in transactions],
-                return_exceptions=True
-            )
-
-            # Log any errors
-            for result in results:
-                if isinstance(result, Exception):
-                    logger.error(f"Transaction failed: {str(result)}")
+            transactions = [tx for tx in transactions if isinstance(tx, dict)]
+            queue_depth = self.executor.queued + self.executor.in_flight + len(self._startup_buffer)
+            admitted = self.shedder.admit(transactions, queue_depth)
+            if not self._ready.is_set():
+                self._startup_buffer.extend(admitted)
+                return web.Response(status=200)
+            await self.ingest(admitted)
+            return web.Response(status=200)
+        except Overloaded as e:
+            return overloaded_response(e)
+        except Exception as e:
+            logger.error("Webhook error: %s", e, exc_info=True)
+            return web.Response(status=500)
+        finally:
+            self.shedder.exit()
 
+    async def handle_telegram(self, request):
+        """Telegram Bot API webhook: hand the update to the bot's update queue"""
+        token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+        if not hmac.compare_digest(token, settings.telegram_secret_token):
+            logger.warning("Unauthorized Telegram webhook attempt")
+            return web.Response(status=403)
+        if self.telegram_handler is None:
+            # Bot not started yet (or polling); Telegram retries later
+            return web.Response(status=503)
+        try:
+            await self.telegram_handler(await request.json())
             return web.Response(status=200)
+        except ValueError:
+            return web.Response(status=400)
         except Exception as e:
-            logger.error(f"Webhook error: {str(e)}", exc_info=True)
+            logger.error("Telegram webhook error: %s", e, exc_info=True)
             return web.Response(status=500)
 
+    @property
+    def serves_http(self) -> bool:
+        """Whether this process serves /metrics and Telegram webhooks (on ADMIN_PORT with ingest workers)"""
+        return self.site is not None
+
+    async def handle_metrics(self, request):
+        """Expose pipeline counters as JSON"""
+        if request.headers.get('Authorization') != settings.webhook_secret:
+            return web.Response(status=403)
+        return web.json_response(self.metrics())
+
+    def metrics(self) -> dict:
+        return {
+            "executor": self.executor.stats(),
+            "load_shedder": self.shedder.stats(),
+            "coalescer": self.coalescer.stats(),
+            "outbox": self.outbox.stats(),
+            "routing": self.router.stats(),
+            "backfill": self.backfiller.stats(),
+            "reconciler": self.reconciler_stats() if self.reconciler_stats else None,
+            "warm_start": self.warm_start.stats(),
+            "websocket": self.ws_ingest.stats() if self.ws_ingest else None,
+            "webhook_sync": self.webhook_sync_stats() if self.webhook_sync_stats else None,
+            "tracer": tracer.stats(),
+            "memory": memory_diagnostics.report(),
+            "event_loop": loop_monitor.stats(),
+            "commands": self.command_stats() if self.command_stats else None,
+            "rpc_budget": rpc_scheduler.stats(),
+            "rpc_endpoints": rpc_pool.stats(),
+            "dedupe": {"tracked": len(self.deduper), "duplicates": self.deduper.duplicates}
+        }
+
+    async def ingest(self, transactions):
+        """Dedupe and process a batch of webhook transactions"""
+        transactions = [
+            tx for tx in transactions
+            if isinstance(tx, dict) and not self.deduper.seen(tx.get('signature'))
+        ]
+        logger.info("Processing %d transactions", len(transactions))
+
+        # Oldest first, so per-wallet partitions see transactions in chain order
+        transactions.sort(key=lambda tx: tx.get('timestamp') or 0)
+
+        # Serial per wallet, concurrent (and capped) across wallets
+        results = await asyncio.gather(
+            *[
+                self.executor.submit(self._partition_key(tx), partial(self.process_transaction, tx))
+                for tx in transactions
+            ],
+            return_exceptions=True
+        )
+
+        # Log any errors
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error("Transaction failed: %s", result)
+
+    def _partition_key(self, tx_data) -> str:
+        """Tracked wallet a transaction is ordered under
+
+        The same wallet ``parse_transactions`` attributes it to: for a
+        TRANSFER the first tracked address in the description (often the
+        recipient), otherwise the fee payer. When the fee payer is not
+        tracked either, any tracked involved wallet is used, and only then
+        the fee payer itself.
+        """
+        fee_payer = tx_data.get('feePayer')
+        if tx_data.get('type') == 'TRANSFER':
+            for word in (tx_data.get('description') or '').split():
+                word = word.strip('.,!?')
+                if word in self.registry:
+                    return word
+        if fee_payer in self.registry:
+            return fee_payer
+        tracked = sorted(address for address in involved_addresses(tx_data) if address in self.registry)
+        if tracked:
+            return tracked[0]
+        return fee_payer or tx_data.get('signature', '')
+
     async def process_transaction(self, tx_data):
-        """Process a single transaction"""
+        """Process a single transaction (traced when sampled)"""
+        with tracer.trace("process_transaction", signature=tx_data.get('signature'), type=tx_data.get('type')):
+            await self._process_transaction(tx_data)
+
+    async def _process_transaction(self, tx_data):
         try:
-            logger.info(f"Processing transaction: {tx_data.get('signature')}")
-            tx_info = await parse_transactions(tx_data, self.db)
+            logger.debug("Processing transaction: %s", tx_data.get('signature'))
+            with tracer.span("parse_transactions"):
+                tx_info = await parse_transactions(tx_data, self.db)
             wallet_address = tx_info['wallet']
             tx_type = tx_info['tx_type']
 
             # Fetch wallet info
-            wallet = await self.db.get_wallet(wallet_address)
+            with tracer.span("db.get_wallet"):
+                wallet = await self.db.get_wallet(wallet_address)
             if not wallet:
-                logger.debug(f"Ignoring transaction for unknown wallet: {wallet_address}")
+                logger.debug("Ignoring transaction for unknown wallet: %s", wallet_address)
                 return
 
             alias = wallet['alias']
-            logger.info(f"Wallet Info: {alias}")
+            logger.info("Transaction %s for wallet %s", tx_data.get('signature'), alias)
 
             # Update wallet activity
-            await self.db.record_wallet_activity(wallet_address)
+            with tracer.span("db.record_wallet_activity"):
+                await self.db.record_wallet_activity(wallet_address, tx_data.get('timestamp'))
+
+            # Hot wallets are summarised periodically instead of alerting per tx
+            if self.coalescer.should_coalesce(wallet_address, alias):
+                self.coalescer.add(wallet_address, tx_data)
+                return
 
             # Prepare notification data
             timestamp = datetime.fromtimestamp(tx_data.get('timestamp'), tz=timezone.utc) if isinstance(tx_data.get('timestamp'), (int, float)) else tx_data.get('timestamp')
@@ -103,127 +300,167 @@ class WebhookServer:
             elif tx_type == 'SWAP':
                 await self.process_swap(tx_data)
             else:
-                await self.send_general_notification(tx_type, timestamp, signature, alias)
-                logger.info(f"Unhandled transaction type: {tx_type}")
+                with tracer.span("notify_general"):
+                    await self.send_general_notification(
+                        tx_type, timestamp, signature, templates.alias_slot(wallet_address),
+                        alert=self._alert(tx_data, [wallet_address], aliases=[alias])
+                    )
+                logger.debug("Unhandled transaction type: %s", tx_type)
 
         except Exception as e:
-            logger.error(f"[Tx {tx_data.get('signature')}] Processing error: {str(e)}", exc_info=True)
+            logger.error("[Tx %s] Processing error: %s", tx_data.get('signature'), e, exc_info=True)
 
     async def process_transfer(self, tx_data):
         """Process transfer transactions"""
         try:
-            transfer_data = await parse_transfer(tx_data)
+            with tracer.span("parse_transfer"):
+                transfer_data = await parse_transfer(tx_data)
             if not transfer_data:
                 logger.warning("Failed to parse transfer data")
                 return
 
-            if transfer_data['is_native']:
-                await self.notify_sol_transfer(transfer_data)
-            elif transfer_data['is_single_token']:
-                await self.notify_single_token_transfer(transfer_data)
-            else:  # Batch distribution
-                await self.notify_batch_transfer(transfer_data)
+            with tracer.span("notify_transfer"):
+                if transfer_data['is_native']:
+                    alert = self._alert(
+                        tx_data, [transfer_data['from'], transfer_data['to']],
+                        mints=[SOL_MINT], amount=transfer_data['amount'] / 1e9
+                    )
+                    await self.notify_sol_transfer(transfer_data, alert)
+                elif transfer_data['is_single_token']:
+                    alert = self._alert(
+                        tx_data, [transfer_data['from'], transfer_data['to']],
+                        mints=[transfer_data['token']['mint']], amount=transfer_data['amount']
+                    )
+                    await self.notify_single_token_transfer(transfer_data, alert)
+                else:  # Batch distribution
+                    transfers = transfer_data['transfers']
+                    alert = self._alert(
+                        tx_data, [t[side] for t in transfers for side in ('from', 'to')],
+                        mints=[t['token']['mint'] for t in transfers]
+                    )
+                    await self.notify_batch_transfer(transfer_data, alert)
 
         except Exception as e:
-            logger.error(f"[Tx {tx_data.get('signature')}] Transfer processing error: {str(e)}", exc_info=True)
+            logger.error("[Tx %s] Transfer processing error: %s", tx_data.get('signature'), e, exc_info=True)
 
     async def process_swap(self, tx_data):
         """Process swap transactions"""
         try:
-            swap_data = parse_swap(tx_data) 
+            with tracer.span("parse_swap"):
+                swap_data = parse_swap(tx_data)
             if swap_data:
-                await self.notify_swap(swap_data)
+                with tracer.span("notify_swap"):
+                    await self.notify_swap(swap_data, self._swap_alert(tx_data, swap_data))
         except Exception as e:
-            logger.error(f"[Tx {tx_data.get('signature')}] Swap processing error: {str(e)}", exc_info=True)
+            logger.error("[Tx %s] Swap processing error: %s", tx_data.get('signature'), e, exc_info=True)
 
-    async def send_general_notification(self, tx_type, timestamp, signature, alias):
+    async def send_general_notification(self, tx_type, timestamp, signature, alias, alert: Optional[Alert] = None):
         """Send basic transaction notification"""
         try:
-            safe_alias = self._escape(alias)
-            time_ago = self._escape(format_time_ago(timestamp))
-            safe_sig = self._escape(signature)
-
-            text = (
-                f"🔔 New *{self._escape(tx_type)}* Transaction in _{safe_alias}_:\n"
-                f"⏱ `{time_ago}`\n"
-                f"📜 Sig: `{safe_sig}`"
+            text = templates.GENERAL.render(
+                tx_type=tx_type, alias=alias, time_ago=format_time_ago(timestamp), signature=signature
             )
-
-            await self.send_notification(text)
+            await self.send_notification(text, alert)
         except Exception as e:
-            logger.error(f"Failed to send general notification: {str(e)}")
+            logger.error("Failed to send general notification: %s", e)
+
+    def _alert(self, tx_data, wallets, aliases=(), mints=(), amount=None) -> Alert:
+        """Routing attributes of an alert about ``tx_data``"""
+        wallets = tuple(dict.fromkeys(w for w in wallets if w and w != 'Unknown'))
+        aliases = dict.fromkeys(aliases)
+        aliases.update(dict.fromkeys(a for a in map(self.registry.alias_for, wallets) if a))
+        return Alert(
+            tx_type=tx_data.get('type', 'UNKNOWN'),
+            wallets=wallets,
+            aliases=tuple(aliases),
+            mints=tuple(dict.fromkeys(m for m in mints if m)),
+            source=tx_data.get('source'),
+            amount=float(amount) if amount is not None else None
+        )
+
+    def _swap_alert(self, tx_data, swap_data) -> Alert:
+        sold, bought = swap_data['sold_token'], swap_data['bought_token']
+        sol_amount = None
+        if not sold or not bought:
+            # SOL-paired swap: route on the SOL the wallet moved
+            sol_amount = sum(
+                transfer.get('amount', 0) for transfer in tx_data.get('nativeTransfers') or []
+                if swap_data['wallet'] in (transfer.get('fromUserAccount'), transfer.get('toUserAccount'))
+            ) / 1e9
+        return self._alert(
+            tx_data, [swap_data['wallet']],
+            mints=[token['mint'] for token in (sold, bought) if token] + [swap_data.get('contract_address')],
+            amount=sol_amount
+        )
 
     async def _get_address_display(self, address: str) -> str:
-        """Get alias or truncated address for display"""
+        """Alias slot for a tracked wallet (filled per chat), else a truncated address"""
         try:
-            wallet = await self.db.get_wallet(address)
-            if wallet:
-                return self._escape(wallet['alias'])
+            if self.registry.loaded_at:
+                tracked = address in self.registry
+            else:
+                # Registry still warming up
+                tracked = await self.db.get_wallet(address) is not None
+            if tracked:
+                return templates.alias_slot(address)
             return f"`{self._escape(address[:6])}...{self._escape(address[-4:])}`"
         except Exception as e:
-            logger.error(f"Address display error: {str(e)}")
+            logger.error("Address display error: %s", e)
             return f"`{self._escape(address[:10])}...`"
 
-    async def notify_sol_transfer(self, transfer_data):
+    async def notify_sol_transfer(self, transfer_data, alert: Optional[Alert] = None):
         """Notify SOL transfer with aliases"""
         try:
             from_display = await self._get_address_display(transfer_data['from'])
             to_display = await self._get_address_display(transfer_data['to'])
             
-            text = (
-                f"💸 *SOL Transfer*:\n"
-                f"Amount: `{self._escape(transfer_data['amount'])} SOL`\n"
-                f"From: {from_display}\n"
-                f"To: {to_display}\n"
-                f"⏱ {self._escape(format_time_ago(transfer_data['timestamp']))}\n"
-                f"📜 `{self._escape(transfer_data['signature'])}`"
+            text = templates.SOL_TRANSFER.render(
+                amount=transfer_data['amount'], sender=from_display, recipient=to_display,
+                time_ago=format_time_ago(transfer_data['timestamp']), signature=transfer_data['signature']
             )
-            await self.send_notification(text)
+            await self.send_notification(text, alert)
         except Exception as e:
-            logger.error(f"SOL transfer notification failed: {str(e)}")
+            logger.error("SOL transfer notification failed: %s", e)
 
-    async def notify_single_token_transfer(self, transfer_data):
+    async def notify_single_token_transfer(self, transfer_data, alert: Optional[Alert] = None):
         """Notify token transfer with aliases"""
         try:
-            token = transfer_data['token']
             from_display = await self._get_address_display(transfer_data['from'])
             to_display = await self._get_address_display(transfer_data['to'])
-            formatted_amount = f"{transfer_data['amount']:.3f}".rstrip('0').rstrip('.')
-            if '.' not in formatted_amount:
-                formatted_amount += '.000'
-            text = (
-                f"💰 *{self._escape(token['name'])} \\({self._escape(token['symbol'])}\\) Transfer*:\n"
-                f"🪙 Amount: `{self._escape(formatted_amount)} {self._escape(token['symbol'])}`\n"
-                f"From: {from_display}\n"
-                f"To: {to_display}\n"
-                f"⏱ {self._escape(format_time_ago(transfer_data['timestamp']))}\n"
-                f"📜 `{self._escape(transfer_data['signature'])}`"
-            )
-            await self.send_notification(text)
+            formatted_amount = templates.format_token_amount(transfer_data['amount'])
+
+            def render():
+                token = transfer_data['token']
+                return templates.TOKEN_TRANSFER.render(
+                    name=token_name(token), symbol=token_symbol(token), amount=formatted_amount,
+                    sender=from_display, recipient=to_display,
+                    time_ago=format_time_ago(transfer_data['timestamp']), signature=transfer_data['signature']
+                )
+
+            await self.send_enriched(render, transfer_tokens(transfer_data), alert)
         except Exception as e:
-            logger.error(f"Token transfer notification failed: {str(e)}")
+            logger.error("Token transfer notification failed: %s", e)
 
-    async def notify_batch_transfer(self, transfer_data):
+    async def notify_batch_transfer(self, transfer_data, alert: Optional[Alert] = None):
         """Send notification for batch token distribution"""
-        
-        text = (
-            f"📦 Batch Token Distribution:\n"
-            f"Total Transfers: {len(transfer_data['transfers'])}\n"
-            f"Details:\n"
-        )
-        for transfer in transfer_data['transfers']:
-            text += (
-                f"- {transfer['amount']} {transfer['token']['symbol']} from "
-                f"{transfer['from'][:10]}... to {transfer['to'][:10]}...\n"
+
+        def render():
+            lines = "".join(
+                templates.BATCH_TRANSFER_LINE.render(
+                    amount=transfer['amount'], symbol=token_symbol(transfer['token']),
+                    sender=transfer['from'][:10], recipient=transfer['to'][:10]
+                )
+                for transfer in transfer_data['transfers']
+            )
+            return templates.BATCH_TRANSFER.render(
+                count=len(transfer_data['transfers']), lines=lines,
+                time_ago=format_time_ago(transfer_data['timestamp']), signature=transfer_data['signature']
             )
-        text += (
-            f"Time: {format_time_ago(transfer_data['timestamp'])}\n"
-            f"Signature: {transfer_data['signature']}"
-        )
-        await self.send_notification(text)
 
+        await self.send_enriched(render, transfer_tokens(transfer_data), alert)
 
-    async def notify_swap(self, swap_data):
+
+    async def notify_swap(self, swap_data, alert: Optional[Alert] = None):
         """Swap notification with contract address"""
         try:
             wallet = await self.db.get_wallet(swap_data['wallet'])
@@ -240,79 +477,171 @@ class WebhookServer:
             if not bought:
                 bought = {'symbol': 'SOL', 'amount': abs(swap_data.get('nativeBalanceChange', 0))/1e9}
 
-            text = (
-                f"🔄 *New Swap in {self._escape(wallet['alias'])}*\n"
-                f"⬆️ Sold: `{self._escape(sold['amount'])} {self._escape(sold.get('symbol', 'UNK'))}`\n"
-                f"⬇️ Bought: `{self._escape(bought['amount'])} {self._escape(bought.get('symbol', 'UNK'))}`\n"
-                f"🏦 DEX: `{self._escape(swap_data['dex'])}`\n"
-                f"⏱ {self._escape(format_time_ago(swap_data['timestamp']))}\n"
-                f"🔗 [Transaction]({self._escape(swap_data['tx_url'])})\n"
-                f"📜 *CA:* `{self._escape(ca)}`"
-            )
-            await self.send_notification(text)
-            
+            def render():
+                return templates.SWAP.render(
+                    alias=templates.alias_slot(swap_data['wallet']),
+                    sold_amount=sold['amount'], sold_symbol=token_symbol(sold),
+                    bought_amount=bought['amount'], bought_symbol=token_symbol(bought),
+                    dex=swap_data['dex'], time_ago=format_time_ago(swap_data['timestamp']),
+                    tx_url=swap_data['tx_url'], ca=ca
+                )
+
+            await self.send_enriched(render, swap_tokens(swap_data), alert)
+
         except Exception as e:
-            logger.error(f"Swap notification failed: {str(e)}")
-            
-    async def send_notification(self, text):
-        """Send notification with proper connection cleanup"""
-        session = None
+            logger.error("Swap notification failed: %s", e)
+
+    async def send_enriched(self, render, tokens: List[dict], alert: Optional[Alert] = None):
+        """Send an alert that depends on token metadata lookups
+
+        Cached names are filled in before anything is rendered. In two-phase
+        mode the alert is then queued immediately with what the payload
+        already carries (mints, amounts, signature, alias). Once the
+        remaining tokens resolve, the queued text is replaced if it has not
+        gone out yet, otherwise the delivered message is edited. Either way
+        enrichment is bounded by ENRICHMENT_DEADLINE.
+        """
+        pending = fill_cached_tokens(tokens)
+        enrich = partial(resolve_tokens, pending)
+        if not settings.two_phase_alerts:
+            if pending:
+                await self._enrich_within_deadline(enrich)
+            await self.send_notification(render(), alert)
+            return
+
+        queued = await self.send_notification(render(), alert)
+        if not pending or not queued or not await self._enrich_within_deadline(enrich):
+            return
+        text = render()
+        await asyncio.gather(*(
+            self._update_queued(chat_id, outbox_id, self._for_chat(text, chat_id))
+            for chat_id, outbox_id in queued.items()
+        ))
+
+    async def _update_queued(self, chat_id: str, outbox_id: int, text: str):
+        if await self.outbox.replace_pending(outbox_id, text):
+            return
+        message_id = await self.outbox.wait_delivered(outbox_id, timeout=settings.enrichment_deadline)
+        if message_id:
+            await self.outbox.edit(message_id, text, chat_id)
+
+    async def _enrich_within_deadline(self, enrich) -> bool:
+        """Run an enrichment step; returns True if it changed anything"""
         try:
-            session = aiohttp.ClientSession()
-            await self._safe_send_message(session, text)
+            with tracer.span("enrich"):
+                return await asyncio.wait_for(enrich(), timeout=settings.enrichment_deadline)
+        except asyncio.TimeoutError:
+            logger.warning("Enrichment exceeded %ss deadline", settings.enrichment_deadline)
         except Exception as e:
-            logger.error(f"Notification failed: {str(e)}")
-        finally:
-            if session:
-                await session.close()
+            logger.error("Enrichment failed: %s", e)
+        return False
 
-    async def _safe_send_message(self, session, text, attempt=1):
-        """Send message with retry logic"""
+    async def send_notification(self, text, alert: Optional[Alert] = None) -> Dict[str, int]:
+        """Queue one rendered alert for its wallets' subscribers and routed chats
+
+        Returns chat id -> outbox id.
+        """
         try:
-            async with self.session_manager.session.post(
-                f"https://api.telegram.org/bot{settings.telegram_bot_token}/sendMessage",
-                json={
-                    'chat_id': settings.telegram_chat_id,
-                    'text': text,
-                    'parse_mode': 'MarkdownV2',
-                    'disable_web_page_preview': True
-                },
-                timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
-                response.raise_for_status()
-                await response.read()
-        except RetryAfter as e:
-            if attempt > 3:
-                raise
-            wait_time = e.retry_after + 2
-            logger.warning(f"Rate limited. Waiting {wait_time}s (attempt {attempt}/3)")
-            await asyncio.sleep(wait_time)
-            return await self._safe_send_message(session, text, attempt + 1)
+            with tracer.span("send_notification"):
+                subscribers = self.registry.subscribers_of(alert.wallets) if alert else []
+                routed = self.router.route(alert, fallback=not subscribers)
+                return await self.outbox.send_many({
+                    chat_id: self._for_chat(text, chat_id) for chat_id in dict.fromkeys(subscribers + routed)
+                })
         except Exception as e:
-            logger.error(f"Message error: {str(e)}")
-            # Fallback to plain text
-            clean_text = self._escape(text)
-            await self._safe_send_message(session, clean_text)
-            
+            logger.error("Notification failed: %s", e)
+            return {}
+
+    def _for_chat(self, text: str, chat_id: str) -> str:
+        """Fill alias slots with the chat's own aliases (a short address where it has none)"""
+        return templates.fill_alias_slots(text, partial(self.registry.chat_alias, chat_id))
+
+    async def _send_digest(self, text: str, wallet: str):
+        await self.send_notification(text, self._alert({'type': 'DIGEST'}, [wallet]))
+
     def _escape(self, text: str) -> str:
         """Escape markdown text"""
-        return escape_markdown(str(text), version=2)
+        return escape_markdown(str(text))
+
+    async def listen(self):
+        """Start accepting webhooks; they are buffered until ``start()`` completes"""
+        if settings.webhook_workers > 1:
+            # Ingest processes own the port; their queue holds work until we drain it
+            self.worker_pool = IngestWorkerPool(
+                settings.webhook_workers, settings.webhook_host, settings.webhook_port, self.db.db_path
+            )
+            self.worker_pool.start()
+            logger.info("Webhook ingest started with %s workers", settings.webhook_workers)
+            # Workers only serve /webhook; /metrics and Telegram updates are handled here
+            await self._serve(settings.admin_port or settings.webhook_port + 1)
+            return
+        await self._serve(settings.webhook_port)
+
+    def _registry_changed(self):
+        """Push a changed tracked-address set to ingest workers and WebSocket subscriptions"""
+        if self.worker_pool:
+            self.worker_pool.notify_registry_changed()
+        if self.ws_ingest:
+            self.ws_ingest.registry_changed()
+
+    async def _serve(self, port: int):
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        self.site = web.TCPSite(self.runner, settings.webhook_host, port)
+        await self.site.start()
+        logger.info("Webhook server listening on port %s", port)
 
     async def start(self):
-        """Start the webhook server"""
+        """Start the processing pipeline (the database must be connected)"""
+        if not self.runner and not self.worker_pool:
+            await self.listen()
         await self.session_manager.start()  # Start pool before server
+        await self.executor.start()
+        await self.coalescer.start()
+        await self.outbox.start()
+        await self.router.start()
+        await self.warm_start.start()
+        self.deduper.restore(await self.db.load_seen_signatures(time.time() - self.deduper.ttl))
+        await self.backfiller.start()
+        if self.ws_ingest:
+            await self.ws_ingest.start()
         self.client_session = aiohttp.ClientSession(
             timeout=ClientTimeout(total=10),
             raise_for_status=True
         )
-        self.runner = web.AppRunner(self.app)
-        await self.runner.setup()
-        self.site = web.TCPSite(self.runner, '0.0.0.0', 8080)
-        await self.site.start()
-        logger.info("Webhook server started on port 8080")
+
+        if self.worker_pool:
+            self._drain_task = asyncio.create_task(self.worker_pool.drain(self.ingest))
+
+        self._ready.set()
+        buffered, self._startup_buffer = self._startup_buffer, []
+        if buffered:
+            logger.info("Processing %s transactions received during startup", len(buffered))
+            self._startup_task = asyncio.create_task(self.ingest(buffered))
+        logger.info("Webhook pipeline ready")
 
     async def stop(self):
         """Stop the webhook server gracefully"""
+        if self.worker_pool:
+            self.worker_pool.stop()
+        for task in (self._drain_task, self._startup_task):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if self.ws_ingest:
+            await self.ws_ingest.stop()
+        await self.backfiller.stop()
+        await self.warm_start.stop()
+        await self.registry.stop()
+        await self.executor.stop()
+        if self._ready.is_set():
+            await self.db.save_seen_signatures(self.deduper.snapshot())
+            await self.db.save_metadata_pdas(token_cache.take_unsaved_pdas())
+        await self.coalescer.stop()
+        await self.outbox.stop()
+        await self.router.stop()
+        tracer.dump()
+
         await self.session_manager.stop()   # Close pool after server
         stop_tasks = []
         if self.site:
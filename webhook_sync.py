@@ -0,0 +1,137 @@
+from database import Database
+from helius_client import HeliusClient
+from typing import Dict, List, Optional, Set
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookSync:
+    """Keep Helius webhook accountAddresses equal to the tracked wallet set
+
+    ``request_sync()`` is cheap and can be called on every wallet edit; the
+    actual sync runs once edits have been quiet for ``debounce`` seconds,
+    so a burst of /addwallet commands becomes a single update. Addresses
+    are spread over one or more webhooks of at most ``max_addresses``
+    each: an address stays on the webhook that already has it, new ones
+    fill the first webhook with room, and only webhooks whose list
+    changed are written.
+    """
+
+    def __init__(self, db: Database, helius: HeliusClient, webhook_ids: List[str],
+                 debounce: float = 5.0, max_addresses: int = 100_000, retry_delay: float = 60.0):
+        self.db = db
+        self.helius = helius
+        self.webhook_ids = webhook_ids
+        self.debounce = debounce
+        self.max_addresses = max_addresses
+        self.retry_delay = retry_delay
+        self._dirty = asyncio.Event()
+        self._last_request = 0.0
+        self._task = None
+        self.syncs = 0
+        self.added = 0
+        self.removed = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.webhook_ids)
+
+    async def start(self):
+        if not self.enabled:
+            return
+        self._task = asyncio.create_task(self._sync_loop())
+        # Reconcile whatever changed while we were down
+        self.request_sync()
+        logger.info("Helius webhook sync started (%s webhooks)", len(self.webhook_ids))
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def request_sync(self):
+        """Schedule a sync after the debounce period"""
+        self._last_request = time.monotonic()
+        self._dirty.set()
+
+    async def _sync_loop(self):
+        while True:
+            await self._dirty.wait()
+            # Trailing-edge debounce: wait until edits stop arriving
+            while True:
+                quiet = time.monotonic() - self._last_request
+                if quiet >= self.debounce:
+                    break
+                await asyncio.sleep(self.debounce - quiet)
+            self._dirty.clear()
+            try:
+                await self.sync()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error("Helius webhook sync failed: %s", e)
+                await asyncio.sleep(self.retry_delay)
+                self._dirty.set()
+
+    async def sync(self) -> Dict[str, int]:
+        """Apply the diff between tracked wallets and registered addresses"""
+        tracked = set(await self.db.get_all_wallet_addresses())
+        webhooks = []
+        for webhook_id in self.webhook_ids:
+            webhook = await self.helius.get_webhook(webhook_id)
+            webhook.setdefault("webhookID", webhook_id)
+            webhooks.append(webhook)
+
+        current = [set(webhook.get("accountAddresses") or []) for webhook in webhooks]
+        desired = self._assign(tracked, current)
+
+        added = removed = 0
+        for webhook, before, after in zip(webhooks, current, desired):
+            if before == after:
+                continue
+            await self.helius.set_webhook_addresses(webhook, sorted(after))
+            added += len(after - before)
+            removed += len(before - after)
+
+        self.syncs += 1
+        self.added += added
+        self.removed += removed
+        if added or removed:
+            logger.info("Helius webhooks synced: +%s -%s addresses (%s tracked)", added, removed, len(tracked))
+        return {"added": added, "removed": removed}
+
+    def _assign(self, tracked: Set[str], current: List[Set[str]]) -> List[Set[str]]:
+        """Target address set per webhook, moving as few addresses as possible"""
+        desired = [addresses & tracked for addresses in current]
+        placed = set().union(*desired) if desired else set()
+        # An address registered on two webhooks would be delivered twice
+        seen: Set[str] = set()
+        for addresses in desired:
+            addresses -= seen
+            seen |= addresses
+
+        unplaced = sorted(tracked - placed)
+        for addresses in desired:
+            room = self.max_addresses - len(addresses)
+            if room > 0 and unplaced:
+                addresses.update(unplaced[:room])
+                unplaced = unplaced[room:]
+        if unplaced:
+            logger.warning("%s wallets exceed webhook capacity; add another HELIUS_WEBHOOK_IDS entry", len(unplaced))
+        return desired
+
+    def stats(self) -> dict:
+        return {
+            "syncs": self.syncs,
+            "added": self.added,
+            "removed": self.removed,
+            "pending": self._dirty.is_set(),
+            "last_error": self.last_error
+        }
@@ -0,0 +1,301 @@
+from config import settings
+from connection_pool import HTTPSessionManager
+from dedupe import SignatureDeduper
+from helius_client import fetch_parsed_transactions, PARSED_TRANSACTIONS_URL
+from rpc_scheduler import rpc_scheduler
+from wallet_registry import WalletRegistry
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+import itertools
+import aiohttp
+import asyncio
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionSocket:
+    """One WebSocket carrying ``logsSubscribe`` subscriptions for many wallets
+
+    The desired address set is kept separately from live subscription
+    ids, so after a reconnect every address is simply subscribed again.
+    """
+
+    def __init__(self, index: int, url: str, on_signature: Callable[[str], None],
+                 max_backoff: float = 30.0):
+        self.index = index
+        self.url = url
+        self.on_signature = on_signature
+        self.max_backoff = max_backoff
+        self.addresses: Set[str] = set()
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, str] = {}  # request id -> address
+        self._subscriptions: Dict[str, int] = {}  # address -> subscription id
+        self._unsubscribes: Set[asyncio.Task] = set()
+        self.connects = 0
+        self.notifications = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None and not self._ws.closed
+
+    async def run(self, session: aiohttp.ClientSession):
+        backoff = 1.0
+        while True:
+            try:
+                async with session.ws_connect(self.url, heartbeat=30) as ws:
+                    self._ws = ws
+                    self.connects += 1
+                    backoff = 1.0
+                    logger.info("WebSocket %s connected; subscribing %s wallets", self.index, len(self.addresses))
+                    for address in list(self.addresses):
+                        await self._subscribe(address)
+                    async for message in ws:
+                        if message.type == aiohttp.WSMsgType.TEXT:
+                            self._handle(message.json())
+                        elif message.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("WebSocket %s error: %s", self.index, e)
+            finally:
+                self._ws = None
+                self._pending.clear()
+                self._subscriptions.clear()
+                # Subscriptions die with the socket; nothing left to unsubscribe
+                for task in self._unsubscribes:
+                    task.cancel()
+
+            logger.warning("WebSocket %s disconnected; reconnecting in %.0fs", self.index, backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def add(self, address: str):
+        self.addresses.add(address)
+        if self.connected:
+            await self._subscribe(address)
+
+    async def remove(self, address: str):
+        self.addresses.discard(address)
+        subscription = self._subscriptions.pop(address, None)
+        if subscription is not None and self.connected:
+            await self._request("logsUnsubscribe", [subscription])
+
+    async def _subscribe(self, address: str):
+        request_id = await self._request("logsSubscribe", [{"mentions": [address]}, {"commitment": "confirmed"}])
+        self._pending[request_id] = address
+
+    async def _request(self, method: str, params: List[Any]) -> int:
+        request_id = next(self._ids)
+        await self._ws.send_json({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        return request_id
+
+    def _handle(self, message: Dict[str, Any]):
+        if message.get('method') == 'logsNotification':
+            value = message['params']['result']['value']
+            self.notifications += 1
+            if value.get('err') is None and value.get('signature'):
+                self.on_signature(value['signature'])
+            return
+
+        address = self._pending.pop(message.get('id'), None)
+        if address is None:
+            return
+        if 'error' in message:
+            logger.warning("Subscribe failed for %s: %s", address, message['error'].get('message'))
+        elif address in self.addresses:
+            self._subscriptions[address] = message['result']
+        elif self.connected:
+            # Removed while the subscribe was in flight
+            task = asyncio.create_task(self._unsubscribe(message['result']))
+            self._unsubscribes.add(task)
+            task.add_done_callback(self._unsubscribes.discard)
+
+    async def _unsubscribe(self, subscription: int):
+        try:
+            await self._request("logsUnsubscribe", [subscription])
+        except Exception as e:
+            logger.debug("WebSocket %s unsubscribe failed: %s", self.index, e)
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "connects": self.connects,
+            "subscriptions": len(self._subscriptions),
+            "wanted": len(self.addresses),
+            "notifications": self.notifications
+        }
+
+
+class WebSocketIngest:
+    """Ingest mode that follows tracked wallets over Solana WebSocket subscriptions
+
+    Wallets are spread over ``connections`` sockets by a stable hash. The
+    tracked set comes from the shared ``registry``; ``registry_changed()``
+    is called when it changes and only the difference is (un)subscribed. Notified signatures are collected for
+    ``batch_delay`` seconds, fetched as Helius parsed transactions and
+    handed to ``ingest`` – the same pipeline webhook deliveries use. A
+    failed fetch puts its signatures back (after ``retry_delay``) up to
+    ``max_fetch_attempts`` times.
+    Dedupe happens twice: before fetching (a signature already seen by
+    the pipeline is not fetched) and again inside ``ingest``.
+    """
+
+    def __init__(self, registry: WalletRegistry, session_manager: HTTPSessionManager, deduper: SignatureDeduper,
+                 ingest: Callable[[List[Dict[str, Any]]], Awaitable[None]], url: str,
+                 connections: int = 2, batch_delay: float = 0.05, batch_size: int = 100, fetchers: int = 2, max_fetch_attempts: int = 5,
+                 retry_delay: float = 1.0):
+        self.session_manager = session_manager
+        self.deduper = deduper
+        self.ingest = ingest
+        self.batch_delay = batch_delay
+        self.batch_size = batch_size
+        self.registry = registry
+        self._sync_task: Optional[asyncio.Task] = None
+        self._sync_dirty = False
+        self.sockets = [SubscriptionSocket(i, url, self._on_signature) for i in range(max(1, connections))]
+        self._pending: List[str] = []
+        self._pending_set: Set[str] = set()
+        self._fetch_attempts: Dict[str, int] = {}  # failed fetches so far, for pending signatures
+        self.max_fetch_attempts = max_fetch_attempts
+        self.retry_delay = retry_delay
+        self._wakeup = asyncio.Event()
+        self._ingests: Set[asyncio.Task] = set()
+        self.fetchers = fetchers
+        self._tasks: List[asyncio.Task] = []
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.batches = 0
+        self.fetch_errors = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_settings(cls, registry: WalletRegistry, session_manager: HTTPSessionManager, deduper: SignatureDeduper,
+                      ingest: Callable[[List[Dict[str, Any]]], Awaitable[None]]) -> "WebSocketIngest":
+        url = settings.solana_ws_url or settings.das_endpoint.replace("https://", "wss://", 1)
+        return cls(
+            registry, session_manager, deduper, ingest, url,
+            connections=settings.ws_connections,
+            batch_delay=settings.ws_batch_delay
+        )
+
+    def _socket_for(self, address: str) -> SubscriptionSocket:
+        return self.sockets[zlib.crc32(address.encode()) % len(self.sockets)]
+
+    async def start(self):
+        # WebSockets get their own session; the pooled one force-closes connections
+        self._session = aiohttp.ClientSession()
+        await self.sync_subscriptions()
+        self._tasks = [asyncio.create_task(socket.run(self._session)) for socket in self.sockets]
+        self._tasks.extend(asyncio.create_task(self._fetch_loop()) for _ in range(self.fetchers))
+        logger.info("WebSocket ingest started (%s sockets, %s wallets)", len(self.sockets), len(self.registry))
+
+    async def stop(self):
+        if self._sync_task:
+            self._tasks.append(self._sync_task)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._ingests, return_exceptions=True)
+        if self._session:
+            await self._session.close()
+
+    def registry_changed(self):
+        """Resync subscriptions after the registry's address set changed"""
+        if not self._session:
+            return  # start() subscribes the current set
+        self._sync_dirty = True
+        if not (self._sync_task and not self._sync_task.done()):
+            self._sync_task = asyncio.create_task(self._resync())
+
+    async def _resync(self):
+        # Sync again if another change landed while one was running
+        while self._sync_dirty:
+            self._sync_dirty = False
+            try:
+                await self.sync_subscriptions()
+            except Exception as e:
+                logger.error("Subscription refresh failed: %s", e)
+
+    async def sync_subscriptions(self):
+        """Subscribe newly tracked wallets and drop removed ones"""
+        wanted = self.registry.addresses()
+        current = set().union(*(socket.addresses for socket in self.sockets))
+        for address in wanted - current:
+            await self._socket_for(address).add(address)
+        for address in current - wanted:
+            await self._socket_for(address).remove(address)
+
+    def _on_signature(self, signature: str):
+        # A transfer between two tracked wallets is notified on both subscriptions
+        if signature in self._pending_set or signature in self.deduper:
+            return
+        self._pending.append(signature)
+        self._pending_set.add(signature)
+        self._wakeup.set()
+
+    async def _fetch_loop(self):
+        """Fetch pending signatures in batches as RPC budget allows
+
+        The batch is taken only once budget has been granted, so when the
+        budget is the bottleneck batches grow instead of requests queueing.
+        """
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.batch_delay)
+            await rpc_scheduler.acquire(PARSED_TRANSACTIONS_URL)
+            signatures, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            if not self._pending:
+                self._wakeup.clear()
+            if not signatures:
+                continue
+            try:
+                transactions = await fetch_parsed_transactions(
+                    self.session_manager.session, signatures, commitment="confirmed", budgeted=False
+                )
+                self.batches += 1
+            except Exception as e:
+                self.fetch_errors += 1
+                logger.error("WebSocket batch of %s failed: %s", len(signatures), e)
+                await self._requeue(signatures)
+                continue
+            self._pending_set.difference_update(signatures)
+            for signature in signatures:
+                self._fetch_attempts.pop(signature, None)
+
+            task = asyncio.create_task(self.ingest(transactions))
+            self._ingests.add(task)
+            task.add_done_callback(self._ingests.discard)
+
+    async def _requeue(self, signatures: List[str]):
+        """Retry a failed batch after ``retry_delay``; signatures out of attempts are dropped"""
+        retry = []
+        for signature in signatures:
+            attempts = self._fetch_attempts.get(signature, 0) + 1
+            if attempts < self.max_fetch_attempts:
+                self._fetch_attempts[signature] = attempts
+                retry.append(signature)
+            else:
+                self._fetch_attempts.pop(signature, None)
+                self._pending_set.discard(signature)
+                self.dropped += 1
+        if len(retry) < len(signatures):
+            logger.warning(
+                "Dropped %s signatures after %s failed fetches",
+                len(signatures) - len(retry), self.max_fetch_attempts
+            )
+        if not retry:
+            return
+        # Still in _pending_set meanwhile, so repeat notifications are not queued twice
+        await asyncio.sleep(self.retry_delay * self._fetch_attempts[retry[0]])
+        self._pending[:0] = retry
+        self._wakeup.set()
+
+    def stats(self) -> dict:
+        return {
+            "sockets": [socket.stats() for socket in self.sockets],
+            "batches": self.batches,
+            "fetch_errors": self.fetch_errors,
+            "dropped": self.dropped,
+            "pending": len(self._pending)
+        }